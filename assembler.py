@@ -0,0 +1,38 @@
+# assembler.py
+from typing import Dict, List, NamedTuple, Optional
+
+from converter import MIPSConverter
+from memory import STATIC_DATA_BASE
+from parser import DataSymbol, MIPSParser
+
+class AssembledProgram(NamedTuple):
+    symbols: Dict[str, DataSymbol]
+    instructions: List[dict]  # {"address", "source", "size"} per text line; size is in machine words
+    labels: Dict[str, int]  # Text label -> byte address
+    end: int  # Byte address just past the last instruction, where execution stops
+
+class MIPSAssembler:
+    """First pass of the two-pass assembler, shared by the executor and the converter.
+
+    The data section is laid out, then every text line is sized (pseudo-
+    instructions may take several words) to give it a byte address and
+    build the text symbol table. The second pass is MIPSDecoder for the
+    executor and MIPSConverter for machine code; both resolve labels
+    against this table, so they agree on every address.
+    """
+
+    def __init__(self, parser: Optional[MIPSParser] = None, converter: Optional[MIPSConverter] = None):
+        self.parser = parser or MIPSParser()
+        self.converter = converter or MIPSConverter()
+
+    def assemble(self, code: str, data_base: int = STATIC_DATA_BASE) -> AssembledProgram:
+        lines = [line.strip() for line in code.split('\n') if line.strip()]
+        symbols = self.parser.build_symbol_table(lines, data_base)
+        sources = self.parser.parse_text_section(lines)
+        layout = self.converter.layout(sources, symbols)
+        return AssembledProgram(symbols, program_lines(sources, layout.addresses, layout.sizes), layout.labels,
+                                layout.end)
+
+def program_lines(sources: List[str], addresses: List[int], sizes: List[int]) -> List[dict]:
+    return [{"address": f"0x{address:08X}", "source": source, "size": size}
+            for source, address, size in zip(sources, addresses, sizes)]
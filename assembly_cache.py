@@ -0,0 +1,140 @@
+# assembly_cache.py
+from typing import Dict, List, Optional, Set, Tuple
+
+from assembler import AssembledProgram, MIPSAssembler, program_lines
+from converter import MIPSConverter
+from decoder import DecodedInstruction, MIPSDecoder, text_addresses
+from memory import STATIC_DATA_BASE, TEXT_BASE
+from parser import DataSymbol, MIPSParser
+
+def _changed_labels(old: Dict[str, int], new: Dict[str, int]) -> Set[str]:
+    return {name for name in old.keys() | new.keys() if old.get(name) != new.get(name)}
+
+def _operands(source: str) -> Set[str]:
+    return set(source.replace(",", " ").replace("(", " ").replace(")", " ").split()[1:])
+
+class MIPSAssemblyCache(MIPSAssembler):
+    """Keeps the parsed, decoded and encoded form of every source line between loads.
+
+    Editor lines are parsed and sized once per distinct content. Decoded
+    instructions and machine code are keyed by source and address; when
+    labels move, only lines naming a moved label are decoded or encoded
+    again, and a change to the data section drops everything that may
+    refer to it. The cache stands in for the executor's decoder, so a
+    reload after a small edit only does work for the lines the edit
+    touched.
+    """
+
+    def __init__(self, parser: Optional[MIPSParser] = None, converter: Optional[MIPSConverter] = None):
+        super().__init__(parser, converter)
+        self.decoder = MIPSDecoder()
+        self._sources: Dict[str, str] = {}  # Editor line -> normalised source ("" if not an instruction)
+        self._data: Tuple[Tuple[str, ...], int] = ((), 0)
+        self._symbols: Dict[str, DataSymbol] = {}
+        self._sizes: Dict[str, int] = {}  # Source -> machine words, for the current symbols
+
+        self._decoded: Dict[Tuple[str, str], DecodedInstruction] = {}  # (source, address) -> decoded line
+        self._decode_labels: Dict[str, int] = {}
+        self._decode_symbols: Dict[str, DataSymbol] = {}
+
+        self._listing: Dict[Tuple[str, str], str] = {}  # (source, address) -> displayed machine code
+        self._listing_labels: Dict[str, int] = {}
+        self._listing_symbols: Dict[str, DataSymbol] = {}
+
+        self.hits = 0  # Lines decoded or encoded from the cache
+        self.misses = 0
+
+    def assemble(self, code: str, data_base: int = STATIC_DATA_BASE) -> AssembledProgram:
+        """MIPSAssembler.assemble, reusing the parse and size of every line seen before."""
+        lines = [line.strip() for line in code.split('\n') if line.strip()]
+
+        data = (tuple(self.parser.data_lines(lines)), data_base)
+        if data != self._data:
+            self._data = data
+            self._symbols = self.parser.build_symbol_table(lines, data_base)
+            self._sizes = {}
+
+        sources, parsed = self._sources, []
+        for line in self.parser.text_lines(lines):
+            source = sources.get(line)
+            if source is None:
+                source = self.parser.parse_instruction(line)
+            parsed.append((line, source))
+        self._sources = dict(parsed)
+        text = self.parser.attach_labels([source for _, source in parsed])
+
+        # First pass: addresses and the text symbol table from cached line sizes
+        addresses, sizes, labels = [], [], {}
+        cached, live = self._sizes, {}
+        address = TEXT_BASE
+        for source in text:
+            addresses.append(address)
+            if source.split(None, 1)[0].endswith(":"):
+                for label in self.converter.defined_labels(source):
+                    labels[label] = address
+            size = cached.get(source)
+            if size is None:
+                size = self.converter.size(source, self._symbols)
+            live[source] = size
+            sizes.append(size)
+            address += 4 * size
+        self._sizes = live
+        return AssembledProgram(self._symbols, program_lines(text, addresses, sizes), labels, address)
+
+    def decode_program(self, instructions: List[dict], labels: Dict[str, int],
+                       symbols: Optional[Dict[str, DataSymbol]] = None) -> List[DecodedInstruction]:
+        """MIPSDecoder.decode_program, re-decoding only lines that are new or name a moved label."""
+        symbols = symbols or {}
+        cache = self._decoded
+        if symbols != self._decode_symbols:
+            cache.clear()
+        else:
+            moved = _changed_labels(self._decode_labels, labels)
+            if moved:
+                for key in [key for key, decoded in cache.items() if decoded.label in moved]:
+                    del cache[key]
+        self._decode_labels, self._decode_symbols = dict(labels), dict(symbols)
+
+        decoded = []
+        live = {}
+        for instruction in instructions:
+            key = (instruction["source"], instruction["address"])
+            line = cache.get(key)
+            if line is None:
+                line = self.decoder.decode(instruction, labels, symbols)
+                self.misses += 1
+            else:
+                self.hits += 1
+            live[key] = line
+            decoded.append(line)
+        self._decoded = live  # Lines no longer in the program are dropped
+        self.decoder.link(decoded, text_addresses(instructions))
+        return decoded
+
+    def assemble_listing(self, program: AssembledProgram) -> List[Tuple[str, str]]:
+        """MIPSConverter.assemble_listing for an assembled program; only new lines and lines naming a moved label are encoded."""
+        symbols = program.symbols
+        if symbols != self._listing_symbols:
+            self._listing.clear()
+        moved = _changed_labels(self._listing_labels, program.labels)
+        self._listing_labels, self._listing_symbols = program.labels, dict(symbols)
+
+        listing = []
+        live = {}
+        for instruction in program.instructions:
+            source = instruction["source"]
+            key = (source, instruction["address"])
+            text = self._listing.get(key)
+            if text is None or (moved and moved & _operands(source)):
+                try:
+                    words = self.converter.encode(source, int(instruction["address"], 16), program.labels, symbols)
+                    text = " ".join(self.converter.format_binary(word) for word in words)
+                except ValueError as e:
+                    text = f"Error: {e}"
+                self.misses += 1
+            else:
+                self.hits += 1
+            live[key] = text
+            listing.append((source, text))
+        self._listing = live
+        return listing
@@ -0,0 +1,78 @@
+# benchmarks/bench_import.py
+"""Import-time benchmark for the simulator core.
+
+Starts a fresh interpreter per sample, imports the core modules and reports
+the median wall time, the cumulative ``-X importtime`` figure per module and
+whether Tk was pulled in. Run from the repository root:
+
+    python benchmarks/bench_import.py --samples 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE_MODULES = ["parser", "memory", "register_file", "mips_commands", "decoder", "block_compiler", "breakpoints", "journal", "snapshot", "profiler", "pipeline", "cache", "predictor", "log_buffer", "executor", "converter", "assembler", "assembly_cache", "machine"]
+TARGETS = {
+    "interpreter": "pass",
+    "core": "import " + ", ".join(CORE_MODULES),
+    "headless": "import mips_simulator",
+}
+TK_CHECK = "import sys; {code}; print('tkinter' in sys.modules)"
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+
+def wall_time(code: str, samples: int) -> float:
+    """Median wall time in milliseconds of a fresh interpreter running code."""
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        _run(["-c", code])
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def import_times(code: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds per module, from -X importtime.
+
+    Modules first imported by another module are included, nested under it.
+    """
+    stderr = _run(["-X", "importtime", "-c", code]).stderr
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = (field.strip() for field in line[len("import time:"):].split("|"))
+        if cumulative_us.isdigit():
+            cumulative[name] = int(cumulative_us)
+    return cumulative
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--samples", type=int, default=10, help="Interpreter launches per target")
+    args = arg_parser.parse_args()
+
+    # Warm the bytecode cache so compilation is not counted
+    _run(["-c", TARGETS["core"] + "; import mips_simulator"])
+
+    results = {name: wall_time(code, args.samples) for name, code in TARGETS.items()}
+    baseline = results["interpreter"]
+    for name, milliseconds in results.items():
+        print(f"{name:<12} {milliseconds:8.2f} ms  (+{milliseconds - baseline:6.2f} ms over bare interpreter)")
+
+    print("\nCumulative import time per core module (us):")
+    times = import_times(TARGETS["core"])
+    for module in CORE_MODULES:
+        print(f"  {module:<14} {times.get(module, 0):8d}")
+
+    uses_tk = _run(["-c", TK_CHECK.format(code=TARGETS["headless"])]).stdout.strip() == "True"
+    print(f"\ntkinter imported by headless core: {uses_tk}")
+    return 1 if uses_tk else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
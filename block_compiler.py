@@ -0,0 +1,272 @@
+# block_compiler.py
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple, TYPE_CHECKING
+
+from decoder import DecodedInstruction
+
+if TYPE_CHECKING:
+    from executor import MIPSExecutor
+    from profiler import MIPSProfiler
+
+WORD_MASK = 0xFFFFFFFF
+SIGN_BIT = 0x80000000
+
+# Instructions that end a basic block
+TERMINATORS = {"beq", "bne", "j", "jal", "jr", "syscall"}
+
+class CompiledBlock(NamedTuple):
+    run: Callable[[], int]  # Executes the block and returns the next instruction index
+    start: int  # Instruction index of the first line
+    end: int  # Instruction index after the last line
+    length: int  # Instructions executed by one pass (label-only lines excluded)
+    source: str  # Generated Python code, kept for debugging
+    line_map: Dict[int, int]  # Generated source line -> instruction index
+
+class MIPSBlockCompiler:
+    """Translates basic blocks of decoded instructions into Python functions.
+
+    A block runs from its first instruction up to a branch, jump or syscall,
+    or up to the next labelled line. Each block is generated as Python
+    source with register numbers and immediates as constants, compiled once
+    and cached by its starting index, so the run loop makes one call per
+    block instead of one handler dispatch per instruction.
+    """
+
+    def __init__(self, executor: "MIPSExecutor"):
+        self.executor = executor
+        self.blocks: Dict[int, CompiledBlock] = {}
+        self.decoded: List[DecodedInstruction] = []
+        self.leaders: Set[int] = set()
+        self.profiler: Optional["MIPSProfiler"] = None
+
+    def load(self, decoded: List[DecodedInstruction], label_lines: Dict[str, int]) -> None:
+        """Use a newly decoded program, dropping the blocks compiled for the previous one.
+
+        label_lines maps each text label to the instruction index it names.
+        """
+        self.blocks.clear()
+        self.decoded = decoded
+        self.leaders = set(label_lines.values())
+
+    def set_profiler(self, profiler: Optional["MIPSProfiler"]) -> None:
+        """Compile blocks with (or without) profiling counters from now on."""
+        if profiler is not self.profiler:
+            self.profiler = profiler
+            self.blocks.clear()
+
+    def block_at(self, start: int) -> CompiledBlock:
+        """Return the compiled block starting at instruction index start."""
+        block = self.blocks.get(start)
+        if block is None:
+            block = self.blocks[start] = self.compile(start)
+        return block
+
+    def compile(self, start: int) -> CompiledBlock:
+        decoded = self.decoded
+        count = len(decoded)
+        names: Dict[str, object] = {}
+        body: List[str] = []
+        line_map: Dict[int, int] = {}
+        length = 0
+        line = start
+        next_line: Optional[int] = None
+        source_line = 3  # "def" and the docstring occupy lines 1-2
+
+        if self.profiler is not None:
+            names["bc"] = self.profiler.block_counts
+            body.append(f"bc[{start}] += 1")
+            source_line += 1
+
+        while line < count:
+            if line != start and line in self.leaders:
+                break
+            d = decoded[line]
+            line += 1
+            if d.handler is None:
+                continue  # Label-only line
+            line_map[source_line] = line - 1
+            length += 1
+            if d.error or d.op not in self._TEMPLATES:
+                names[f"h{line - 1}"] = d.handler
+                names[f"d{line - 1}"] = d
+                body.append(f"h{line - 1}(d{line - 1})")
+                source_line += 1
+                continue
+            code = self._TEMPLATES[d.op](self, d, line, names)
+            if code:
+                body.append(code)
+                source_line += code.count("\n") + 1
+            if d.op in TERMINATORS:
+                if "return" not in code:
+                    body.append(f"return {line}")
+                next_line = line
+                break
+        else:
+            line = count
+
+        if next_line is None:
+            body.append(f"return {line}")
+        if not length and self.profiler is None:
+            body.insert(0, "pass")
+
+        filename = f"<block {start}>"
+        defaults = ", ".join(f"{name}={name}" for name in names)
+        source = f"def block({defaults}):\n    '''Instructions {start}-{line - 1}'''\n" + "".join(f"    {code}\n" for code in body)
+        namespace = dict(names)
+        exec(compile(source, filename, "exec"), namespace)
+        return CompiledBlock(namespace["block"], start, line, length, source, line_map)
+
+    # Code templates. Each returns the Python code for the decoded instruction, one line
+    # unless profiling adds a second one.
+
+    def _names(self, names: Dict[str, object], *wanted: str) -> None:
+        sources = {
+            "r": self.executor.registers,
+            "ex": self.executor,
+            "jl": self.executor.jump_line,
+            "rw": self.executor.memory.read_word, "ww": self.executor.memory.write_word,
+            "rh": self.executor.memory.read_half, "wh": self.executor.memory.write_half,
+            "rb": self.executor.memory.read_byte, "wb": self.executor.memory.write_byte,
+        }
+        for name in wanted:
+            names[name] = sources[name]
+
+    def _binary(operator: str, masked: bool = False):
+        def template(self, d, next_line, names):
+            self._names(names, "r")
+            if not d.rd:
+                return ""
+            expression = f"r[{d.rs}] {operator} r[{d.rt}]"
+            return f"r[{d.rd}] = ({expression}) & {WORD_MASK}" if masked else f"r[{d.rd}] = {expression}"
+        return template
+
+    def _shift(operator: str, variable: bool):
+        def template(self, d, next_line, names):
+            self._names(names, "r")
+            if not d.rd:
+                return ""
+            amount = f"(r[{d.rs}] & 31)" if variable else str(d.imm)
+            expression = f"r[{d.rt}] {operator} {amount}"
+            return f"r[{d.rd}] = ({expression}) & {WORD_MASK}" if operator == "<<" else f"r[{d.rd}] = {expression}"
+        return template
+
+    def _slt(self, d, next_line, names):
+        self._names(names, "r")
+        if not d.rd:
+            return ""
+        # Flipping the sign bit turns a signed comparison into an unsigned one
+        return f"r[{d.rd}] = 1 if (r[{d.rs}] ^ {SIGN_BIT}) < (r[{d.rt}] ^ {SIGN_BIT}) else 0"
+
+    def _immediate(operator: str):
+        def template(self, d, next_line, names):
+            self._names(names, "r")
+            if not d.rt:
+                return ""
+            return f"r[{d.rt}] = (r[{d.rs}] {operator} {d.imm}) & {WORD_MASK}"
+        return template
+
+    def _li(self, d, next_line, names):
+        self._names(names, "r")
+        return f"r[{d.rt}] = {d.imm & WORD_MASK}" if d.rt else ""
+
+    def _memory_address(self, d, names: Dict[str, object], counter: str) -> Tuple[str, str]:
+        """Code counting the access when profiling, and the address expression to use after it."""
+        expression = f"r[{d.rs}] + {d.imm}"
+        if self.profiler is None:
+            return "", expression
+        counts = self.profiler.reads if counter == "mr" else self.profiler.writes
+        names[counter] = counts
+        names[counter + "g"] = counts.get
+        return f"a = {expression}; {counter}[a] = {counter}g(a, 0) + 1; ", "a"
+
+    def _load(reader: str, sign_bit: int = 0):
+        def template(self, d, next_line, names):
+            self._names(names, "r", reader)
+            prefix, address = self._memory_address(d, names, "mr")
+            access = f"{reader}({address})"
+            if not d.rt:
+                return prefix + access  # The access still happens and may fault
+            if not sign_bit:
+                return f"{prefix}r[{d.rt}] = {access}"
+            return f"{prefix}v = {access}; r[{d.rt}] = (v - {sign_bit << 1}) & {WORD_MASK} if v & {sign_bit} else v"
+        return template
+
+    def _store(writer: str, mask: int = WORD_MASK):
+        def template(self, d, next_line, names):
+            self._names(names, "r", writer)
+            prefix, address = self._memory_address(d, names, "mw")
+            value = f"r[{d.rt}]" if mask == WORD_MASK else f"r[{d.rt}] & {mask}"
+            return f"{prefix}{writer}({address}, {value})"
+        return template
+
+    def _branch(operator: str):
+        def template(self, d, next_line, names):
+            self._names(names, "r")
+            if self.profiler is not None:
+                names["tk"] = self.profiler.taken
+                return (f"if r[{d.rs}] {operator} r[{d.rt}]: tk[{next_line - 1}] += 1; return {d.target}\n"
+                        f"    return {next_line}")
+            return f"return {d.target} if r[{d.rs}] {operator} r[{d.rt}] else {next_line}"
+        return template
+
+    def _j(self, d, next_line, names):
+        return f"return {d.target}"
+
+    def _jal(self, d, next_line, names):
+        self._names(names, "r")
+        return_address = self.executor.addresses[next_line]  # The instruction after the jal
+        return f"r[31] = {return_address}; return {d.target}"
+
+    def _jr(self, d, next_line, names):
+        self._names(names, "r", "jl")
+        return f"return jl(r[{d.rs}])"
+
+    def _syscall(self, d, next_line, names):
+        self._names(names, "r", "ex")
+        return "if r[2] == 10: ex.halted = True"  # Exit program
+
+    _TEMPLATES = {
+        "add": _binary("+", masked=True),
+        "sub": _binary("-", masked=True),
+        "and": _binary("&"),
+        "or": _binary("|"),
+        "xor": _binary("^"),
+        "sll": _shift("<<", variable=False),
+        "srl": _shift(">>", variable=False),
+        "sllv": _shift("<<", variable=True),
+        "srlv": _shift(">>", variable=True),
+        "slt": _slt,
+        "addi": _immediate("+"),
+        "andi": _immediate("&"),
+        "ori": _immediate("|"),
+        "li": _li,
+        "la": _li,
+        "lw": _load("rw"),
+        "lh": _load("rh", 0x8000),
+        "lhu": _load("rh"),
+        "lb": _load("rb", 0x80),
+        "lbu": _load("rb"),
+        "sw": _store("ww"),
+        "sh": _store("wh", 0xFFFF),
+        "sb": _store("wb", 0xFF),
+        "beq": _branch("=="),
+        "bne": _branch("!="),
+        "j": _j,
+        "jal": _jal,
+        "jr": _jr,
+        "syscall": _syscall,
+    }
+    del _binary, _shift, _immediate, _load, _store, _branch
+
+    def fault_line(self, block: CompiledBlock, traceback) -> int:
+        """Instruction index that raised inside block, found from the generated code's line number."""
+        filename = f"<block {block.start}>"
+        line = block.start
+        while traceback is not None:
+            if traceback.tb_frame.f_code.co_filename == filename:
+                line = block.line_map.get(traceback.tb_lineno, line)
+            traceback = traceback.tb_next
+        return line
+
+    def executed_before(self, block: CompiledBlock, line: int) -> int:
+        """Instructions of block completed before the one at index line."""
+        return sum(1 for d in self.decoded[block.start:line] if d.handler is not None)
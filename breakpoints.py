@@ -0,0 +1,152 @@
+# breakpoints.py
+import operator
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from decoder import parse_immediate, resolve_address
+from memory import MIPSMemory, TEXT_BASE
+from parser import DataSymbol
+from register_file import RegisterFile, REGISTER_NAMES
+
+COMPARISONS: Dict[str, Callable[[int, int], bool]] = {
+    "==": operator.eq, "!=": operator.ne,
+    "<=": operator.le, ">=": operator.ge,
+    "<": operator.lt, ">": operator.gt,
+}
+
+def _signed(value: int) -> int:
+    return value - 0x100000000 if value & 0x80000000 else value
+
+class Condition(NamedTuple):
+    register: int
+    comparison: str  # One of COMPARISONS
+    value: int
+
+    def holds(self, registers: Sequence[int]) -> bool:
+        """Compare the register as a signed 32-bit value."""
+        return COMPARISONS[self.comparison](_signed(registers[self.register]), self.value)
+
+    def __str__(self) -> str:
+        return f"{REGISTER_NAMES[self.register]} {self.comparison} {self.value}"
+
+    @classmethod
+    def parse(cls, text: str) -> "Condition":
+        """Parse a condition such as "$t0 == 5" or "$v0>=0x10"."""
+        for comparison in ("==", "!=", "<=", ">=", "<", ">"):  # Two-character operators first
+            register, found, value = text.partition(comparison)
+            if found:
+                return cls(RegisterFile.index_of(register.strip()), comparison, parse_immediate(value))
+        raise ValueError(f"Invalid breakpoint condition: {text}")
+
+class Watchpoint(NamedTuple):
+    address: int
+    size: int  # 1, 2 or 4 bytes
+    name: str  # Data label or hex address, for messages
+
+class MIPSBreakpoints:
+    """Line breakpoints (optionally conditional) and memory watchpoints.
+
+    The executor only switches to its instrumented run loop while armed is
+    true, so programs without breakpoints run at full speed.
+    """
+
+    def __init__(self):
+        self.lines: Dict[int, Optional[Condition]] = {}  # Instruction index -> condition
+        self.watchpoints: List[Watchpoint] = []
+        self._watched: List[int] = []  # Last seen value per watchpoint
+        self.paused_at: Optional[int] = None  # Line of the breakpoint the program is stopped at
+        self.last_hit = ""
+
+    @property
+    def armed(self) -> bool:
+        return bool(self.lines or self.watchpoints)
+
+    @staticmethod
+    def resolve_line(location: Union[int, str], labels: Dict[str, int], line_at: Callable[[int], int]) -> int:
+        """Instruction index of a text label or an instruction address (0x00400000...).
+
+        labels maps text labels to byte addresses and line_at is the
+        executor's address-to-index lookup. Numbers below the text base are
+        taken as offsets into the text section.
+        """
+        if isinstance(location, str):
+            location = location.strip()
+            if location in labels:
+                location = labels[location]
+            else:
+                try:
+                    location = parse_immediate(location)
+                except ValueError:
+                    raise ValueError(f"Unknown label: {location}") from None
+        if 0 <= location < TEXT_BASE:
+            location += TEXT_BASE
+        line = line_at(location)
+        if line < 0:
+            raise ValueError(f"No instruction at address 0x{location & 0xFFFFFFFF:08X}")
+        return line
+
+    def add_breakpoint(self, line: int, condition: Optional[Condition] = None) -> None:
+        self.lines[line] = condition
+
+    def remove_breakpoint(self, line: int) -> None:
+        self.lines.pop(line, None)
+
+    def toggle_breakpoint(self, line: int) -> bool:
+        """Add or remove an unconditional breakpoint; returns True if the line now has one."""
+        if line in self.lines:
+            del self.lines[line]
+            return False
+        self.lines[line] = None
+        return True
+
+    def should_break(self, line: int, registers: Sequence[int]) -> bool:
+        condition = self.lines.get(line)
+        return condition is None or condition.holds(registers)
+
+    def add_watchpoint(self, location: Union[int, str], memory: MIPSMemory,
+                       symbols: Optional[Dict[str, DataSymbol]] = None) -> Watchpoint:
+        """Watch a .data label (its first element) or an address for changes."""
+        symbols = symbols if symbols is not None else memory.symbols
+        if isinstance(location, str) and location.strip() in symbols:
+            symbol = symbols[location.strip()]
+            watchpoint = Watchpoint(symbol.address, symbol.unit, location.strip())
+        else:
+            address = resolve_address(location, symbols) if isinstance(location, str) else location
+            watchpoint = Watchpoint(address, 4 if address % 4 == 0 else 1, f"0x{address:08X}")
+        self.watchpoints.append(watchpoint)
+        self._watched.append(self._read(memory, watchpoint))
+        return watchpoint
+
+    def remove_watchpoint(self, location: Union[int, str]) -> None:
+        for index, watchpoint in enumerate(self.watchpoints):
+            if location in (watchpoint.name, watchpoint.address):
+                del self.watchpoints[index]
+                del self._watched[index]
+                return
+
+    def sync_watchpoints(self, memory: MIPSMemory) -> None:
+        """Take the current values as the baseline, e.g. after loading a program."""
+        self._watched = [self._read(memory, watchpoint) for watchpoint in self.watchpoints]
+
+    def check_watchpoints(self, memory: MIPSMemory) -> bool:
+        """Record and report the first watched location whose value changed."""
+        for index, watchpoint in enumerate(self.watchpoints):
+            value = self._read(memory, watchpoint)
+            if value != self._watched[index]:
+                self.last_hit = f"Watchpoint {watchpoint.name} changed: {self._watched[index]} -> {value}"
+                self._watched[index] = value
+                return True
+        return False
+
+    def clear(self) -> None:
+        self.lines.clear()
+        self.watchpoints.clear()
+        self._watched.clear()
+        self.paused_at = None
+
+    @staticmethod
+    def _read(memory: MIPSMemory, watchpoint: Watchpoint) -> int:
+        if watchpoint.size == 4:
+            return memory.read_word(watchpoint.address)
+        if watchpoint.size == 2:
+            return memory.read_half(watchpoint.address)
+        return memory.read_byte(watchpoint.address)
@@ -0,0 +1,189 @@
+# cache.py
+from array import array
+from typing import List, NamedTuple, Optional, Sequence
+
+from decoder import DecodedInstruction, LOADS, STORES
+
+REPLACEMENT_POLICIES = ("lru", "fifo", "random")
+WRITE_POLICIES = ("back", "through")
+
+def parse_size(value: str) -> int:
+    """Parse a count such as "64" or "4k" (units of 1024)."""
+    value = value.strip().lower()
+    digits = value[:-1] if value.endswith("k") else value
+    if not digits.isdigit():
+        raise ValueError(f"Invalid size: {value}")
+    return int(digits) * (1024 if value.endswith("k") else 1)
+
+class CacheConfig(NamedTuple):
+    size: int = 4096  # Bytes of data
+    block_size: int = 16
+    associativity: int = 1  # Ways per set; size // block_size for fully associative
+    replacement: str = "lru"  # One of REPLACEMENT_POLICIES
+    write_policy: str = "back"  # "back" (write-allocate) or "through" (no write-allocate)
+    miss_penalty: int = 10  # Cycles per block fetched from, or written back to, memory
+
+    @classmethod
+    def parse(cls, text: str) -> "CacheConfig":
+        """Parse "size=4k,block=16,ways=2,replacement=lru,write=back,penalty=10"; omitted keys keep their defaults."""
+        names = {"size": "size", "block": "block_size", "ways": "associativity", "replacement": "replacement",
+                 "write": "write_policy", "penalty": "miss_penalty"}
+        values = {}
+        for item in filter(None, (part.strip() for part in text.split(","))):
+            key, found, value = item.partition("=")
+            if not found or key.strip() not in names:
+                raise ValueError(f"Invalid cache option: {item}")
+            field, value = names[key.strip()], value.strip().lower()
+            values[field] = value if field in ("replacement", "write_policy") else parse_size(value)
+        return cls(**values).validated()
+
+    def validated(self) -> "CacheConfig":
+        for name in ("size", "block_size", "associativity"):
+            value = getattr(self, name)
+            if value <= 0 or value & (value - 1):
+                raise ValueError(f"Cache {name} must be a power of two, got {value}")
+        if self.block_size < 4 or self.size < self.block_size * self.associativity:
+            raise ValueError(f"A {self.size}-byte cache cannot hold {self.associativity} ways of "
+                             f"{self.block_size}-byte blocks")
+        if self.replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown replacement policy {self.replacement}, use one of {', '.join(REPLACEMENT_POLICIES)}")
+        if self.write_policy not in WRITE_POLICIES:
+            raise ValueError(f"Unknown write policy {self.write_policy}, use back or through")
+        return self
+
+    def __str__(self) -> str:
+        ways = "fully associative" if self.associativity == self.size // self.block_size else \
+            "direct mapped" if self.associativity == 1 else f"{self.associativity}-way"
+        return (f"{self.size} bytes, {self.block_size}-byte blocks, {ways}, {self.replacement.upper()}, "
+                f"write-{self.write_policy}, {self.miss_penalty}-cycle miss penalty")
+
+class MIPSCache:
+    """One set-associative cache level, modelled for statistics only.
+
+    Tags, valid and dirty bits and replacement stamps live in flat arrays
+    indexed by set * associativity + way; no data is stored, since memory
+    itself stays authoritative. Statistics are kept per access site
+    (instruction line) in arrays like the profiler's counters.
+    """
+
+    def __init__(self, config: CacheConfig, instruction_count: int, seed: int = 0):
+        self.config = config.validated()
+        self.ways = config.associativity
+        self.sets = config.size // (config.block_size * config.associativity)
+        self.offset_bits = config.block_size.bit_length() - 1
+        self.set_mask = self.sets - 1
+        self.index_bits = self.sets.bit_length() - 1
+        self.write_back = config.write_policy == "back"
+        self.lru = config.replacement == "lru"
+        self._random = None
+        if config.replacement == "random":
+            import random
+            self._random = random.Random(seed)
+
+        entries = self.sets * self.ways
+        self.tags = array("q", bytes(8 * entries))
+        self.valid = bytearray(entries)
+        self.dirty = bytearray(entries)
+        self.stamps = array("q", bytes(8 * entries))  # Last use (LRU) or fill time (FIFO)
+        self.clock = 0
+
+        self.accesses = array("q", bytes(8 * instruction_count))  # Per access site
+        self.misses = array("q", bytes(8 * instruction_count))
+        self.penalty = array("q", bytes(8 * instruction_count))  # Miss penalty cycles, write-backs included
+        self.writebacks = 0  # Dirty blocks written back (write-back) or words written through
+
+    def access(self, address: int, write: bool, site: int) -> bool:
+        """Look up address for the instruction at line site; returns True on a hit."""
+        self.accesses[site] += 1
+        self.clock += 1
+        block = address >> self.offset_bits
+        tag = block >> self.index_bits
+        base = (block & self.set_mask) * self.ways
+        valid = self.valid
+        tags = self.tags
+        for entry in range(base, base + self.ways):
+            if valid[entry] and tags[entry] == tag:
+                if self.lru:
+                    self.stamps[entry] = self.clock
+                if write:
+                    if self.write_back:
+                        self.dirty[entry] = 1
+                    else:
+                        self.writebacks += 1
+                return True
+
+        self.misses[site] += 1
+        self.penalty[site] += self.config.miss_penalty
+        if write and not self.write_back:
+            self.writebacks += 1  # No write-allocate: the word goes straight to memory
+            return False
+        entry = self._victim(base)
+        if valid[entry] and self.dirty[entry]:
+            self.writebacks += 1
+            self.penalty[site] += self.config.miss_penalty
+        valid[entry] = 1
+        tags[entry] = tag
+        self.dirty[entry] = 1 if write else 0
+        self.stamps[entry] = self.clock
+        return False
+
+    def _victim(self, base: int) -> int:
+        valid = self.valid
+        for entry in range(base, base + self.ways):
+            if not valid[entry]:
+                return entry
+        if self._random is not None:
+            return base + self._random.randrange(self.ways)
+        stamps = self.stamps
+        return min(range(base, base + self.ways), key=stamps.__getitem__)  # Oldest use (LRU) or fill (FIFO)
+
+    def report(self, decoded: List[DecodedInstruction], top: Optional[int] = 20) -> dict:
+        accesses, misses = sum(self.accesses), sum(self.misses)
+        sites = sorted((line for line in range(len(self.misses)) if self.misses[line]),
+                       key=lambda line: -self.penalty[line])
+        return {
+            "config": str(self.config),
+            "accesses": accesses,
+            "hits": accesses - misses,
+            "misses": misses,
+            "miss_rate": round(misses / accesses, 4) if accesses else 0.0,
+            "writebacks": self.writebacks,
+            "penalty_cycles": sum(self.penalty),
+            "sites": [
+                {"address": decoded[line].address, "source": decoded[line].source, "accesses": self.accesses[line],
+                 "misses": self.misses[line], "miss_rate": round(self.misses[line] / self.accesses[line], 4),
+                 "penalty_cycles": self.penalty[line]}
+                for line in sites[:top]
+            ],
+        }
+
+class MIPSCacheHierarchy:
+    """Optional instruction and data caches fed by the executor before each instruction runs."""
+
+    def __init__(self, decoded: List[DecodedInstruction], addresses: Sequence[int],
+                 icache: Optional[CacheConfig] = None, dcache: Optional[CacheConfig] = None):
+        """addresses holds the byte address of each instruction followed by the end of the text."""
+        self.decoded = decoded
+        # Every machine word of each line, so pseudo-instructions fetch all the words they expand to
+        self.fetch_addresses = [range(addresses[line], addresses[line + 1], 4) for line in range(len(decoded))]
+        self.icache = MIPSCache(icache, len(decoded)) if icache else None
+        self.dcache = MIPSCache(dcache, len(decoded)) if dcache else None
+
+    def before(self, line: int, d: DecodedInstruction, registers: Sequence[int]) -> None:
+        """Fetch the words of the instruction at line and, for loads and stores, access its data address."""
+        if self.icache is not None:
+            for address in self.fetch_addresses[line]:
+                self.icache.access(address, False, line)
+        if self.dcache is not None:
+            if d.op in LOADS:
+                self.dcache.access(registers[d.rs] + d.imm, False, line)
+            elif d.op in STORES:
+                self.dcache.access(registers[d.rs] + d.imm, True, line)
+
+    def report(self, top: Optional[int] = 20) -> dict:
+        report = {}
+        if self.icache is not None:
+            report["icache"] = self.icache.report(self.decoded, top)
+        if self.dcache is not None:
+            report["dcache"] = self.dcache.report(self.decoded, top)
+        return report
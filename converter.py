@@ -1,186 +1,307 @@
 # converter.py
-from typing import Optional, Dict, Match
-import re
-from dataclasses import dataclass
-
-@dataclass
-class InstructionFormat:
-    opcode: str
-    rs: str = "00000"
-    rt: str = "00000"
-    rd: str = "00000"
-    shamt: str = "00000"
-    funct: str = "000000"
-    immediate: str = "0000000000000000"
-    address: str = "00000000000000000000000000"
+import sys
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from decoder import immediate16, parse_immediate, resolve_address
+from memory import TEXT_BASE
+from parser import DataSymbol
+from register_file import REGISTER_INDEX
+
+AT = REGISTER_INDEX["$at"]  # Assembler temporary used by pseudo-instruction expansions
+
+class TextLayout(NamedTuple):
+    """First assembler pass over a text section."""
+    addresses: List[int]  # Byte address of each source line
+    sizes: List[int]  # Machine words each line assembles to (0 for a label-only line)
+    labels: Dict[str, int]  # Text label -> byte address of the instruction it is attached to
+    end: int  # Byte address just past the last instruction
+
+def encode_r(rs: int, rt: int, rd: int, shamt: int, funct: int) -> int:
+    return (rs << 21) | (rt << 16) | (rd << 11) | (shamt << 6) | funct
+
+def encode_i(opcode: int, rs: int, rt: int, immediate: int) -> int:
+    return (opcode << 26) | (rs << 21) | (rt << 16) | (immediate & 0xFFFF)
+
+def encode_j(opcode: int, target: int) -> int:
+    return (opcode << 26) | (target & 0x3FFFFFF)
 
 class MIPSConverter:
-    def __init__(self):
-        self._load_instruction_maps()
-        self._compile_regex_patterns()
-
-    def _load_instruction_maps(self) -> None:
-        """Load instruction mapping dictionaries."""
-        self.REGISTER_MAP = {
-            "$zero": "00000", "$at": "00001", "$v0": "00010", "$v1": "00011",
-            "$a0": "00100", "$a1": "00101", "$a2": "00110", "$a3": "00111",
-            "$t0": "01000", "$t1": "01001", "$t2": "01010", "$t3": "01011",
-            "$t4": "01100", "$t5": "01101", "$t6": "01110", "$t7": "01111",
-            "$s0": "10000", "$s1": "10001", "$s2": "10010", "$s3": "10011",
-            "$s4": "10100", "$s5": "10101", "$s6": "10110", "$s7": "10111",
-            "$t8": "11000", "$t9": "11001", "$k0": "11010", "$k1": "11011",
-            "$gp": "11100", "$sp": "11101", "$fp": "11110", "$ra": "11111"
-        }
-        
-        self.OPCODE_MAP = {
-            "add": "000000", "sub": "000000", "mul": "011000", "div": "011010",
-            "and": "100100", "or": "100101", "xor": "000000",
-            "sll": "000000", "srl": "000010",
-            "addi": "001000", "lw": "100011", "sw": "101011", "beq": "000100", 
-            "bne": "000101", "j": "000010", "jal": "000011", "slt": "101010", 
-            "jr": "001000"
-        }
-        
-        self.FUNCTION_MAP = {
-            "add": "100000", "sub": "100010", "mul": "011000", "div": "011010",
-            "and": "100100", "or": "100101", "xor": "100110",
-            "sll": "000000", "srl": "000010",
-            "slt": "101010", "jr": "001000"
-        }
-
-    def _compile_regex_patterns(self) -> None:
-        """Compile regex patterns used in parsing."""
-        self.MEMORY_ACCESS_PATTERN = re.compile(r'(-?\d+)\((\$\w+)\)')
-
-    def convert_to_machine_code(self, instruction: str) -> str:
-        """Convert MIPS instruction to machine code."""
-        try:
-            parts = [part.strip() for part in instruction.replace(",", " ").split()]
-            command = parts[0]
-            
-            if command.endswith(":"):  # Skip labels
-                return None
-                
-            handlers = {
-                'r': self._handle_r_type,
-                'i': self._handle_i_type,
-                'j': self._handle_j_type
-            }
-            
-            instruction_type = self._get_instruction_type(command)
-            handler = handlers.get(instruction_type)
-            
-            if handler:
-                return handler(command, parts[1:])
-            
-            raise ValueError(f"Unsupported instruction: {command}")
-            
-        except Exception as e:
-            return f"Error: {str(e)}"
-
-    def _handle_r_type(self, command, parts):
-        rd, rs, rt = parts
-        rd_bin = self._convert_operand(rd, "register")
-        rs_bin = self._convert_operand(rs, "register")
-        rt_bin = self._convert_operand(rt, "register")
-        func_code = self._convert_operand(command, "function")
-
-        if rd_bin and rs_bin and rt_bin and func_code:
-            return f"000000{rs_bin}{rt_bin}{rd_bin}00000{func_code}"
-        return None
-    
-    def _handle_i_type(self, command, parts):
-        if command in ["lw", "sw"]:
-            rt, address = parts
-            
-            match = None
-            offset = None
-            base = None
-
-            import re
-            match = re.match(r'(-?\d+)\((\$\w+)\)', address)
-            if match:
-                offset = match.group(1)
-                base = match.group(2)
+    """Assembles MIPS instructions into 32-bit machine words.
+
+    Words are built as integers with shifts and masks; binary strings are
+    only produced for display.
+    """
+
+    # R-format function codes (opcode 0)
+    FUNCTION_MAP = {
+        "sll": 0x00, "srl": 0x02, "sllv": 0x04, "srlv": 0x06,
+        "jr": 0x08, "syscall": 0x0C,
+        "add": 0x20, "addu": 0x21, "sub": 0x22, "subu": 0x23,
+        "and": 0x24, "or": 0x25, "xor": 0x26, "slt": 0x2A,
+    }
+    OPCODE_MAP = {
+        "j": 0x02, "jal": 0x03, "beq": 0x04, "bne": 0x05,
+        "addi": 0x08, "addiu": 0x09, "slti": 0x0A, "andi": 0x0C, "ori": 0x0D, "lui": 0x0F,
+        "lb": 0x20, "lh": 0x21, "lw": 0x23, "lbu": 0x24, "lhu": 0x25,
+        "sb": 0x28, "sh": 0x29, "sw": 0x2B,
+    }
+    R_TYPE = {"add", "addu", "sub", "subu", "and", "or", "xor", "slt"}
+    SHIFTS = {"sll", "srl"}
+    VARIABLE_SHIFTS = {"sllv", "srlv"}
+    SIGNED_IMMEDIATE = {"addi", "addiu", "slti"}
+    UNSIGNED_IMMEDIATE = {"andi", "ori"}
+    MEMORY = {"lw", "sw", "lb", "lbu", "lh", "lhu", "sb", "sh"}
+    BRANCHES = {"beq", "bne"}
+    JUMPS = {"j", "jal"}
+
+    def encode(self, instruction: str, address: int = TEXT_BASE, labels: Optional[Dict[str, int]] = None,
+               symbols: Optional[Dict[str, DataSymbol]] = None) -> List[int]:
+        """Encode one source line at address into machine words.
+
+        Pseudo-instructions may expand to several words. labels maps text
+        labels to byte addresses; when it is None, branch and jump targets
+        encode as 0 (used to size instructions before labels are known).
+        """
+        parts = [part.strip() for part in instruction.replace(",", " ").split()]
+        while parts and parts[0].endswith(":"):  # Skip labels
+            parts = parts[1:]
+        if not parts:
+            return []
+        return self._encode(parts[0], parts[1:], address, labels, symbols or {})
+
+    def assemble(self, instructions: List[str], symbols: Optional[Dict[str, DataSymbol]] = None,
+                 base_address: int = TEXT_BASE, labels: Optional[Dict[str, int]] = None) -> array:
+        """Assemble a whole text section into a program image of 32-bit words.
+
+        labels is the text symbol table from a layout() of the same lines,
+        e.g. the one the executor was loaded with; it is worked out here if
+        not given.
+        """
+        image = array("I")
+        for words in self._assemble_lines(instructions, symbols or {}, base_address, labels=labels):
+            image.extend(words)
+        return image
+
+    def assemble_listing(self, instructions: List[str], symbols: Optional[Dict[str, DataSymbol]] = None,
+                         base_address: int = TEXT_BASE,
+                         labels: Optional[Dict[str, int]] = None) -> List[Tuple[str, str]]:
+        """(source, binary machine code) pairs for display; errors are reported per line."""
+        listing = []
+        lines = self._assemble_lines(instructions, symbols or {}, base_address, keep_errors=True, labels=labels)
+        for source, words in zip(instructions, lines):
+            if isinstance(words, str):
+                listing.append((source, f"Error: {words}"))
             else:
-                offset = "0"
-                base = "$gp"
-
-            rt_bin = self._convert_operand(rt, "register")
-            offset_bin = self._convert_operand(offset, "immediate")
-            base_bin = self._convert_operand(base, "register")
-
-            if rt_bin and offset_bin and base_bin:
-                opcode_bin = self._convert_operand(command, "opcode")
-                return f"{opcode_bin}{base_bin}{rt_bin}{offset_bin}"
-            return None
-
-        elif command in ["beq", "bne"]:
-            rs, rt, offset = parts
-            rs_bin = self._convert_operand(rs, "register")
-            rt_bin = self._convert_operand(rt, "register")
-            offset_bin = self._convert_operand(offset, "immediate")
-            opcode_bin = self._convert_operand(command, "opcode")
-            
-            if rs_bin and rt_bin and offset_bin and opcode_bin:
-                return f"{opcode_bin}{rs_bin}{rt_bin}{offset_bin}"
-            return None
-            
-        elif command in ["addi"]:
-            rt, rs, immediate = parts
-            rt_bin = self._convert_operand(rt, "register")
-            rs_bin = self._convert_operand(rs, "register")
-            immediate_bin = self._convert_operand(immediate, "immediate")
-            opcode_bin = self._convert_operand(command, "opcode")
-
-            if rt_bin and rs_bin and immediate_bin and opcode_bin:
-                return f"{opcode_bin}{rs_bin}{rt_bin}{immediate_bin}"
-            return None
-        
-        return None
-
-    def _handle_j_type(self, command, parts):
-        target = parts[0]
-        opcode_bin = self._convert_operand(command, "opcode")
+                listing.append((source, " ".join(self.format_binary(word) for word in words)))
+        return listing
+
+    def layout(self, instructions: List[str], symbols: Optional[Dict[str, DataSymbol]] = None,
+               base_address: int = TEXT_BASE) -> TextLayout:
+        """First pass: byte address of every line and text label, accounting for pseudo-instruction expansion."""
+        addresses = []
+        sizes = []
+        labels = {}
+        address = base_address
+        for instruction in instructions:
+            addresses.append(address)
+            for label in self.defined_labels(instruction):
+                labels[label] = address
+            size = self.size(instruction, symbols)
+            sizes.append(size)
+            address += 4 * size
+        return TextLayout(addresses, sizes, labels, address)
+
+    @staticmethod
+    def defined_labels(instruction: str) -> List[str]:
+        """Labels defined at the start of a source line, e.g. ["loop"] for "loop: add $t0 $t0 $t1"."""
+        labels = []
+        for part in instruction.replace(",", " ").split():
+            if not part.endswith(":"):
+                break
+            labels.append(part[:-1])
+        return labels
+
+    def size(self, instruction: str, symbols: Optional[Dict[str, DataSymbol]] = None) -> int:
+        """Machine words a source line assembles to; branch and jump targets do not affect it."""
         try:
-            target_int = int(target)
-            target_bin = format(target_int, "026b")
-            return f"{opcode_bin}{target_bin}"
+            return len(self.encode(instruction, TEXT_BASE, None, symbols))
         except ValueError:
-            return None
+            return 1  # Keep following addresses stable; the error is reported in the second pass
 
-    def _convert_operand(self, operand, type):
-        if type == "register":
-            if operand in self.REGISTER_MAP:
-                return self.REGISTER_MAP[operand]
-        elif type == "immediate":
+    def _assemble_lines(self, instructions: List[str], symbols: Dict[str, DataSymbol], base_address: int,
+                        keep_errors: bool = False, labels: Optional[Dict[str, int]] = None) -> List:
+        if labels is None:
+            labels = self.layout(instructions, symbols, base_address).labels
+        address = base_address
+        lines = []
+        for instruction in instructions:
             try:
-                imm_int = int(operand)
-                if imm_int < 0:
-                    imm_int = imm_int & 0xFFFF  # Keep only the lower 16 bits
-                return format(imm_int, '016b')
-            except ValueError:
-                return None
-        elif type == "opcode":
-            if operand in self.OPCODE_MAP:
-                return self.OPCODE_MAP[operand]
-        elif type == "function":
-            if operand in self.FUNCTION_MAP:
-                return self.FUNCTION_MAP[operand]
-
-        return None
-
-    def _get_instruction_type(self, command: str) -> str:
-        """Determine instruction type (r, i, or j)."""
-        r_type = {'add', 'sub', 'and', 'or', 'xor', 'sll', 'srl', 'slt'}
-        i_type = {'addi', 'lw', 'sw', 'beq', 'bne', 'li'}
-        j_type = {'j', 'jal', 'jr'}
-
-        if command in r_type:
-            return 'r'
-        elif command in i_type:
-            return 'i'
-        elif command in j_type:
-            return 'j'
+                words = self.encode(instruction, address, labels, symbols)
+            except ValueError as e:
+                if not keep_errors:
+                    raise ValueError(f"{instruction}: {e}") from None
+                lines.append(str(e))
+                address += 4 * self.size(instruction, symbols)  # The words layout() gave the line
+                continue
+            lines.append(words)
+            address += 4 * len(words)
+        return lines
+
+    @staticmethod
+    def to_bytes(image: array, byteorder: str = "little") -> bytes:
+        """Serialise a program image with the given byte order."""
+        words = array("I", image)
+        if byteorder != sys.byteorder:
+            words.byteswap()
+        return words.tobytes()
+
+    def write_binary(self, path: str, image: array, byteorder: str = "little") -> None:
+        with open(path, "wb") as output:
+            output.write(self.to_bytes(image, byteorder))
+
+    @staticmethod
+    def format_binary(word: int) -> str:
+        return format(word, "032b")
+
+    def _encode(self, command: str, operands: List[str], address: int, labels: Optional[Dict[str, int]],
+                symbols: Dict[str, DataSymbol]) -> List[int]:
+        if command in self.R_TYPE:
+            rd, rs, rt = self._operands(command, operands, 3)
+            return [encode_r(self._register(rs), self._register(rt), self._register(rd), 0, self.FUNCTION_MAP[command])]
+
+        if command in self.SHIFTS:
+            rd, rt, amount = self._operands(command, operands, 3)
+            if amount.startswith("$"):
+                return [encode_r(self._register(amount), self._register(rt), self._register(rd), 0,
+                                 self.FUNCTION_MAP[command + "v"])]
+            shamt = parse_immediate(amount)
+            if not 0 <= shamt < 32:
+                raise ValueError(f"Shift amount out of range: {shamt}")
+            return [encode_r(0, self._register(rt), self._register(rd), shamt, self.FUNCTION_MAP[command])]
+
+        if command in self.VARIABLE_SHIFTS:
+            rd, rt, rs = self._operands(command, operands, 3)
+            return [encode_r(self._register(rs), self._register(rt), self._register(rd), 0, self.FUNCTION_MAP[command])]
+
+        if command == "jr":
+            rs, = self._operands(command, operands, 1)
+            return [encode_r(self._register(rs), 0, 0, 0, self.FUNCTION_MAP["jr"])]
+
+        if command == "syscall":
+            self._operands(command, operands, 0)
+            return [self.FUNCTION_MAP["syscall"]]
+
+        if command in self.SIGNED_IMMEDIATE or command in self.UNSIGNED_IMMEDIATE:
+            rt, rs, immediate = self._operands(command, operands, 3)
+            value = self._immediate16(parse_immediate(immediate), signed=command in self.SIGNED_IMMEDIATE)
+            return [encode_i(self.OPCODE_MAP[command], self._register(rs), self._register(rt), value)]
+
+        if command == "lui":
+            rt, immediate = self._operands(command, operands, 2)
+            value = self._immediate16(parse_immediate(immediate), signed=False)
+            return [encode_i(self.OPCODE_MAP["lui"], 0, self._register(rt), value)]
+
+        if command == "li":
+            rt, immediate = self._operands(command, operands, 2)
+            return self._load_immediate(self._register(rt), parse_immediate(immediate))
+
+        if command == "la":
+            rt, label = self._operands(command, operands, 2)
+            if labels is not None and label in labels:
+                target = labels[label]
+            elif labels is None and label not in symbols:
+                target = 0  # Text label, resolved in the second pass
+            else:
+                target = resolve_address(label, symbols)
+            return [encode_i(self.OPCODE_MAP["lui"], 0, AT, target >> 16),
+                    encode_i(self.OPCODE_MAP["ori"], AT, self._register(rt), target)]
+
+        if command in self.MEMORY:
+            rt, memory_address = self._operands(command, operands, 2)
+            return self._memory_access(command, self._register(rt), memory_address, symbols)
+
+        if command in self.BRANCHES:
+            rs, rt, target = self._operands(command, operands, 3)
+            offset = self._branch_offset(target, address, labels)
+            return [encode_i(self.OPCODE_MAP[command], self._register(rs), self._register(rt), offset)]
+
+        if command in self.JUMPS:
+            target, = self._operands(command, operands, 1)
+            return [encode_j(self.OPCODE_MAP[command], self._jump_target(target, address, labels))]
+
+        raise ValueError(f"Unsupported instruction: {command}")
+
+    def _load_immediate(self, rt: int, value: int) -> List[int]:
+        if -0x8000 <= value < 0x8000:
+            return [encode_i(self.OPCODE_MAP["addiu"], 0, rt, value)]
+        if 0 <= value <= 0xFFFF:
+            return [encode_i(self.OPCODE_MAP["ori"], 0, rt, value)]
+        value &= 0xFFFFFFFF
+        return [encode_i(self.OPCODE_MAP["lui"], 0, AT, value >> 16),
+                encode_i(self.OPCODE_MAP["ori"], AT, rt, value)]
+
+    def _memory_access(self, command: str, rt: int, memory_address: str, symbols: Dict[str, DataSymbol]) -> List[int]:
+        opcode = self.OPCODE_MAP[command]
+        offset, paren, base = memory_address.partition("(")
+        base_register = 0
+        if paren:
+            if not base.endswith(")"):
+                raise ValueError(f"Invalid memory address format: {memory_address}")
+            base_register = self._register(base[:-1].strip())
+        value = resolve_address(offset, symbols) if offset.strip() else 0
+
+        if paren and -0x8000 <= value < 0x8000:
+            return [encode_i(opcode, base_register, rt, value)]
+
+        # Absolute address: lui $at, %hi; [addu $at, $at, base;] op rt, %lo($at)
+        value &= 0xFFFFFFFF
+        high = ((value + 0x8000) >> 16) & 0xFFFF  # %lo is sign-extended by the load/store
+        words = [encode_i(self.OPCODE_MAP["lui"], 0, AT, high)]
+        if base_register:
+            words.append(encode_r(AT, base_register, AT, 0, self.FUNCTION_MAP["addu"]))
+        words.append(encode_i(opcode, AT, rt, value))
+        return words
+
+    @staticmethod
+    def _branch_offset(target: str, address: int, labels: Optional[Dict[str, int]]) -> int:
+        if target.lstrip("-").isdigit():
+            offset = int(target)  # Literal word offset
+        elif labels is None:
+            return 0
+        elif target in labels:
+            offset = (labels[target] - (address + 4)) >> 2
         else:
-            raise ValueError(f"Unknown instruction type for command: {command}")
\ No newline at end of file
+            raise ValueError(f"Unknown label: {target}")
+        if not -0x8000 <= offset < 0x8000:
+            raise ValueError(f"Branch target out of range: {target}")
+        return offset
+
+    @staticmethod
+    def _jump_target(target: str, address: int, labels: Optional[Dict[str, int]]) -> int:
+        if target.isdigit():
+            return int(target)  # Literal 26-bit target field
+        if labels is None:
+            return 0
+        if target not in labels:
+            raise ValueError(f"Unknown label: {target}")
+        destination = labels[target]
+        if (destination ^ (address + 4)) & 0xF0000000:
+            raise ValueError(f"Jump target out of range: {target}")
+        return destination >> 2
+
+    @staticmethod
+    def _immediate16(value: int, signed: bool) -> int:
+        return immediate16(value, signed) & 0xFFFF
+
+    @staticmethod
+    def _register(name: str) -> int:
+        if name not in REGISTER_INDEX:
+            raise ValueError(f"Register {name} not found")
+        return REGISTER_INDEX[name]
+
+    @staticmethod
+    def _operands(command: str, operands: List[str], count: int) -> List[str]:
+        if len(operands) != count:
+            raise ValueError(f"{command} expects {count} operands, got {len(operands)}")
+        return operands
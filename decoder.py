@@ -0,0 +1,229 @@
+# decoder.py
+from typing import Dict, List, Optional, Callable
+
+from register_file import RegisterFile
+from parser import DataSymbol
+from memory import TEXT_BASE
+
+STORES = {"sw", "sh", "sb"}  # Memory instructions that write
+LOADS = {"lw", "lh", "lhu", "lb", "lbu"}
+BRANCHES = {"beq", "bne"}
+CALLS = {"jal", "jr"}  # Instructions the call graph follows
+
+class IllegalInstructionError(Exception):
+    """Raised when an instruction cannot be executed: an unsupported opcode or operands that did not decode."""
+    pass
+
+def parse_immediate(value: str) -> int:
+    """Parse a decimal or 0x-prefixed hexadecimal immediate."""
+    value = value.strip()
+    if value.lower().startswith(("0x", "-0x")):
+        return int(value, 16)
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid immediate value {value}") from None
+
+def immediate16(value: int, signed: bool) -> int:
+    """Range-check an I-format immediate: -32768..32767 if sign-extended, 0..65535 if zero-extended (andi/ori)."""
+    low, high = (-0x8000, 0x7FFF) if signed else (0, 0xFFFF)
+    if not low <= value <= high:
+        raise ValueError(f"Immediate out of range: {value}")
+    return value
+
+def resolve_address(expression: str, symbols: Dict[str, DataSymbol]) -> int:
+    """Resolve an integer, a data label or label+/-offset to an address."""
+    expression = expression.strip()
+    for sign in ("+", "-"):
+        label, found, offset = expression.partition(sign)
+        if found and label in symbols:
+            delta = parse_immediate(offset)
+            return symbols[label].address + (delta if sign == "+" else -delta)
+    if expression in symbols:
+        return symbols[expression].address
+    try:
+        return parse_immediate(expression)
+    except ValueError:
+        raise ValueError(f"Unknown data label: {expression}") from None
+
+def text_addresses(instructions: List[dict]) -> List[int]:
+    """Byte address of each assembled instruction, followed by the end of the text section."""
+    addresses = [int(instruction["address"], 16) for instruction in instructions]
+    addresses.append(addresses[-1] + 4 * instructions[-1]["size"] if instructions else TEXT_BASE)
+    return addresses
+
+class DecodedInstruction:
+    """A text-section line decoded once at load time.
+
+    Operands are resolved to register numbers, integer immediates and
+    instruction indices so the executor can dispatch without string work.
+    Labels are byte addresses from the assembler's symbol table: a branch
+    keeps its PC-relative word offset in imm, as encoded in machine code,
+    and a jump its absolute target address; link() turns either into the
+    index of the target instruction.
+    A plain __slots__ class keeps attribute access in the run loop fast and
+    avoids generating dataclass code at import time.
+    """
+    __slots__ = ("op", "source", "address", "rd", "rs", "rt", "imm", "target", "label", "dest", "error", "handler")
+
+    def __init__(self, op: str, source: str = "", address: str = ""):
+        self.op = op                # Mnemonic, "" for a label-only line
+        self.source = source
+        self.address = address
+        self.rd = 0
+        self.rs = 0
+        self.rt = 0
+        self.imm = 0                # Immediate, shift amount, memory offset, branch word offset or jump address
+        self.target = -1            # Instruction index of a branch/jump target, set by MIPSDecoder.link
+        self.label = ""             # Label operand (branch/jump target or data label)
+        self.dest = 0               # Register written by the instruction, 0 if none
+        self.error = ""             # Decode error reported when the line is executed
+        self.handler: Optional[Callable[["DecodedInstruction"], Optional[str]]] = None
+
+    def __repr__(self) -> str:
+        return f"DecodedInstruction({self.op!r}, source={self.source!r}, address={self.address!r})"
+
+class MIPSDecoder:
+    R_TYPE = {"add", "sub", "and", "or", "xor", "slt"}
+    SHIFTS = {"sll", "srl"}
+    VARIABLE_SHIFTS = {"sllv", "srlv"}
+    I_TYPE = {"addi", "andi", "ori"}
+    MEMORY = {"lw", "sw", "lb", "lbu", "lh", "lhu", "sb", "sh"}
+    BRANCHES = {"beq", "bne"}
+    JUMPS = {"j", "jal"}
+
+    def decode_program(self, instructions: List[dict], labels: Dict[str, int],
+                       symbols: Optional[Dict[str, DataSymbol]] = None) -> List[DecodedInstruction]:
+        """Decode assembled instructions; labels maps text labels to byte addresses."""
+        symbols = symbols or {}
+        decoded = [self.decode(instruction, labels, symbols) for instruction in instructions]
+        self.link(decoded, text_addresses(instructions))
+        return decoded
+
+    @staticmethod
+    def link(decoded: List[DecodedInstruction], addresses: List[int]) -> None:
+        """Set each branch and jump target to the index of the instruction at its target address.
+
+        addresses is text_addresses() of the program. Labels always name an
+        instruction or the end of the text, so every target is found.
+        """
+        lines = {}
+        for line in range(len(addresses) - 1, -1, -1):
+            lines[addresses[line]] = line  # Backwards, so a label-only last line wins the end address it shares
+        for d in decoded:
+            if d.op in MIPSDecoder.BRANCHES and not d.error:
+                d.target = lines[int(d.address, 16) + 4 + (d.imm << 2)]
+            elif d.op in MIPSDecoder.JUMPS and not d.error:
+                d.target = lines[d.imm]
+
+    def decode(self, instruction: dict, labels: Dict[str, int], symbols: Optional[Dict[str, DataSymbol]] = None) -> DecodedInstruction:
+        """Decode one parsed instruction, recording operand errors instead of raising."""
+        source = instruction["source"]
+        parts = [part.strip() for part in source.replace(",", " ").split()]
+        # Skip leading labels, e.g. "loop: add $t0, $t0, $t1"
+        while parts and parts[0].endswith(":"):
+            parts = parts[1:]
+
+        decoded = DecodedInstruction(op=parts[0] if parts else "", source=source, address=instruction["address"])
+        if not parts:
+            return decoded
+        try:
+            self._decode_operands(decoded, parts[1:], labels, symbols or {})
+        except (ValueError, KeyError, IndexError) as e:
+            decoded.error = str(e)
+        return decoded
+
+    def _decode_operands(self, decoded: DecodedInstruction, operands: List[str], labels: Dict[str, int],
+                         symbols: Dict[str, DataSymbol]) -> None:
+        op = decoded.op
+        if op in self.R_TYPE:
+            dest, src1, src2 = self._expect(op, operands, 3)
+            decoded.rd = decoded.dest = self._register(dest)
+            decoded.rs = self._register(src1)
+            decoded.rt = self._register(src2)
+        elif op in self.SHIFTS:
+            dest, src, amount = self._expect(op, operands, 3)
+            decoded.rd = decoded.dest = self._register(dest)
+            decoded.rt = self._register(src)
+            if amount.startswith("$"):
+                decoded.op = op + "v"  # Shift amount taken from a register
+                decoded.rs = self._register(amount)
+            else:
+                decoded.imm = self._immediate(amount)
+        elif op in self.VARIABLE_SHIFTS:
+            dest, src, amount = self._expect(op, operands, 3)
+            decoded.rd = decoded.dest = self._register(dest)
+            decoded.rt = self._register(src)
+            decoded.rs = self._register(amount)
+        elif op in self.I_TYPE:
+            dest, src, immediate = self._expect(op, operands, 3)
+            decoded.rt = decoded.dest = self._register(dest)
+            decoded.rs = self._register(src)
+            decoded.imm = immediate16(self._immediate(immediate), signed=op == "addi")  # andi/ori zero-extend
+        elif op == "li":
+            dest, immediate = self._expect(op, operands, 2)
+            decoded.rt = decoded.dest = self._register(dest)
+            decoded.imm = self._immediate(immediate)
+        elif op in self.MEMORY:
+            register, memory_address = self._expect(op, operands, 2)
+            decoded.rt = self._register(register)
+            if op.startswith("l"):
+                decoded.dest = decoded.rt
+            # offset(base), label, label+offset or label(base); labels become absolute addresses
+            offset, paren, base = memory_address.partition("(")
+            if paren:
+                if not base.endswith(")"):
+                    raise ValueError(f"Invalid memory address format: {memory_address}")
+                decoded.rs = self._register(base[:-1].strip())
+            decoded.imm = self._address(offset, symbols) if offset.strip() else 0
+            if not offset.lstrip("-").isdigit():
+                decoded.label = offset
+        elif op == "la":
+            dest, label = self._expect(op, operands, 2)
+            decoded.rt = decoded.dest = self._register(dest)
+            decoded.label = label
+            if label in labels:
+                decoded.imm = labels[label]  # Text label
+            else:
+                decoded.imm = self._address(label, symbols)
+        elif op in self.BRANCHES:
+            src1, src2, label = self._expect(op, operands, 3)
+            decoded.rs = self._register(src1)
+            decoded.rt = self._register(src2)
+            decoded.label = label
+            decoded.imm = (self._label(label, labels) - (int(decoded.address, 16) + 4)) >> 2
+        elif op in self.JUMPS:
+            label, = self._expect(op, operands, 1)
+            decoded.label = label
+            decoded.imm = self._label(label, labels)
+            if op == "jal":
+                decoded.dest = RegisterFile.index_of("$ra")
+        elif op == "jr":
+            register, = self._expect(op, operands, 1)
+            decoded.rs = self._register(register)
+        elif op == "syscall":
+            self._expect(op, operands, 0)
+
+    @staticmethod
+    def _expect(op: str, operands: List[str], count: int) -> List[str]:
+        if len(operands) != count:
+            raise ValueError(f"{op} expects {count} operands, got {len(operands)}")
+        return operands
+
+    @staticmethod
+    def _register(name: str) -> int:
+        return RegisterFile.index_of(name)
+
+    @staticmethod
+    def _immediate(value: str) -> int:
+        return parse_immediate(value)
+
+    @staticmethod
+    def _address(expression: str, symbols: Dict[str, DataSymbol]) -> int:
+        return resolve_address(expression, symbols)
+
+    @staticmethod
+    def _label(label: str, labels: Dict[str, int]) -> int:
+        if label not in labels:
+            raise ValueError(f"Unknown label: {label}")
+        return labels[label]
@@ -1,253 +1,787 @@
 # executor.py
-from typing import List, Dict, Optional, Callable
+from array import array
+from typing import List, Dict, NamedTuple, Callable, Optional, Sequence, TYPE_CHECKING
 from mips_commands import MIPSProcessor
-from memory import MIPSMemory
-import re
+from memory import MIPSMemory, MemoryError, TEXT_BASE
+from decoder import (MIPSDecoder, DecodedInstruction, IllegalInstructionError, BRANCHES, CALLS, STORES,
+                     text_addresses)
+from block_compiler import MIPSBlockCompiler
+from breakpoints import MIPSBreakpoints
+from log_buffer import LOG_ALL, LOG_BRANCHES
+from register_file import REGISTER_NAMES
+
+if TYPE_CHECKING:  # Optional models are imported when they are first enabled
+    from journal import MIPSJournal
+    from snapshot import MachineSnapshot
+    from profiler import MIPSProfiler, MIPSCallGraph
+    from pipeline import MIPSPipeline
+    from cache import CacheConfig, MIPSCacheHierarchy
+    from predictor import MIPSBranchPredictor, PredictorConfig
+
+WORD_MASK = 0xFFFFFFFF
+
+class RunResult(NamedTuple):
+    steps: int
+    reason: str  # "exit" (syscall 10), "end" (ran past the text), "limit" (step budget used up), "error",
+                 # "breakpoint", "watchpoint" or "start" (reverse execution reached the oldest recorded state)
+
+def _signed(value: int) -> int:
+    return value - 0x100000000 if value & 0x80000000 else value
 
 class MIPSExecutor:
+    # Mnemonic -> handler method, bound once per executor
+    HANDLER_NAMES = {
+        # R-Format
+        "add": "_handle_add",
+        "sub": "_handle_sub",
+        "and": "_handle_and",
+        "or": "_handle_or",
+        "xor": "_handle_xor",
+        "sll": "_handle_sll",
+        "srl": "_handle_srl",
+        "sllv": "_handle_sllv",
+        "srlv": "_handle_srlv",
+        "slt": "_handle_slt",
+        # I-Format
+        "lw": "_handle_lw",
+        "sw": "_handle_sw",
+        "lb": "_handle_lb",
+        "lbu": "_handle_lbu",
+        "lh": "_handle_lh",
+        "lhu": "_handle_lhu",
+        "sb": "_handle_sb",
+        "sh": "_handle_sh",
+        "addi": "_handle_addi",
+        "beq": "_handle_beq",
+        "bne": "_handle_bne",
+        "li": "_handle_li",
+        "la": "_handle_li",
+        "andi": "_handle_andi",
+        "ori": "_handle_ori",
+        # J-Format
+        "j": "_handle_j",
+        "jal": "_handle_jal",
+        "jr": "_handle_jr",
+        # System
+        "syscall": "_handle_syscall",
+    }
+
     def __init__(self, commands: MIPSProcessor, memory: MIPSMemory, labels: Dict[str, int], pc_update_callback: Callable[[int], None], ui_log_callback: Callable[[str], None]):
         self.commands = commands
+        self.registers = commands.registers.values
         self.memory = memory
-        self.labels = labels
-        self.program_counter = 0
+        self.labels = labels  # Text label -> byte address
+        self.label_lines: Dict[str, int] = {}  # Text label -> instruction index
+        self.program_counter = TEXT_BASE
         self.current_line = 0
+        self.addresses = array("q", [TEXT_BASE])  # Byte address per instruction, then the end of the text
+        self._line_of_word = array("q", [0])  # Instruction index per text word, -1 inside a multi-word instruction
         self.pc_update_callback = pc_update_callback
         self.ui_log_callback = ui_log_callback
         self.instructions = []
+        self.decoded: List[DecodedInstruction] = []
+        self.decoder = MIPSDecoder()
+        self.halted = False
+        self._trace = True  # Build per-instruction log messages (off while running)
+        self.log_level = LOG_ALL  # Which step() messages reach ui_log_callback, see log_buffer
+        self.block_compiler = MIPSBlockCompiler(self)
+        self.use_blocks = True  # run() executes compiled basic blocks instead of single instructions
+        self.breakpoints = MIPSBreakpoints()
+        self.journal: Optional["MIPSJournal"] = None  # Set by enable_reverse() to record undo history
+        self._program_id: Optional[int] = None  # See program_id
+        self.profiler: Optional["MIPSProfiler"] = None  # Set by enable_profiling()
+        self.call_graph: Optional["MIPSCallGraph"] = None  # Set by enable_call_graph()
+        self.pipeline: Optional["MIPSPipeline"] = None  # Set by enable_pipeline()
+        self.caches: Optional["MIPSCacheHierarchy"] = None  # Set by enable_caches()
+        self.predictor: Optional["MIPSBranchPredictor"] = None  # Set by enable_branch_prediction()
 
     def set_instructions(self, instructions: List[dict]):
+        """Load and decode the text section and set the PC to its first instruction."""
         self.instructions = instructions
+        self.decoded = self.decoder.decode_program(instructions, self.labels, self.memory.symbols)
+        for decoded in self.decoded:
+            decoded.handler = self._resolve_handler(decoded)
+        self._map_addresses()
+        self.block_compiler.load(self.decoded, self.label_lines)
+        self._program_id = None
+        if self.profiler is not None:
+            self.enable_profiling()  # Counters are per program
+        if self.call_graph is not None:
+            self.enable_call_graph()
+        if self.pipeline is not None:
+            self.enable_pipeline(self.pipeline.forwarding)
+        if self.caches is not None:
+            caches = self.caches
+            self.enable_caches(caches.icache and caches.icache.config, caches.dcache and caches.dcache.config)
+        if self.predictor is not None:
+            self.enable_branch_prediction(self.predictor.config)
+        self.halted = False
+        self.current_line = 0
+        self._set_pc(0)
+
+    @property
+    def program_id(self) -> int:
+        """Fingerprint of the loaded text section, stored in snapshots; worked out on first use."""
+        if self._program_id is None:
+            from snapshot import program_fingerprint
+            self._program_id = program_fingerprint(instruction["source"] for instruction in self.instructions)
+        return self._program_id
+
+    def _map_addresses(self) -> None:
+        addresses = self.addresses = array("q", text_addresses(self.instructions))
+        line_of_word = self._line_of_word = array("q", [-1] * ((addresses[-1] - TEXT_BASE) // 4 + 1))
+        for line in range(len(addresses) - 1, -1, -1):
+            line_of_word[(addresses[line] - TEXT_BASE) >> 2] = line  # A label-only last line wins the end address
+        self.label_lines = {label: self.line_at(address) for label, address in self.labels.items()}
+
+    @property
+    def end_address(self) -> int:
+        """Byte address just past the text section; jumping there ends the program."""
+        return self.addresses[-1]
+
+    def line_at(self, address: int) -> int:
+        """Index of the instruction at a byte address (len(decoded) at the end of the text), or -1."""
+        offset = address - TEXT_BASE
+        if offset < 0 or offset & 3 or offset >> 2 >= len(self._line_of_word):
+            return -1
+        return self._line_of_word[offset >> 2]
+
+    def jump_line(self, address: int) -> int:
+        """Index of the instruction a jr to address continues at; raises MemoryError if there is none."""
+        line = self.line_at(address)
+        if line < 0:
+            raise MemoryError(f"Jump to 0x{address:08X}, which is not the address of an instruction")
+        return line
+
+    def _resolve_handler(self, decoded: DecodedInstruction):
+        if not decoded.op:
+            return None  # Label-only line
+        if decoded.error:
+            return self._handle_decode_error
+        name = self.HANDLER_NAMES.get(decoded.op)
+        return getattr(self, name) if name else self._handle_unsupported
+
+    def is_finished(self) -> bool:
+        return self.halted or self.current_line >= len(self.decoded)
+
+    def step(self) -> bool:
+        """Execute the instruction at the current line. Returns False if there is nothing left to run."""
+        # Skip label-only lines
+        while not self.is_finished() and self.decoded[self.current_line].handler is None:
+            self.current_line += 1
+        if self.is_finished():
+            self._set_pc(self.current_line)
+            return False
 
-    def execute_instruction(self, instruction: dict):
         # Clear previous register highlight
         self.commands.clear_highlight()
+        self.breakpoints.paused_at = None
 
-        while True:
-            line = instruction["source"]
-            address = instruction["address"]
-            parts = [part.strip() for part in line.replace(",", " ").split()]
-            command = parts[0]
-            
-            if command.endswith(":"):
-                self._increment_pc_and_line()
-                if self.current_line < len(self.instructions):
-                    instruction = self.instructions[self.current_line]
-                    continue
-                else:
-                    self.ui_log_callback("\n=== Program execution completed ===")
-                    return
-            break
-        
-        self.pc_update_callback(self.program_counter)
-        self.ui_log_callback(f"Executing at {address}: {line}")
+        decoded = self.decoded[self.current_line]
+        self._set_pc(self.current_line)
+        level = self.log_level
+        if level >= LOG_ALL:
+            self.ui_log_callback(f"Executing at {decoded.address}: {decoded.source}")
 
-        handler = self._get_instruction_handler(command)
-        if handler:
-            result = handler(command, parts[1:])
-            if result:
-                self.ui_log_callback(result)
-            else:
-                self.ui_log_callback(f"Executed: {line}")
+        line = self.current_line
+        if self.journal is not None:
+            self._record(line, decoded)
+        if self.profiler is not None:
+            self._profile(self.profiler, line, decoded)
+        if self.caches is not None:
+            self.caches.before(line, decoded, self.registers)
+        self.current_line += 1
+        failed = False
+        self._trace = level >= LOG_BRANCHES  # Branch and jump handlers log their own messages
+        try:
+            result = decoded.handler(decoded)
+        except (MemoryError, IllegalInstructionError) as e:
+            self.halted = True
+            result = f"Error: {e}"
+            failed = True
+            self._fault(line)
         else:
-            self.ui_log_callback(f"Unsupported instruction: {command}")
-        
-        self._increment_pc_and_line()
-        
+            if self.call_graph is not None and decoded.op in CALLS:
+                self._follow_call(self.call_graph, line, decoded, 1)
+            self._time(line, decoded)
+            if decoded.op in STORES and self.breakpoints.watchpoints:
+                breakpoints = self.breakpoints
+                if breakpoints.check_watchpoints(self.memory):
+                    self.ui_log_callback(f"{breakpoints.last_hit} at {decoded.address}: {decoded.source}")
+                breakpoints.sync_watchpoints(self.memory)  # Later runs compare against the values after this step
+        finally:
+            self._trace = True
+        if self.call_graph is not None:
+            self.call_graph.clock += 1
+        if failed or level >= LOG_ALL:
+            self.ui_log_callback(result or f"Executed: {decoded.source}")
+        elif level >= LOG_BRANCHES and decoded.op == "syscall" and result:
+            self.ui_log_callback(result)
+        if decoded.dest:
+            self.commands.show_register(decoded.dest)
+        self._set_pc(self.current_line)
+
         # Check if this was the last instruction
-        if self.current_line >= len(self.instructions):
+        if self.is_finished() and not failed:
             self.ui_log_callback("\n=== Program execution completed ===")
-    
-    def _increment_pc_and_line(self):
-        self.program_counter += 4
-        self.pc_update_callback(self.program_counter)
-        self.current_line += 1
-        
-    def _get_instruction_handler(self, command):
-        instruction_map = {
-            # R-Format
-            "add": self._handle_r_type_arithmetic,
-            "sub": self._handle_r_type_arithmetic,
-            "and": self._handle_r_type_logical,
-            "or": self._handle_r_type_logical,
-            "xor": self._handle_r_type_logical,
-            "sll": self._handle_shift,
-            "srl": self._handle_shift,
-            "slt": self._handle_slt,
-            # I-Format
-            "lw": self._handle_lw,
-            "sw": self._handle_sw,
-            "addi": self._handle_addi,
-            "beq": self._handle_branch,
-            "bne": self._handle_branch,
-            "li": self._handle_li,
-            "andi": self._handle_logical_immediate,
-            "ori": self._handle_logical_immediate,
-            # J-Format
-            "j": self._handle_jump,
-            "jal": self._handle_jump,
-            "jr": self._handle_jr,
-            # System
-            "syscall": self._handle_syscall,
-        }
-        return instruction_map.get(command)
-    
-    def _handle_r_type_arithmetic(self, command, parts):
-        dest, src1, src2 = parts
-        self.commands.execute_arithmetic(dest, src1, src2, command)
-
-    def _handle_r_type_logical(self, command, parts):
-        dest, src1, src2 = parts
-        operation_map = {
-            "and": lambda x, y: x & y,
-            "or": lambda x, y: x | y,
-            "xor": lambda x, y: x ^ y
-        }
-        operation = operation_map.get(command)
-        if operation:
-            self.commands.execute_logical(dest, src1, src2, operation)
-        else:
-            self.ui_log_callback(f"Error: Invalid R-type logical operation: {command}")
-    
-    def _handle_shift(self, command, parts):
-      dest, src1, shift_amount = parts
-      
-      if isinstance(shift_amount, str) and shift_amount.startswith("$"):
-          shift_value = self.commands.get_register_value(shift_amount)
-      else:
-          try:
-              shift_value = int(shift_amount)
-          except ValueError:
-              self.ui_log_callback(f"Error: Invalid shift amount: {shift_amount}")
-              return None
-      
-      operation_map = {
-          "sll": lambda x, y: x << y,
-          "srl": lambda x, y: x >> y
-      }
-
-      operation = operation_map.get(command)
-      if operation:
-        self.commands.execute_shift(dest, src1, shift_value, operation)
-      else:
-        self.ui_log_callback(f"Error: Invalid shift operation: {command}")
-
-    def _handle_lw(self, _, parts):
-        register, memory_address = parts
-        
+        return True
+
+    def run(self, max_steps: int) -> RunResult:
+        """Execute up to max_steps instructions without per-step UI updates.
+
+        Logging is muted and the register view is not touched for the
+        duration of the run; callers refresh their widgets afterwards.
+        Whole basic blocks are run as compiled functions while the step
+        budget allows; the remainder is interpreted one instruction at a time.
+        While breakpoints or watchpoints are set, reverse execution is
+        recording, or calls, pipeline timing, caches or branch prediction
+        are being modelled, an instrumented loop handles every instruction
+        instead.
+        """
+        if self.breakpoints.armed or self.journal is not None or self.call_graph is not None \
+                or self.pipeline is not None or self.caches is not None or self.predictor is not None:
+            return self._run_instrumented(max_steps)
+        steps = 0
+        if self.use_blocks:
+            steps = self._run_blocks(max_steps)
+            if steps < 0:
+                return RunResult(-steps - 1, "error")
+        return self._interpret(max_steps, steps)
+
+    def _run_blocks(self, max_steps: int) -> int:
+        """Run compiled blocks that fit in max_steps; returns the steps taken, or -(steps + 1) on an error."""
+        count = len(self.decoded)
+        block_at = self.block_compiler.block_at
+        blocks = self.block_compiler.blocks
+        steps = 0
+        line = self.current_line
+        block = None
         try:
-            match = re.match(r'(-?\d+)\((\$\w+)\)', memory_address)
-            if match:
-                offset = int(match.group(1))
-                base_reg = match.group(2)
-                base_value = self.commands.get_register_value(base_reg)
-                memory_loc = base_value + offset
-                
-                try:
-                    value = self.memory.read_word(memory_loc)
-                    self.commands.update_register_value(register, value)
-                    return f"Loaded {value} from memory location {memory_loc} into {register}"
-                except ValueError as e:
-                    return f"Error reading from memory: {str(e)}"
-            elif memory_address in self.memory.data_section:
-                value = self.memory.data_section[memory_address]
-                self.commands.update_register_value(register, value)
-                self.memory.update_data_memory(memory_address, value)
-                return f"Loaded {value} from {memory_address} into {register}"
-            else:
-              return f"Invalid memory address: {memory_address}"
-        except ValueError as e:
-            return f"Error in load word: {str(e)}"
+            while not self.halted and line < count:
+                block = blocks.get(line) or block_at(line)
+                if steps + block.length > max_steps:
+                    break
+                line = block.run()
+                steps += block.length
+        except (MemoryError, IllegalInstructionError) as e:
+            fault = self.block_compiler.fault_line(block, e.__traceback__)
+            if self.profiler is not None:
+                self.profiler.block_faulted(block, fault, self.decoded)
+            self.halted = True
+            self.current_line = fault  # The PC stays on the faulting instruction
+            self._set_pc(self.current_line)
+            self.ui_log_callback(f"Error at {self.decoded[fault].address}: {e}")
+            return -(steps + self.block_compiler.executed_before(block, fault) + 1)
+        self.current_line = line
+        return steps
+
+    def _interpret(self, max_steps: int, steps: int = 0) -> RunResult:
+        decoded = self.decoded
+        count = len(decoded)
+        profiler = self.profiler
+        self._trace = False
+        try:
+            line = self.current_line
+            while steps < max_steps and not self.halted and line < count:
+                instruction = decoded[line]
+                self.current_line = line + 1
+                handler = instruction.handler
+                if handler is not None:
+                    if profiler is not None:
+                        self._profile(profiler, line, instruction)
+                    handler(instruction)
+                    steps += 1
+                line = self.current_line
+        except (MemoryError, IllegalInstructionError) as e:
+            self.halted = True
+            self._fault(line)
+            self.ui_log_callback(f"Error at {instruction.address}: {e}")
+            return RunResult(steps, "error")
+        finally:
+            self._trace = True
+            self._set_pc(self.current_line)
+
+        if self.halted:
+            return RunResult(steps, "exit")
+        if self.current_line >= count:
+            return RunResult(steps, "end")
+        return RunResult(steps, "limit")
 
-    def _handle_sw(self, _, parts):
-        src_reg, memory_address = parts
+    def _run_instrumented(self, max_steps: int) -> RunResult:
+        """Interpret instructions, stopping before a breakpoint line or after a watched location changes."""
+        decoded = self.decoded
+        count = len(decoded)
+        journal = self.journal
+        profiler = self.profiler
+        call_graph = self.call_graph
+        timing = self.pipeline is not None or self.predictor is not None
+        caches = self.caches
+        breakpoints = self.breakpoints
+        lines = breakpoints.lines
+        watching = bool(breakpoints.watchpoints)
+        resume_line = breakpoints.paused_at  # Do not stop again at the breakpoint we are resuming from
+        breakpoints.paused_at = None
+        steps = 0
+        self._trace = False
         try:
-            match = re.match(r'(-?\d+)\((\$\w+)\)', memory_address)
-            if match:
-                offset = int(match.group(1))
-                base_reg = match.group(2)
-                base_value = self.commands.get_register_value(base_reg)
-                memory_loc = base_value + offset
-                value = self.commands.get_register_value(src_reg)
-                
-                try:
-                    self.memory.write_word(memory_loc, value)
-                    return f"Stored {value} at memory location {memory_loc}"
-                except ValueError as e:
-                    return f"Error writing to memory: {str(e)}"
-            elif memory_address in self.memory.data_section:
-                value = self.commands.get_register_value(src_reg)
-                self.memory.update_data_memory(memory_address, value)
-                self.memory.data_section[memory_address] = value
-                return f"Stored {value} in {memory_address}"
+            line = self.current_line
+            while steps < max_steps and not self.halted and line < count:
+                instruction = decoded[line]
+                if line in lines and line != resume_line and breakpoints.should_break(line, self.registers):
+                    breakpoints.paused_at = line
+                    condition = lines[line]
+                    breakpoints.last_hit = f"Breakpoint at {instruction.address}: {instruction.source}" + (
+                        f" ({condition})" if condition else "")
+                    self.ui_log_callback(breakpoints.last_hit)
+                    return RunResult(steps, "breakpoint")
+                resume_line = None
+                self.current_line = line + 1
+                handler = instruction.handler
+                if handler is not None:
+                    if journal is not None:
+                        self._record(line, instruction)
+                    if profiler is not None:
+                        self._profile(profiler, line, instruction)
+                    if caches is not None:
+                        caches.before(line, instruction, self.registers)
+                    handler(instruction)
+                    steps += 1
+                    if call_graph is not None and instruction.op in CALLS:
+                        self._follow_call(call_graph, line, instruction, steps)
+                    if timing:
+                        self._time(line, instruction)
+                    if watching and instruction.op in STORES and breakpoints.check_watchpoints(self.memory):
+                        self.ui_log_callback(f"{breakpoints.last_hit} at {instruction.address}: {instruction.source}")
+                        return RunResult(steps, "watchpoint")
+                line = self.current_line
+        except (MemoryError, IllegalInstructionError) as e:
+            self.halted = True
+            self._fault(line)
+            self.ui_log_callback(f"Error at {instruction.address}: {e}")
+            return RunResult(steps, "error")
+        finally:
+            self._trace = True
+            if call_graph is not None:
+                call_graph.clock += steps
+            self._set_pc(self.current_line)
+
+        if self.halted:
+            return RunResult(steps, "exit")
+        if self.current_line >= count:
+            return RunResult(steps, "end")
+        return RunResult(steps, "limit")
+
+    def _fault(self, line: int) -> None:
+        """Leave the PC on an instruction that raised, and drop what was recorded for it before it ran."""
+        self.current_line = line
+        if self.journal is not None:
+            self.journal.undo(self.registers, self.memory)
+        if self.profiler is not None:
+            self.profiler.faulted(line)
+
+    def snapshot(self) -> "MachineSnapshot":
+        """Capture registers, PC and memory. Memory pages are shared copy-on-write, so this is cheap."""
+        from snapshot import MachineSnapshot
+        return MachineSnapshot(
+            array("I", self.registers), self.program_counter, self.current_line, self.halted,
+            self.memory.snapshot_pages(), dict(self.memory.symbols), self.program_id,
+            self.memory.config.byteorder,
+        )
+
+    def restore(self, snapshot: "MachineSnapshot") -> None:
+        """Return to a snapshot taken from the same program; undo history is discarded."""
+        if snapshot.program != self.program_id:
+            raise ValueError("Snapshot was taken from a different program")
+        if snapshot.byteorder != self.memory.config.byteorder:
+            raise ValueError(f"Snapshot memory is {snapshot.byteorder}-endian")
+        self.registers[:] = snapshot.registers
+        self.memory.restore_pages(snapshot.pages)
+        self.memory.symbols = dict(snapshot.symbols)
+        self.current_line = snapshot.current_line
+        self.halted = snapshot.halted
+        if self.journal is not None:
+            from journal import MIPSJournal
+            journal = self.journal
+            self.journal = MIPSJournal(journal.capacity, journal.checkpoint_interval, journal.max_checkpoints)
+        self.breakpoints.paused_at = None
+        self.breakpoints.sync_watchpoints(self.memory)
+        self._set_pc(self.current_line)
+
+    def enable_profiling(self) -> "MIPSProfiler":
+        """Start counting executions, branch outcomes and memory accesses for the loaded program."""
+        from profiler import MIPSProfiler
+        self.profiler = MIPSProfiler(len(self.decoded))
+        self.block_compiler.set_profiler(self.profiler)
+        return self.profiler
+
+    def instruction_counts(self) -> Sequence[int]:
+        """Executions per instruction line so far (all zero when not profiling)."""
+        if self.profiler is None:
+            return [0] * len(self.decoded)
+        return self.profiler.instruction_counts(self.block_compiler.blocks, self.decoded)
+
+    def instruction_count(self, line: int) -> int:
+        """Executions of one instruction line so far, for redrawing a single row after a step."""
+        if self.profiler is None:
+            return 0
+        return self.profiler.instruction_count(line, self.block_compiler.blocks, self.decoded)
+
+    def profile_report(self, top: Optional[int] = 20) -> dict:
+        return self.profiler.report(self.decoded, self.label_lines, self.block_compiler.blocks, top)
+
+    def _profile(self, profiler: "MIPSProfiler", line: int, instruction: DecodedInstruction) -> None:
+        """Count an interpreted instruction before it runs; a branch's outcome is read from its operands."""
+        profiler.before(line, instruction, self.registers)
+        if instruction.op in BRANCHES:
+            r = self.registers
+            if (r[instruction.rs] == r[instruction.rt]) == (instruction.op == "beq"):
+                profiler.taken[line] += 1
+
+    def _unprofile(self, profiler: "MIPSProfiler", line: int, instruction: DecodedInstruction) -> None:
+        """Reverse _profile() for an undone instruction, once the registers it ran with are restored."""
+        profiler.undo(line, instruction, self.registers)
+        if instruction.op in BRANCHES:
+            r = self.registers
+            if (r[instruction.rs] == r[instruction.rt]) == (instruction.op == "beq"):
+                profiler.taken[line] -= 1
+
+    def enable_call_graph(self) -> "MIPSCallGraph":
+        """Start following jal/jr to build a call graph; the entry frame is named after the label at the current line."""
+        from profiler import MIPSCallGraph
+        root = next((label for label, line in self.label_lines.items() if line == self.current_line), "(entry)")
+        self.call_graph = MIPSCallGraph(root)
+        return self.call_graph
+
+    def _follow_call(self, call_graph: "MIPSCallGraph", line: int, instruction: DecodedInstruction, steps: int) -> None:
+        """Report an executed jal/jr; steps is the number of instructions run since call_graph.clock was last updated."""
+        call_graph.event(instruction, line, self.current_line, call_graph.clock + steps)
+
+    def enable_pipeline(self, forwarding: bool = True) -> "MIPSPipeline":
+        """Start estimating cycles on a five-stage pipeline for the loaded program."""
+        from pipeline import MIPSPipeline
+        self.pipeline = MIPSPipeline(self.decoded, forwarding)
+        if self.predictor is not None:
+            self.pipeline.set_branch_penalty(self.predictor.config.penalty)
+        return self.pipeline
+
+    def enable_caches(self, icache: Optional["CacheConfig"] = None,
+                      dcache: Optional["CacheConfig"] = None) -> "MIPSCacheHierarchy":
+        """Start modelling an instruction cache, a data cache or both for the loaded program."""
+        from cache import MIPSCacheHierarchy
+        self.caches = MIPSCacheHierarchy(self.decoded, self.addresses, icache, dcache)
+        return self.caches
+
+    def enable_branch_prediction(self, config: Optional["PredictorConfig"] = None) -> "MIPSBranchPredictor":
+        """Start scoring a branch prediction scheme; with a pipeline model, mispredictions decide its flushes."""
+        from predictor import MIPSBranchPredictor
+        self.predictor = MIPSBranchPredictor(self.decoded, config)
+        if self.pipeline is not None:
+            self.pipeline.set_branch_penalty(self.predictor.config.penalty)  # Flushes cost what the predictor reports
+        return self.predictor
+
+    def _time(self, line: int, instruction: DecodedInstruction) -> None:
+        """Feed an executed instruction to the branch predictor and the pipeline model, whichever are enabled."""
+        mispredicted = None
+        if self.predictor is not None and instruction.op in BRANCHES:
+            mispredicted = self.predictor.observe(line, self.current_line)
+        if self.pipeline is not None:
+            self.pipeline.issue(line, self.current_line, mispredicted)
+
+    def enable_reverse(self, journal: Optional["MIPSJournal"] = None) -> None:
+        """Start recording undo history so step_back() and reverse_continue() can be used."""
+        from journal import MIPSJournal
+        self.journal = journal or MIPSJournal()
+
+    def disable_reverse(self) -> None:
+        """Stop recording and drop the history, so run() can use compiled blocks again."""
+        self.journal = None
+
+    def _record(self, line: int, instruction: DecodedInstruction) -> None:
+        journal = self.journal
+        if journal.position >= journal.next_checkpoint:
+            journal.take_checkpoint(line, self.halted, self.registers, self.memory)
+        journal.record(line, instruction, self.registers, self.memory)
+
+    def step_back(self, count: int = 1) -> int:
+        """Undo up to count instructions; returns how many were undone.
+
+        Recent history is undone from the journal; older states are rebuilt
+        from the nearest checkpoint by replaying forward.
+        """
+        journal = self.journal
+        if journal is None:
+            return 0
+        target = max(journal.position - count, journal.earliest)
+        undone = journal.position - target
+        while journal.position > target:
+            if journal.size:
+                self._undo()
+            elif self.profiler is not None:
+                self._rebuild_history()  # Every undone instruction must be uncounted, so refill the ring
             else:
-                return f"Invalid memory address format: {memory_address}"
-        except ValueError as e:
-            return f"Error in store word: {str(e)}"
-
-    def _handle_slt(self, _, parts):
-        dest, src1, src2 = parts
-        self.commands.execute_slt(dest, src1, src2)
-
-    def _handle_branch(self, command, parts):
-        reg1, reg2, label = parts
-        val1 = self.commands.get_register_value(reg1)
-        val2 = self.commands.get_register_value(reg2)
-        
-        if command == "beq" and val1 == val2:
-            self._jump_to_label(label, f"Branching to {label} (PC={self.program_counter})")
-        elif command == "bne" and val1 != val2:
-            self._jump_to_label(label, f"Branching to {label} (PC={self.program_counter})")
-    
-    def _handle_jump(self, command, parts):
-        label = parts[0]
-        if command == "j":
-           self._jump_to_label(label, f"Jumping to {label} (PC={self.program_counter})")
-        elif command == "jal":
-            next_instruction = self.program_counter + 4
-            self.commands.update_register_value("$ra", next_instruction)
-            self._jump_to_label(label, f"Jumping to {label} and storing return address (PC={self.program_counter})")
-
-    def _jump_to_label(self, label, log_message):
-      self.program_counter = self.labels[label] * 4
-      self.current_line = self.labels[label]
-      self.pc_update_callback(self.program_counter)
-      self.ui_log_callback(log_message)
-
-    def _handle_addi(self, _, parts):
-        dest, src1, immediate = parts
-        self.commands.execute_addi(dest, src1, int(immediate))
-    
-    def _handle_jr(self, _, parts):
-        register = parts[0]
-        return_address = self.commands.get_register_value(register)
-        
-        # Set PC to return address
-        self.program_counter = return_address - 4  # Subtract 4 because PC will be incremented after this
-        self.current_line = (return_address - 4) // 4
-        self.pc_update_callback(self.program_counter)
-        
-        self.ui_log_callback(f"Returning to address {return_address:08X}")
+                checkpoint = journal.restore_checkpoint(target, self.registers, self.memory)
+                self.current_line = checkpoint.line
+                self.halted = checkpoint.halted
+                self._replay(target - checkpoint.position)
+        self.breakpoints.paused_at = None
+        self.breakpoints.sync_watchpoints(self.memory)
+        self._set_pc(self.current_line)
+        return undone
+
+    def _undo(self) -> int:
+        """Undo the latest journal entry and uncount it; returns its line."""
+        line = self.current_line = self.journal.undo(self.registers, self.memory)
+        self.halted = False
+        if self.profiler is not None:
+            self._unprofile(self.profiler, line, self.decoded[line])
+        return line
 
-    def _handle_li(self, _, parts):
-        dest, immediate = parts
+    def _replay(self, steps: int) -> None:
+        """Run steps instructions forward, recording them, without stopping at breakpoints."""
+        breakpoints, self.breakpoints = self.breakpoints, MIPSBreakpoints()
+        profiler, self.profiler = self.profiler, None  # Replayed instructions were already counted
+        call_graph, self.call_graph = self.call_graph, None
+        pipeline, self.pipeline = self.pipeline, None
+        caches, self.caches = self.caches, None
+        predictor, self.predictor = self.predictor, None
         try:
-            value = int(immediate)
-            self.commands.update_register_value(dest, value)
-            return f"Loaded {value} into {dest}"
-        except ValueError:
-            return f"Error: Invalid immediate value {immediate}"
-
-    def _handle_syscall(self, _, parts):
-        service = self.commands.get_register_value("$v0")
+            self._run_instrumented(steps)
+        finally:
+            self.breakpoints = breakpoints
+            self.profiler = profiler
+            self.call_graph = call_graph
+            self.pipeline = pipeline
+            self.caches = caches
+            self.predictor = predictor
+
+    def reverse_continue(self) -> RunResult:
+        """Step back until a breakpoint line or a watched location change is reached.
+
+        Stops with "start" at the oldest state still reachable.
+        """
+        from journal import NO_ADDRESS
+        journal = self.journal
+        breakpoints = self.breakpoints
+        # Undo returns executed lines, so a breakpoint on a label-only line is checked at the instruction after it
+        targets = {self._instruction_line(line): line for line in breakpoints.lines}
+        steps = 0
+        reason = "start"
+        while journal is not None:
+            if not journal.size:
+                if journal.position <= journal.earliest:
+                    break
+                self._rebuild_history()  # Refill the ring from the previous checkpoint
+                continue
+            address = journal.last_address()
+            line = self._undo()
+            steps += 1
+            if line in targets and breakpoints.should_break(targets[line], self.registers):
+                instruction = self.decoded[line]
+                breakpoints.last_hit = f"Breakpoint at {instruction.address}: {instruction.source}"
+                reason = "breakpoint"
+                break
+            if address != NO_ADDRESS and breakpoints.watchpoints and breakpoints.check_watchpoints(self.memory):
+                reason = "watchpoint"
+                break
+        if reason != "start":
+            self.ui_log_callback(breakpoints.last_hit)
+        breakpoints.paused_at = self.current_line if reason == "breakpoint" else None
+        breakpoints.sync_watchpoints(self.memory)
+        self._set_pc(self.current_line)
+        return RunResult(steps, reason)
+
+    def _instruction_line(self, line: int) -> int:
+        """First line at or after line that is not label-only."""
+        while line < len(self.decoded) and self.decoded[line].handler is None:
+            line += 1
+        return line
+
+    def _rebuild_history(self) -> None:
+        position = self.journal.position
+        checkpoint = self.journal.restore_checkpoint(position - 1, self.registers, self.memory)
+        self.current_line = checkpoint.line
+        self.halted = checkpoint.halted
+        self._replay(position - checkpoint.position)
+
+    def _set_pc(self, line: int):
+        addresses = self.addresses
+        self.program_counter = addresses[line] if line < len(addresses) else addresses[-1]
+        self.pc_update_callback(self.program_counter)
+
+    def _jump(self, target: int):
+        self.current_line = target
+        self.program_counter = self.addresses[target]
+
+    def _handle_unsupported(self, decoded):
+        raise IllegalInstructionError(f"Unsupported instruction: {decoded.op}")
+
+    def _handle_decode_error(self, decoded):
+        raise IllegalInstructionError(decoded.error)
+
+    def _handle_add(self, d):
+        if d.rd:
+            r = self.registers
+            r[d.rd] = (r[d.rs] + r[d.rt]) & WORD_MASK
+
+    def _handle_sub(self, d):
+        if d.rd:
+            r = self.registers
+            r[d.rd] = (r[d.rs] - r[d.rt]) & WORD_MASK
+
+    def _handle_and(self, d):
+        if d.rd:
+            r = self.registers
+            r[d.rd] = r[d.rs] & r[d.rt]
+
+    def _handle_or(self, d):
+        if d.rd:
+            r = self.registers
+            r[d.rd] = r[d.rs] | r[d.rt]
+
+    def _handle_xor(self, d):
+        if d.rd:
+            r = self.registers
+            r[d.rd] = r[d.rs] ^ r[d.rt]
+
+    def _handle_sll(self, d):
+        if d.rd:
+            r = self.registers
+            r[d.rd] = (r[d.rt] << d.imm) & WORD_MASK
+
+    def _handle_srl(self, d):
+        if d.rd:
+            r = self.registers
+            r[d.rd] = r[d.rt] >> d.imm
+
+    def _handle_sllv(self, d):
+        if d.rd:
+            r = self.registers
+            r[d.rd] = (r[d.rt] << (r[d.rs] & 31)) & WORD_MASK
+
+    def _handle_srlv(self, d):
+        if d.rd:
+            r = self.registers
+            r[d.rd] = r[d.rt] >> (r[d.rs] & 31)
+
+    def _handle_slt(self, d):
+        if d.rd:
+            r = self.registers
+            r[d.rd] = 1 if _signed(r[d.rs]) < _signed(r[d.rt]) else 0
+
+    def _handle_addi(self, d):
+        if d.rt:
+            r = self.registers
+            r[d.rt] = (r[d.rs] + d.imm) & WORD_MASK
+
+    def _handle_andi(self, d):
+        if d.rt:
+            r = self.registers
+            r[d.rt] = (r[d.rs] & d.imm) & WORD_MASK
+
+    def _handle_ori(self, d):
+        if d.rt:
+            r = self.registers
+            r[d.rt] = (r[d.rs] | d.imm) & WORD_MASK
+
+    def _handle_li(self, d):
+        if d.rt:
+            self.registers[d.rt] = d.imm & WORD_MASK
+        if self._trace:
+            return f"Loaded {d.imm} into {REGISTER_NAMES[d.rt]}"
+
+    def _handle_lw(self, d):
+        r = self.registers
+        memory_loc = r[d.rs] + d.imm
+        value = self.memory.read_word(memory_loc)
+        if d.rt:
+            r[d.rt] = value & WORD_MASK
+        if self._trace:
+            return f"Loaded {value} from memory location {memory_loc} into {REGISTER_NAMES[d.rt]}"
+
+    def _handle_sw(self, d):
+        value = self.registers[d.rt]
+        memory_loc = self.registers[d.rs] + d.imm
+        self.memory.write_word(memory_loc, value)
+        if self._trace:
+            return f"Stored {value} at memory location {memory_loc}"
+
+    def _handle_lb(self, d):
+        memory_loc = self.registers[d.rs] + d.imm
+        value = self.memory.read_byte(memory_loc)
+        if value & 0x80:
+            value -= 0x100  # Sign-extend
+        return self._load(d, value, memory_loc)
+
+    def _handle_lbu(self, d):
+        memory_loc = self.registers[d.rs] + d.imm
+        return self._load(d, self.memory.read_byte(memory_loc), memory_loc)
+
+    def _handle_lh(self, d):
+        memory_loc = self.registers[d.rs] + d.imm
+        value = self.memory.read_half(memory_loc)
+        if value & 0x8000:
+            value -= 0x10000  # Sign-extend
+        return self._load(d, value, memory_loc)
+
+    def _handle_lhu(self, d):
+        memory_loc = self.registers[d.rs] + d.imm
+        return self._load(d, self.memory.read_half(memory_loc), memory_loc)
+
+    def _load(self, d, value, memory_loc):
+        if d.rt:
+            self.registers[d.rt] = value & WORD_MASK
+        if self._trace:
+            return f"Loaded {value} from memory location {memory_loc} into {REGISTER_NAMES[d.rt]}"
+
+    def _handle_sb(self, d):
+        value = self.registers[d.rt] & 0xFF
+        memory_loc = self.registers[d.rs] + d.imm
+        self.memory.write_byte(memory_loc, value)
+        if self._trace:
+            return f"Stored {value} at memory location {memory_loc}"
+
+    def _handle_sh(self, d):
+        value = self.registers[d.rt] & 0xFFFF
+        memory_loc = self.registers[d.rs] + d.imm
+        self.memory.write_half(memory_loc, value)
+        if self._trace:
+            return f"Stored {value} at memory location {memory_loc}"
+
+    def _handle_beq(self, d):
+        r = self.registers
+        if r[d.rs] == r[d.rt]:
+            self._jump(d.target)
+            if self._trace:
+                self.ui_log_callback(f"Branching to {d.label} (PC={self.program_counter})")
+
+    def _handle_bne(self, d):
+        r = self.registers
+        if r[d.rs] != r[d.rt]:
+            self._jump(d.target)
+            if self._trace:
+                self.ui_log_callback(f"Branching to {d.label} (PC={self.program_counter})")
+
+    def _handle_j(self, d):
+        self._jump(d.target)
+        if self._trace:
+            self.ui_log_callback(f"Jumping to {d.label} (PC={self.program_counter})")
+
+    def _handle_jal(self, d):
+        self.registers[31] = self.addresses[self.current_line]  # Return address: the instruction after the jal
+        self._jump(d.target)
+        if self._trace:
+            self.ui_log_callback(f"Jumping to {d.label} and storing return address (PC={self.program_counter})")
+
+    def _handle_jr(self, d):
+        return_address = self.registers[d.rs]
+        self._jump(self.jump_line(return_address))
+        if self._trace:
+            self.ui_log_callback(f"Returning to address {return_address:08X}")
+
+    def _handle_syscall(self, d):
+        service = self.registers[2]  # $v0
         if service == 10:  # Exit program
+            self.halted = True
             return "Program exit requested"
-        return f"Syscall service {service} executed"
-
-    def _handle_logical_immediate(self, command, parts):
-        dest, src1, immediate = parts
-        try:
-            imm_value = int(immediate)
-            self.commands.execute_logical_immediate(dest, src1, imm_value, command)
-            return f"Executed {command} {dest}, {src1}, {immediate}"
-        except ValueError:
-            return f"Error: Invalid immediate value {immediate}"
\ No newline at end of file
+        if self._trace:
+            return f"Syscall service {service} executed"
@@ -0,0 +1,114 @@
+# journal.py
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from decoder import DecodedInstruction, STORES
+from memory import MIPSMemory, MemoryError
+
+NO_ADDRESS = -1  # Journal entry without a memory write
+
+class Checkpoint(NamedTuple):
+    position: int  # Instructions executed when the checkpoint was taken
+    line: int
+    halted: bool
+    registers: array
+    pages: Dict[int, bytearray]  # Copy-on-write page table from MIPSMemory.snapshot_pages()
+
+class MIPSJournal:
+    """Undo journal for reverse execution.
+
+    Before each instruction runs, the old value of the register it writes and,
+    for stores, the old word at the store address are appended to a ring of
+    parallel arrays, so one entry costs about 21 bytes and the ring's size
+    is fixed. Full checkpoints (copy-on-write memory snapshots) every
+    checkpoint_interval instructions let the executor go back further than
+    the ring reaches by restoring a checkpoint and replaying forward.
+    """
+
+    def __init__(self, capacity: int = 1 << 18, checkpoint_interval: int = 100_000, max_checkpoints: int = 16):
+        self.capacity = capacity
+        self.checkpoint_interval = checkpoint_interval
+        self.max_checkpoints = max_checkpoints
+        self.lines = array("i", bytes(4 * capacity))
+        self.registers = array("B", bytes(capacity))
+        self.register_values = array("I", bytes(4 * capacity))
+        self.addresses = array("q", bytes(8 * capacity))
+        self.memory_values = array("I", bytes(4 * capacity))
+        self.head = 0  # Next slot to write
+        self.size = 0  # Entries currently held
+        self.position = 0  # Instructions executed since recording started
+        self.checkpoints: List[Checkpoint] = []
+        self.next_checkpoint = 0
+
+    @property
+    def earliest(self) -> int:
+        """Earliest position that can be returned to."""
+        if self.checkpoints:
+            return min(self.checkpoints[0].position, self.position - self.size)
+        return self.position - self.size
+
+    def record(self, line: int, d: DecodedInstruction, registers: Sequence[int], memory: MIPSMemory) -> None:
+        """Save what the decoded instruction d at line is about to overwrite."""
+        i = self.head
+        self.lines[i] = line
+        self.registers[i] = d.dest
+        self.register_values[i] = registers[d.dest]
+        address = NO_ADDRESS
+        if d.op in STORES:
+            address = (registers[d.rs] + d.imm) & ~3
+            try:
+                self.memory_values[i] = memory.read_word(address)
+            except MemoryError:
+                address = NO_ADDRESS  # The store itself will fail
+        self.addresses[i] = address
+        self.head = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        self.position += 1
+
+    def undo(self, registers: Sequence[int], memory: MIPSMemory) -> Optional[int]:
+        """Revert the most recent entry; returns its line, or None if the ring is empty."""
+        if not self.size:
+            return None
+        i = self.head = (self.head - 1) % self.capacity
+        self.size -= 1
+        self.position -= 1
+        register = self.registers[i]
+        if register:
+            registers[register] = self.register_values[i]
+        address = self.addresses[i]
+        if address != NO_ADDRESS:
+            memory.write_word(address, self.memory_values[i])
+        return self.lines[i]
+
+    def last_address(self) -> int:
+        """Memory address written by the entry that would be undone next."""
+        return self.addresses[(self.head - 1) % self.capacity] if self.size else NO_ADDRESS
+
+    def take_checkpoint(self, line: int, halted: bool, registers: Sequence[int], memory: MIPSMemory) -> None:
+        self.checkpoints.append(Checkpoint(self.position, line, halted, array("I", registers), memory.snapshot_pages()))
+        if len(self.checkpoints) > self.max_checkpoints:
+            del self.checkpoints[0]
+        self.next_checkpoint = self.position + self.checkpoint_interval
+
+    def restore_checkpoint(self, target: int, registers: Sequence[int], memory: MIPSMemory) -> Optional[Checkpoint]:
+        """Restore the latest checkpoint at or before position target and clear the ring."""
+        candidates = [checkpoint for checkpoint in self.checkpoints if checkpoint.position <= target]
+        if not candidates:
+            return None
+        checkpoint = candidates[-1]
+        registers[:] = checkpoint.registers
+        memory.restore_pages(checkpoint.pages)
+        self.checkpoints = candidates
+        self.position = checkpoint.position
+        self.next_checkpoint = checkpoint.position + self.checkpoint_interval
+        self.head = self.size = 0
+        return checkpoint
+
+    @property
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the ring and the checkpoints."""
+        ring = sum(buffer.itemsize * len(buffer) for buffer in
+                   (self.lines, self.registers, self.register_values, self.addresses, self.memory_values))
+        shared = {id(page): len(page) for checkpoint in self.checkpoints for page in checkpoint.pages.values()}
+        return ring + sum(shared.values()) + 128 * len(self.checkpoints)  # Pages shared between checkpoints count once
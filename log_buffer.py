@@ -0,0 +1,59 @@
+# log_buffer.py
+from collections import deque
+from typing import IO, List, Optional
+
+# Executor trace verbosity. Errors, breakpoint hits and status messages are logged at every level.
+LOG_OFF = 0  # No per-instruction messages
+LOG_BRANCHES = 1  # Branches, jumps and syscalls
+LOG_ALL = 2  # Every executed instruction
+LOG_LEVELS = {"off": LOG_OFF, "branches": LOG_BRANCHES, "all": LOG_ALL}
+
+class MIPSLogBuffer:
+    """Bounded log between the executor and the console.
+
+    Messages are queued in a ring of at most capacity entries; the console
+    drains it in batches on a timer instead of redrawing per message, and
+    when more messages arrive between two drains than the ring holds, the
+    oldest are counted and dropped. If a file is open, every message is
+    also streamed to it, so the complete log survives.
+    """
+
+    def __init__(self, capacity: int = 5000):
+        self.pending: deque = deque(maxlen=capacity)
+        self.dropped = 0  # Messages pushed out of the ring before they were drained
+        self.path: Optional[str] = None
+        self._file: Optional[IO[str]] = None
+
+    def write(self, message: str) -> None:
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append(message)
+        if self._file is not None:
+            self._file.write(f"{message}\n")
+
+    def drain(self) -> List[str]:
+        """Messages written since the last drain, preceded by a note if some were dropped."""
+        lines = list(self.pending)
+        self.pending.clear()
+        if self.dropped:
+            lines.insert(0, f"... {self.dropped} messages not shown" + (f" (see {self.path})" if self.path else ""))
+            self.dropped = 0
+        if self._file is not None:
+            self._file.flush()
+        return lines
+
+    def open_file(self, path: str) -> None:
+        """Stream all further messages to path (replacing any earlier log file)."""
+        self.close_file()
+        self._file = open(path, "w")
+        self.path = path
+
+    def close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self.path = None
+
+    def clear(self) -> None:
+        self.pending.clear()
+        self.dropped = 0
@@ -0,0 +1,292 @@
+# machine.py
+from typing import Callable, Dict, Sequence
+
+from decoder import IllegalInstructionError
+from executor import RunResult
+from memory import MIPSMemory, MemoryError, TEXT_BASE
+from mips_commands import MIPSProcessor
+
+WORD_MASK = 0xFFFFFFFF
+EXIT_PC = -1  # Returned by syscall 10 to leave the fetch loop
+
+def _signed16(value: int) -> int:
+    return value - 0x10000 if value & 0x8000 else value
+
+def _signed32(value: int) -> int:
+    return value - 0x100000000 if value & 0x80000000 else value
+
+class MIPSMachine:
+    """Fetch-decode-execute core that runs encoded machine words from memory.
+
+    Each fetched word is decoded once into a closure that executes it and
+    returns the next PC; closures are cached by instruction word, so hot
+    loops skip decoding entirely.
+    """
+
+    def __init__(self, commands: MIPSProcessor, memory: MIPSMemory, pc_update_callback: Callable[[int], None] = None):
+        self.commands = commands
+        self.registers = commands.registers.values
+        self.memory = memory
+        self.pc_update_callback = pc_update_callback or (lambda pc: None)
+        self.program_counter = TEXT_BASE
+        self.text_start = TEXT_BASE
+        self.text_end = TEXT_BASE
+        self.halted = False
+        self.error = ""
+        self.decode_cache: Dict[int, Callable[[int], int]] = {}
+        self._exit_pc = 0  # PC after the syscall that stopped the program
+
+        self._r_handlers = {
+            0x00: self._decode_sll, 0x02: self._decode_srl, 0x04: self._decode_sllv, 0x06: self._decode_srlv,
+            0x08: self._decode_jr, 0x0C: self._decode_syscall,
+            0x20: self._decode_add, 0x21: self._decode_add, 0x22: self._decode_sub, 0x23: self._decode_sub,
+            0x24: self._decode_and, 0x25: self._decode_or, 0x26: self._decode_xor, 0x2A: self._decode_slt,
+        }
+        self._i_handlers = {
+            0x04: self._decode_beq, 0x05: self._decode_bne,
+            0x08: self._decode_addi, 0x09: self._decode_addi, 0x0A: self._decode_slti,
+            0x0C: self._decode_andi, 0x0D: self._decode_ori, 0x0F: self._decode_lui,
+            0x20: self._decode_lb, 0x21: self._decode_lh, 0x23: self._decode_lw,
+            0x24: self._decode_lbu, 0x25: self._decode_lhu,
+            0x28: self._decode_sb, 0x29: self._decode_sh, 0x2B: self._decode_sw,
+        }
+
+    def load_image(self, image: Sequence[int], base_address: int = TEXT_BASE) -> None:
+        """Copy a text image into memory and point the PC at its first word."""
+        for index, word in enumerate(image):
+            self.memory.write_word(base_address + index * 4, word)
+        self.text_start = base_address
+        self.text_end = base_address + len(image) * 4
+        self.program_counter = base_address
+        self.halted = False
+        self.error = ""
+        self.decode_cache.clear()
+
+    def is_finished(self) -> bool:
+        return self.halted or not self.text_start <= self.program_counter < self.text_end
+
+    def step(self) -> bool:
+        if self.is_finished():
+            return False
+        self.run(1)
+        self.pc_update_callback(self.program_counter)
+        return True
+
+    def run(self, max_steps: int) -> RunResult:
+        """Fetch, decode and execute up to max_steps instructions."""
+        cache = self.decode_cache
+        read_word = self.memory.read_word
+        text_start, text_end = self.text_start, self.text_end
+        pc = self.program_counter
+        steps = 0
+        try:
+            while steps < max_steps and text_start <= pc < text_end:
+                word = read_word(pc)
+                execute = cache.get(word)
+                if execute is None:
+                    execute = cache[word] = self.decode(word)
+                pc = execute(pc)
+                steps += 1
+        except (MemoryError, IllegalInstructionError) as e:
+            self.halted = True
+            self.error = f"Error at 0x{pc:08X}: {e}"
+            self.program_counter = pc
+            return RunResult(steps, "error")
+
+        if pc == EXIT_PC:
+            self.halted = True
+            pc = self._exit_pc
+        self.program_counter = pc
+        if self.halted:
+            return RunResult(steps, "exit")
+        if not text_start <= pc < text_end:
+            return RunResult(steps, "end")
+        return RunResult(steps, "limit")
+
+    def decode(self, word: int) -> Callable[[int], int]:
+        """Decode an instruction word into a closure taking the PC and returning the next PC."""
+        opcode = word >> 26
+        rs = (word >> 21) & 0x1F
+        rt = (word >> 16) & 0x1F
+        if opcode == 0:
+            handler = self._r_handlers.get(word & 0x3F)
+            if handler is None:
+                raise IllegalInstructionError(f"Unsupported function code 0x{word & 0x3F:02X} in 0x{word:08X}")
+            return handler(rs, rt, (word >> 11) & 0x1F, (word >> 6) & 0x1F)
+        if opcode in (0x02, 0x03):
+            return self._decode_jump(opcode == 0x03, word & 0x3FFFFFF)
+        handler = self._i_handlers.get(opcode)
+        if handler is None:
+            raise IllegalInstructionError(f"Unsupported opcode 0x{opcode:02X} in 0x{word:08X}")
+        return handler(rs, rt, word & 0xFFFF)
+
+    @staticmethod
+    def _next(pc: int) -> int:
+        return pc + 4
+
+    # R-format
+
+    def _alu(self, rd: int, compute: Callable[[int, int], int], rs: int, rt: int) -> Callable[[int], int]:
+        if not rd:
+            return self._next  # Writes to $zero are discarded
+        r = self.registers
+
+        def execute(pc):
+            r[rd] = compute(r[rs], r[rt])
+            return pc + 4
+        return execute
+
+    def _decode_add(self, rs, rt, rd, shamt):
+        return self._alu(rd, lambda a, b: (a + b) & WORD_MASK, rs, rt)
+
+    def _decode_sub(self, rs, rt, rd, shamt):
+        return self._alu(rd, lambda a, b: (a - b) & WORD_MASK, rs, rt)
+
+    def _decode_and(self, rs, rt, rd, shamt):
+        return self._alu(rd, lambda a, b: a & b, rs, rt)
+
+    def _decode_or(self, rs, rt, rd, shamt):
+        return self._alu(rd, lambda a, b: a | b, rs, rt)
+
+    def _decode_xor(self, rs, rt, rd, shamt):
+        return self._alu(rd, lambda a, b: a ^ b, rs, rt)
+
+    def _decode_slt(self, rs, rt, rd, shamt):
+        return self._alu(rd, lambda a, b: 1 if _signed32(a) < _signed32(b) else 0, rs, rt)
+
+    def _decode_sllv(self, rs, rt, rd, shamt):
+        return self._alu(rd, lambda a, b: (b << (a & 31)) & WORD_MASK, rs, rt)
+
+    def _decode_srlv(self, rs, rt, rd, shamt):
+        return self._alu(rd, lambda a, b: b >> (a & 31), rs, rt)
+
+    def _decode_sll(self, rs, rt, rd, shamt):
+        if not rd:
+            return self._next  # Also covers nop (sll $zero, $zero, 0)
+        r = self.registers
+
+        def execute(pc):
+            r[rd] = (r[rt] << shamt) & WORD_MASK
+            return pc + 4
+        return execute
+
+    def _decode_srl(self, rs, rt, rd, shamt):
+        if not rd:
+            return self._next
+        r = self.registers
+
+        def execute(pc):
+            r[rd] = r[rt] >> shamt
+            return pc + 4
+        return execute
+
+    def _decode_jr(self, rs, rt, rd, shamt):
+        r = self.registers
+        return lambda pc: r[rs]
+
+    def _decode_syscall(self, rs, rt, rd, shamt):
+        r = self.registers
+
+        def execute(pc):
+            if r[2] == 10:  # Exit program
+                self._exit_pc = pc + 4
+                return EXIT_PC
+            return pc + 4
+        return execute
+
+    # I-format
+
+    def _immediate_op(self, rt: int, compute: Callable[[int], int], rs: int) -> Callable[[int], int]:
+        if not rt:
+            return self._next
+        r = self.registers
+
+        def execute(pc):
+            r[rt] = compute(r[rs])
+            return pc + 4
+        return execute
+
+    def _decode_addi(self, rs, rt, immediate):
+        value = _signed16(immediate)
+        return self._immediate_op(rt, lambda a: (a + value) & WORD_MASK, rs)
+
+    def _decode_slti(self, rs, rt, immediate):
+        value = _signed16(immediate)
+        return self._immediate_op(rt, lambda a: 1 if _signed32(a) < value else 0, rs)
+
+    def _decode_andi(self, rs, rt, immediate):
+        return self._immediate_op(rt, lambda a: a & immediate, rs)
+
+    def _decode_ori(self, rs, rt, immediate):
+        return self._immediate_op(rt, lambda a: a | immediate, rs)
+
+    def _decode_lui(self, rs, rt, immediate):
+        value = immediate << 16
+        return self._immediate_op(rt, lambda a: value, rs)
+
+    def _decode_beq(self, rs, rt, immediate):
+        r = self.registers
+        offset = _signed16(immediate) << 2
+        return lambda pc: pc + 4 + offset if r[rs] == r[rt] else pc + 4
+
+    def _decode_bne(self, rs, rt, immediate):
+        r = self.registers
+        offset = _signed16(immediate) << 2
+        return lambda pc: pc + 4 + offset if r[rs] != r[rt] else pc + 4
+
+    def _load(self, rs: int, rt: int, immediate: int, read: Callable[[int], int], sign_bit: int = 0):
+        r = self.registers
+        offset = _signed16(immediate)
+        extend = sign_bit << 1
+
+        def execute(pc):
+            value = read((r[rs] + offset) & WORD_MASK)
+            if rt:
+                r[rt] = ((value - extend) & WORD_MASK) if value & sign_bit else value
+            return pc + 4
+        return execute
+
+    def _store(self, rs: int, rt: int, immediate: int, write: Callable[[int, int], None]):
+        r = self.registers
+        offset = _signed16(immediate)
+
+        def execute(pc):
+            write((r[rs] + offset) & WORD_MASK, r[rt])
+            return pc + 4
+        return execute
+
+    def _decode_lw(self, rs, rt, immediate):
+        return self._load(rs, rt, immediate, self.memory.read_word)
+
+    def _decode_lh(self, rs, rt, immediate):
+        return self._load(rs, rt, immediate, self.memory.read_half, 0x8000)
+
+    def _decode_lhu(self, rs, rt, immediate):
+        return self._load(rs, rt, immediate, self.memory.read_half)
+
+    def _decode_lb(self, rs, rt, immediate):
+        return self._load(rs, rt, immediate, self.memory.read_byte, 0x80)
+
+    def _decode_lbu(self, rs, rt, immediate):
+        return self._load(rs, rt, immediate, self.memory.read_byte)
+
+    def _decode_sw(self, rs, rt, immediate):
+        return self._store(rs, rt, immediate, self.memory.write_word)
+
+    def _decode_sh(self, rs, rt, immediate):
+        return self._store(rs, rt, immediate, self.memory.write_half)
+
+    def _decode_sb(self, rs, rt, immediate):
+        return self._store(rs, rt, immediate, self.memory.write_byte)
+
+    # J-format
+
+    def _decode_jump(self, link: bool, target: int) -> Callable[[int], int]:
+        r = self.registers
+        address = target << 2
+        if link:
+            def execute(pc):
+                r[31] = pc + 4
+                return ((pc + 4) & 0xF0000000) | address
+            return execute
+        return lambda pc: ((pc + 4) & 0xF0000000) | address
@@ -1,11 +1,16 @@
 # main.py
-import tkinter as tk
-from ui_elements import MIPSUI
+from typing import TYPE_CHECKING
 from mips_commands import MIPSProcessor
 from parser import MIPSParser
-from memory import MIPSMemory
+from memory import MIPSMemory, STATIC_DATA_BASE, DATA_SEGMENT_BASE, KERNEL_BASE, STACK_POINTER_INIT, GLOBAL_POINTER_INIT
 from executor import MIPSExecutor
+from breakpoints import MIPSBreakpoints
 from converter import MIPSConverter
+from assembly_cache import MIPSAssemblyCache
+from log_buffer import LOG_ALL
+
+if TYPE_CHECKING:
+    import tkinter as tk
 
 class MIPSSimulator:
     DATA_SECTION_PROCESSED = "Data section processed. Ready to step through text segment."
@@ -13,18 +18,35 @@ class MIPSSimulator:
     NO_INSTRUCTIONS_TO_EXECUTE = "No more instructions to execute."
     NO_CODE_LOADED = "No code loaded."
     MIPS_CONVERTED = "MIPS code converted to machine code."
+    PROGRAM_EXITED = "Program exited after {steps} instructions."
+    PROGRAM_ENDED = "Reached end of text after {steps} instructions."
+    RUN_LIMIT_REACHED = "Stopped after {steps} instructions (instruction budget reached)."
+    RUN_PAUSED = "Paused after {steps} instructions. Press Run to continue."
+    RUN_ERROR = "Stopped by an error after {steps} instructions."
+    STEPPED_BACK = "Stepped back to {address}."
+    REVERSE_STOPPED = "Went back {steps} instructions to {address}."
+    NO_HISTORY = "No earlier state recorded."
+    NOT_RECORDING = "History is not being recorded. Tick Record to use Back and Reverse."
+    RECORDING_STARTED = "Recording history for Back and Reverse from {address}."
+    RECORDING_STOPPED = "Stopped recording history."
     WORD_SIZE = 4  # 4 bytes per word
-    MEMORY_SIZE = 512  # 512 bytes
+    MEMORY_SIZE = 512  # Bytes of data memory shown in the data view
+    RUN_INSTRUCTION_BUDGET = 5_000_000  # Max instructions executed by a single Run
+    RUN_REFRESH_INTERVAL = 50_000  # Instructions executed between UI refreshes while running
+
+    def __init__(self, root: "tk.Tk"):
+        # The UI is only imported by the GUI entry point so the core stays Tk-free
+        from ui_elements import MIPSUI
 
-    def __init__(self, root: tk.Tk):
         self.root = root
         self.root.title("MIPS Simulator")
         self.root.geometry("1200x1100")
 
-        self.data_memory_base = 0x10010000
-        self.data_memory_size = self.MEMORY_SIZE // self.WORD_SIZE
+        self.data_memory_base = STATIC_DATA_BASE
+        self.data_memory_size = self.MEMORY_SIZE
         self.instruction_memory_size = self.MEMORY_SIZE // self.WORD_SIZE
-        self.memory = MIPSMemory(self.data_memory_base, self.data_memory_size)
+        self.memory = self._new_memory()
+        self._data_view_memory = None  # Memory the data view last showed; a new one is compared in full
         self.parser = MIPSParser()
         self.ui = MIPSUI(root, self.data_memory_base, self._update_program_counter)
         self.processor = MIPSProcessor(self.ui.get_register_tree())
@@ -33,26 +55,45 @@ class MIPSSimulator:
         self.labels = {}
         self.text_section_loaded = False
         self.converter = MIPSConverter()
+        self.assembly = MIPSAssemblyCache(self.parser, self.converter)  # Re-parses only edited lines on each load
+        self._run_job = None  # Pending Tk after() id while a Run is in progress
+        self._run_steps = 0
+        self.breakpoints = MIPSBreakpoints()  # Kept across loads; shared with each new executor
+        self._paused = False  # Stopped at a breakpoint or watchpoint; Run continues instead of restarting
+        self.log_level = LOG_ALL  # Step trace verbosity, chosen in the Log menu
+        self.record_history = False  # Record undo history for Back and Reverse, toggled by the Record check box
 
+        self.ui._clear_button_action = self._clear_button_action
         self.ui._run_button_action = self._run_button_action
         self.ui._step_button_action = self._step_button_action
+        self.ui._step_back_button_action = self._step_back_button_action
+        self.ui._reverse_button_action = self._reverse_button_action
         self.ui._convert_button_action = self._convert_button_action
+        self.ui._breakpoint_toggle_action = self._toggle_breakpoint
+        self.ui._log_level_action = self._set_log_level
+        self.ui._record_action = self._set_recording
+        self.ui._data_scroll_action = self._scroll_data_view
+        self.ui._goto_action = self._goto
         
+    def _new_memory(self) -> MIPSMemory:
+        memory = MIPSMemory(self.data_memory_base, self.data_memory_size)
+        memory.watch_writes()  # The data view only redraws written words
+        return memory
+
     def _update_program_counter(self, pc):
         self.ui.update_program_counter_display(pc)
         
     def _load_sections(self):
-        code = self.ui.get_mips_code()
-        lines = [line.strip() for line in code.split('\n') if line.strip()]
+        program = self.assembly.assemble(self.ui.get_mips_code(), self.data_memory_base)
+        symbols = program.symbols
+        self.memory.allocate_data(symbols)
+        layout = ", ".join(f"{name}: 0x{symbol.address:08X}" for name, symbol in symbols.items())
+        self.ui.log_to_console(f"Data Section: {layout}")
+        self._refresh_data_view()
 
-        data_section = self.parser.parse_data_section(lines)
-        self.memory.allocate_data(data_section)
-        self.ui.log_to_console(f"Data Section: {data_section}")
-        self.ui.update_data_memory_display(self.memory.get_data_memory_values())
-
-        self.instructions = self.parser.parse_text_section(lines)
-        self.labels = self.parser.map_labels([instr["source"] for instr in self.instructions])
-        self.ui.set_instruction_memory(self.instructions)
+        self.instructions = program.instructions
+        self.labels = program.labels
+        self.ui.set_instruction_memory(self.instructions, self.breakpoints.lines)
         
         self.executor = MIPSExecutor(
             self.processor,
@@ -61,57 +102,203 @@ class MIPSSimulator:
             self._update_program_counter,
             self.ui.log_to_console
         )
+        self.executor.breakpoints = self.breakpoints
+        self.executor.decoder = self.assembly
+        self.executor.log_level = self.log_level
+        if self.record_history:
+            self.executor.enable_reverse()  # Record history for Back and Reverse
+        self.breakpoints.paused_at = None
+        self.breakpoints.sync_watchpoints(self.memory)
         
         # set $ra register in here
-        self.processor.update_register_value("$ra", len(self.instructions) * 4)
-        self.ui.log_to_console(f"Set $ra to {len(self.instructions) * 4}")
+        self.processor.update_register_value("$ra", program.end)  # Returning from main ends the program
+        self.ui.log_to_console(f"Set $ra to 0x{program.end:08X}")
+        self.processor.update_register_value("$gp", GLOBAL_POINTER_INIT)
+        self.processor.update_register_value("$sp", STACK_POINTER_INIT)
         
         self.ui.log_to_console(self.TEXT_SECTION_LOADED)
         self.executor.set_instructions(self.instructions)
+        self.executor.enable_profiling()  # Execution counts for the instruction memory view
         self.text_section_loaded = True
-        self.executor.current_line = 0
-        self.executor.program_counter = 0
-        self._update_program_counter(0)
       
+    def _refresh_views(self):
+        self.processor.sync_view()
+        self.ui.update_instruction_counts(self.executor.instruction_counts())
+        self._refresh_data_view()
+        self._update_program_counter(self.executor.program_counter)
+
+    def _refresh_data_view(self):
+        """Redraw the data view cells of the words written since the last refresh."""
+        ranges = self.memory.take_written_ranges()
+        if self._data_view_memory is not self.memory:
+            self._data_view_memory = self.memory
+            ranges = None
+        base = self.ui.data_view_base
+        end = base + self.data_memory_size
+        changed = None
+        if ranges is not None:
+            changed = [(address - base) // self.WORD_SIZE
+                       for start, stop in ranges for address in range(max(start, base), min(stop, end), self.WORD_SIZE)]
+            if not changed:
+                return
+        words = self.memory.read_words(base, self.data_memory_size // self.WORD_SIZE)
+        self.ui.update_data_memory_display(words, base, changed)
+
+    def _scroll_data_view(self, rows: int):
+        """Move the data view by rows of 64 bytes within the data, heap and stack segments."""
+        row_bytes = self.ui.DATA_COLUMNS * self.WORD_SIZE
+        base = min(max(self.ui.data_view_base + rows * row_bytes, DATA_SEGMENT_BASE), KERNEL_BASE - self.data_memory_size)
+        words = self.memory.read_words(base, self.data_memory_size // self.WORD_SIZE)
+        self.ui.update_data_memory_display(words, base)
+
+    def _stop_running(self):
+        if self._run_job is not None:
+            self.root.after_cancel(self._run_job)
+            self._run_job = None
+
+    def _clear_button_action(self):
+        self._stop_running()
+        self.ui._clear_registers()
+        self.processor.clear_registers()
+        self.text_section_loaded = False
+        self._paused = False
+
     def _run_button_action(self):
-        self.memory = MIPSMemory(self.data_memory_base, self.data_memory_size)  # Clear data memory with 512 byte size
+        self._stop_running()
+        if self._paused and self.executor and not self.executor.is_finished():
+            self._paused = False
+            self._run_chunk()  # Continue from the breakpoint
+            return
+        self._paused = False
+        self.memory = self._new_memory()  # Fresh memory; the data view shows 512 bytes, from .data unless scrolled
         self.processor.clear_registers() # Clear registers
         self._load_sections()
         self.text_section_loaded = True # set the flag to true after loading
+        self._run_steps = 0
+        self._run_chunk()
+
+    def _run_chunk(self):
+        """Run the next batch of instructions, refresh the views and reschedule if not finished."""
+        self._run_job = None
+        budget = min(self.RUN_REFRESH_INTERVAL, self.RUN_INSTRUCTION_BUDGET - self._run_steps)
+        result = self.executor.run(budget)
+        self._run_steps += result.steps
+        self._refresh_views()
+
+        if result.reason == "limit" and self._run_steps < self.RUN_INSTRUCTION_BUDGET:
+            # Yield to the Tk event loop so the window stays responsive
+            self._run_job = self.root.after(1, self._run_chunk)
+            return
+
+        if result.reason in ("breakpoint", "watchpoint"):
+            self._paused = True
+            message = self.RUN_PAUSED
+        elif result.reason == "exit":
+            message = self.PROGRAM_EXITED
+        elif result.reason == "end":
+            message = self.PROGRAM_ENDED
+        elif result.reason == "error":
+            message = self.RUN_ERROR
+        else:
+            message = self.RUN_LIMIT_REACHED
+        self.ui.log_to_console(message.format(steps=self._run_steps))
+
+    def _set_recording(self, enabled: bool):
+        """Start or stop recording undo history; a loaded program starts recording from its current state."""
+        self.record_history = enabled
+        if not self.executor:
+            return
+        if enabled and self.executor.journal is None:
+            self.executor.enable_reverse()
+            self.ui.log_to_console(self.RECORDING_STARTED.format(address=self._current_address()))
+        elif not enabled and self.executor.journal is not None:
+            self.executor.disable_reverse()
+            self.ui.log_to_console(self.RECORDING_STOPPED)
+
+    def _step_back_button_action(self):
+        self._stop_running()
+        if self.executor and self.executor.journal is None:
+            self.ui.log_to_console(self.NOT_RECORDING)
+            return
+        if not self.executor or not self.executor.step_back(1):
+            self.ui.log_to_console(self.NO_HISTORY)
+            return
+        self._paused = True  # Run continues from here instead of restarting
+        self._refresh_views()
+        self.ui.log_to_console(self.STEPPED_BACK.format(address=self._current_address()))
+
+    def _reverse_button_action(self):
+        self._stop_running()
+        if not self.executor:
+            self.ui.log_to_console(self.NO_CODE_LOADED)
+            return
+        if self.executor.journal is None:
+            self.ui.log_to_console(self.NOT_RECORDING)
+            return
+        result = self.executor.reverse_continue()
+        if not result.steps:
+            self.ui.log_to_console(self.NO_HISTORY)
+            return
+        self._paused = True
+        self._refresh_views()
+        self.ui.log_to_console(self.REVERSE_STOPPED.format(steps=result.steps, address=self._current_address()))
+
+    def _current_address(self) -> str:
+        line = self.executor.current_line
+        return self.instructions[line]["address"] if line < len(self.instructions) else "end of text"
+
+    def _toggle_breakpoint(self, index: int):
+        enabled = self.breakpoints.toggle_breakpoint(index)
+        self.ui.mark_breakpoint(index, enabled)
+        address = self.instructions[index]["address"] if index < len(self.instructions) else index * 4
+        self.ui.log_to_console(f"Breakpoint {'set' if enabled else 'removed'} at {address}")
+
+    def _goto(self, location: str):
+        """Scroll the instruction views to a label or instruction address."""
+        if not self.executor:
+            self.ui.log_to_console(self.NO_CODE_LOADED)
+            return
+        try:
+            index = MIPSBreakpoints.resolve_line(location, self.labels, self.executor.line_at)
+        except ValueError as error:
+            self.ui.log_to_console(f"Go to: {error}")
+            return
+        self.ui.show_instruction(index)
+
+    def _set_log_level(self, level: int):
+        self.log_level = level
+        if self.executor:
+            self.executor.log_level = level
 
     def _step_button_action(self):
+        self._stop_running()
         if not self.text_section_loaded:
             self._load_sections()
           
-        if self.executor and self.executor.current_line < len(self.instructions):
-            instruction = self.instructions[self.executor.current_line]
-            self.executor.execute_instruction(instruction)
-            self.ui.update_data_memory_display(self.memory.get_data_memory_values())
+        if self.executor and not self.executor.is_finished():
+            line = self.executor.line_at(self.executor.program_counter)  # The instruction this step runs
+            self.executor.step()
+            self._refresh_data_view()
+            if 0 <= line < len(self.instructions):
+                self.ui.update_instruction_count(line, self.executor.instruction_count(line))
         else:
             if not self.executor:
                 self.ui.log_to_console(self.NO_CODE_LOADED)
-            elif self.executor.current_line >= len(self.instructions):
+            else:
                 self.ui.log_to_console(self.NO_INSTRUCTIONS_TO_EXECUTE)
             
 
     def _convert_button_action(self):
-        code = self.ui.get_mips_code()
-        lines = [line.strip() for line in code.split('\n') if line.strip()]
-        text_instructions = self.parser.parse_text_section(lines)
-        machine_code_pairs = []
-
-        for instruction in text_instructions:
-            try:
-                machine_code_instr = self.converter.convert_to_machine_code(instruction['source'])
-                machine_code_pairs.append((instruction['source'], machine_code_instr))
-            except Exception as e:
-                machine_code_pairs.append((instruction['source'],f"Error: {str(e)}"))
+        program = self.assembly.assemble(self.ui.get_mips_code(), self.data_memory_base)
+        machine_code_pairs = self.assembly.assemble_listing(program)
 
         self.ui.set_machine_code_output(machine_code_pairs)
         self.ui.log_to_console(self.MIPS_CONVERTED)
 
 
 if __name__ == "__main__":
+    import tkinter as tk
+
     root = tk.Tk()
     MIPSSimulator(root)
     root.mainloop()
\ No newline at end of file
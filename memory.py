@@ -1,94 +1,237 @@
 # memory.py
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+import struct
+import sys
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, TYPE_CHECKING
 
-@dataclass
-class MemoryConfig:
-    base_address: int
-    size: int
+if TYPE_CHECKING:
+    from parser import DataSymbol
+
+# Memory map (MARS/SPIM compact layout)
+TEXT_BASE = 0x00400000
+DATA_SEGMENT_BASE = 0x10000000
+STATIC_DATA_BASE = 0x10010000  # .data is laid out from here
+HEAP_BASE = 0x10040000
+STACK_LIMIT = 0x7F000000  # Lowest address of the stack segment
+KERNEL_BASE = 0x80000000
+
+GLOBAL_POINTER_INIT = 0x10008000
+STACK_POINTER_INIT = 0x7FFFEFFC
+
+PAGE_SHIFT = 12
+PAGE_SIZE = 1 << PAGE_SHIFT  # 4 KiB pages
+PAGE_OFFSET_MASK = PAGE_SIZE - 1
+
+class MemoryConfig(NamedTuple):
+    base_address: int  # Start of the data memory window (.data)
+    size: int  # Size of the data memory window in bytes
     word_size: int = 4  # 4 bytes per word
+    byteorder: str = "little"  # Byte order of multi-byte values, as in MARS/SPIM
+
+class Segment(NamedTuple):
+    name: str
+    start: int
+    end: int  # Exclusive
+
+SEGMENTS = (
+    Segment("text", TEXT_BASE, DATA_SEGMENT_BASE),
+    Segment("data", DATA_SEGMENT_BASE, HEAP_BASE),
+    Segment("heap", HEAP_BASE, STACK_LIMIT),
+    Segment("stack", STACK_LIMIT, KERNEL_BASE),
+)
+
+_ZERO_PAGE = bytes(PAGE_SIZE)
 
 class MemoryError(Exception):
     """Custom exception for memory-related errors."""
     pass
 
 class MIPSMemory:
-    def __init__(self, base_address: int, size: int):
-        self.config = MemoryConfig(base_address, size)
-        self.memory: List[int] = [0] * (size // self.config.word_size)
-        self.data_section: Dict[str, int] = {}
-
-    def _validate_address(self, address: int) -> None:
-        """Validate memory address."""
-        if address % self.config.word_size != 0:
+    """Sparse memory covering the user address space.
+
+    Memory is split into 4 KiB pages that are allocated on first write;
+    reads of untouched pages return zero without allocating anything.
+    Snapshots share pages copy-on-write: a page is copied on its first
+    write after a snapshot, so taking one only copies the page table.
+    """
+
+    def __init__(self, base_address: int, size: int, byteorder: str = "little"):
+        self.config = MemoryConfig(base_address, size, byteorder=byteorder)
+        self.pages: Dict[int, bytearray] = {}
+        self._writable: Dict[int, bytearray] = {}  # Pages not shared with a snapshot (dirty since the last one)
+        self.symbols: Dict[str, "DataSymbol"] = {}  # .data label -> address and size
+        self._written: Optional[Set[int]] = None  # Word addresses written since take_written_ranges(), see watch_writes()
+        self._all_written = False  # Contents replaced wholesale (restore_pages) since take_written_ranges()
+
+        prefix = "<" if byteorder == "little" else ">"
+        self._word = struct.Struct(prefix + "I")
+        self._half = struct.Struct(prefix + "H")
+
+    @staticmethod
+    def segment_of(address: int) -> Optional[Segment]:
+        """Return the segment containing address, or None if it is unmapped."""
+        for segment in SEGMENTS:
+            if segment.start <= address < segment.end:
+                return segment
+        return None
+
+    def _validate_address(self, address: int, size: int = 4) -> None:
+        """Validate memory address alignment for an access of size bytes."""
+        if address % size != 0:
             raise MemoryError(f"Unaligned memory access at address: 0x{address:08X}")
 
+    def _check_mapped(self, address: int) -> None:
+        if not TEXT_BASE <= address < KERNEL_BASE:
+            raise MemoryError(f"Memory access out of bounds at address: 0x{address & 0xFFFFFFFF:08X}")
+
+    def _page(self, address: int) -> bytearray:
+        """Return the page holding address for writing, allocating or copying it on first touch."""
+        page = self._writable.get(address >> PAGE_SHIFT)
+        if page is None:
+            number = address >> PAGE_SHIFT
+            shared = self.pages.get(number)
+            if shared is None:
+                self._check_mapped(address)
+                page = bytearray(PAGE_SIZE)
+            else:
+                page = bytearray(shared)  # Copy-on-write
+            self.pages[number] = self._writable[number] = page
+        return page
+
+    def _read_page(self, address: int):
+        """Return the page holding address for reading, without allocating it."""
+        page = self.pages.get(address >> PAGE_SHIFT)
+        if page is None:
+            self._check_mapped(address)
+            return _ZERO_PAGE
+        return page
+
     def read_word(self, address: int) -> int:
         """Read a word from memory."""
-        self._validate_address(address)  # Validate alignment first
-        
-        # Check if address is within data memory range
-        if self.config.base_address <= address < self.config.base_address + (len(self.memory) * self.config.word_size):
-            index = (address - self.config.base_address) // self.config.word_size
-            return self.memory[index]
-        elif 0 <= address < self.config.base_address:
-            # Handle absolute memory access below data memory range
-            index = address // self.config.word_size
-            if 0 <= index < len(self.memory):
-                return self.memory[index]
-            else:
-               raise MemoryError(f"Memory access out of bounds at address: 0x{address:08X}")
-        else:
-            raise MemoryError(f"Memory access out of bounds at address: 0x{address:08X}")
-            
+        if address & 3:
+            self._validate_address(address, 4)
+        return self._word.unpack_from(self._read_page(address), address & PAGE_OFFSET_MASK)[0]
+
     def write_word(self, address: int, value: int):
-         # Validate alignment first
-        self._validate_address(address)  
-        
-        # Check if address is within data memory range
-        if self.config.base_address <= address < self.config.base_address + (len(self.memory) * self.config.word_size):
-            index = (address - self.config.base_address) // self.config.word_size
-            self.memory[index] = value & 0xFFFFFFFF  # Ensure 32-bit value
-        elif 0 <= address < self.config.base_address:
-            # Handle absolute memory access below data memory range
-            index = address // self.config.word_size
-            if 0 <= index < len(self.memory):
-                 self.memory[index] = value & 0xFFFFFFFF
-            else:
-                raise MemoryError(f"Memory access out of bounds at address: 0x{address:08X}")
-        else:
-              raise MemoryError(f"Memory access out of bounds at address: 0x{address:08X}")
+        if address & 3:
+            self._validate_address(address, 4)
+        self._word.pack_into(self._page(address), address & PAGE_OFFSET_MASK, value & 0xFFFFFFFF)  # Ensure 32-bit value
+        if self._written is not None:
+            self._written.add(address)
 
+    def read_half(self, address: int) -> int:
+        """Read an unsigned halfword from memory."""
+        if address & 1:
+            self._validate_address(address, 2)
+        return self._half.unpack_from(self._read_page(address), address & PAGE_OFFSET_MASK)[0]
+
+    def write_half(self, address: int, value: int):
+        if address & 1:
+            self._validate_address(address, 2)
+        self._half.pack_into(self._page(address), address & PAGE_OFFSET_MASK, value & 0xFFFF)
+        if self._written is not None:
+            self._written.add(address & ~3)
+
+    def read_byte(self, address: int) -> int:
+        """Read an unsigned byte from memory."""
+        return self._read_page(address)[address & PAGE_OFFSET_MASK]
+
+    def write_byte(self, address: int, value: int):
+        self._page(address)[address & PAGE_OFFSET_MASK] = value & 0xFF
+        if self._written is not None:
+            self._written.add(address & ~3)
 
     def is_valid_address(self, address: int) -> bool:
         """Check if address is a valid memory address."""
-        if address % self.config.word_size != 0:
-            return False
-        
-        # Check if address is within data memory range
-        if self.config.base_address <= address < self.config.base_address + (len(self.memory) * self.config.word_size):
-            return True
-        
-        # Check if address is in the absolute range below data memory range
-        if 0 <= address < self.config.base_address:
-            index = address // self.config.word_size
-            return 0 <= index < len(self.memory)
-        
-        return False
-
-    def allocate_data(self, data_section: Dict[str, int]):
-        self.data_section = data_section
-        # Initialize memory locations for data section
-        for i, value in enumerate(data_section.values()):
-            if i < len(self.memory):
-                self.memory[i] = value
-
-    def update_data_memory(self, var_name: str, value: int):
-        if var_name in self.data_section:
-            variable_index = list(self.data_section.keys()).index(var_name)
-            if 0 <= variable_index < len(self.memory):
-                self.memory[variable_index] = value
-                self.data_section[var_name] = value
-
-    def get_data_memory_values(self) -> List[int]:
-        return self.memory[:]
\ No newline at end of file
+        return address % self.config.word_size == 0 and TEXT_BASE <= address < KERNEL_BASE
+
+    def view(self, address: int, length: int) -> memoryview:
+        """Read-only view of length bytes starting at address.
+
+        Ranges inside one page are returned without copying; ranges that
+        span pages are gathered into a new buffer.
+        """
+        self._check_mapped(address)
+        self._check_mapped(address + length - 1)
+        offset = address & PAGE_OFFSET_MASK
+        if offset + length <= PAGE_SIZE:
+            return memoryview(self._read_page(address))[offset:offset + length].toreadonly()
+
+        chunks = []
+        end = address + length
+        while address < end:
+            offset = address & PAGE_OFFSET_MASK
+            chunk = min(PAGE_SIZE - offset, end - address)
+            chunks.append(memoryview(self._read_page(address))[offset:offset + chunk])
+            address += chunk
+        return memoryview(b"".join(chunks))
+
+    def read_words(self, address: int, count: int) -> Sequence[int]:
+        """count words starting at a word-aligned address.
+
+        Returns a zero-copy memoryview when the range is inside one page and
+        the memory byte order matches the host.
+        """
+        self._validate_address(address, 4)
+        data = self.view(address, count * 4)
+        if self.config.byteorder == sys.byteorder:
+            return data.cast("I")
+        return [word for (word,) in self._word.iter_unpack(data)]
+
+    def snapshot_pages(self) -> Dict[int, bytearray]:
+        """Page table to keep for a snapshot; its pages must not be modified by the caller."""
+        self._writable.clear()
+        return dict(self.pages)
+
+    def restore_pages(self, pages: Dict[int, bytearray]) -> None:
+        """Return memory to the contents of a page table from snapshot_pages()."""
+        self._writable.clear()
+        self.pages.clear()
+        self.pages.update(pages)
+        self._all_written = True
+
+    def watch_writes(self, enabled: bool = True) -> None:
+        """Start (or stop) recording which words are written, for views that redraw only what changed."""
+        self._written = set() if enabled else None
+        self._all_written = False
+
+    def take_written_ranges(self) -> Optional[List[Tuple[int, int]]]:
+        """Coalesced [start, end) byte ranges of the words written since the last call, then forget them.
+
+        Returns None when anything may have changed: writes are not being
+        watched, or memory was restored from a page table.
+        """
+        if self._written is None or self._all_written:
+            if self._written is not None:
+                self._written.clear()
+            self._all_written = False
+            return None
+        ranges: List[Tuple[int, int]] = []
+        for address in sorted(self._written):
+            if ranges and ranges[-1][1] == address:
+                ranges[-1] = (ranges[-1][0], address + 4)
+            else:
+                ranges.append((address, address + 4))
+        self._written.clear()
+        return ranges
+
+    @property
+    def dirty_pages(self) -> int:
+        """Pages written since the last snapshot or restore."""
+        return len(self._writable)
+
+    @property
+    def allocated_bytes(self) -> int:
+        return len(self.pages) * PAGE_SIZE
+
+    def allocate_data(self, symbols: Dict[str, "DataSymbol"]):
+        """Write the initial values of the .data symbols into memory."""
+        self.symbols = symbols
+        writers = {4: self.write_word, 2: self.write_half, 1: self.write_byte}
+        for symbol in symbols.values():
+            write = writers[symbol.unit]
+            for i, value in enumerate(symbol.values):
+                write(symbol.address + i * symbol.unit, value)
+
+    def get_data_memory_values(self) -> Sequence[int]:
+        """Words of the data memory window (config.base_address, config.size)."""
+        return self.read_words(self.config.base_address, self.config.size // self.config.word_size)
@@ -1,122 +1,103 @@
 # mips_commands.py
-import tkinter.ttk as ttk
-from typing import Optional, Union, Callable, Dict
+from array import array
+from typing import Optional, Union, Dict, TYPE_CHECKING
+
+from register_file import RegisterFile, REGISTER_COUNT, REGISTER_NAMES
+
+if TYPE_CHECKING:
+    import tkinter.ttk as ttk
 
 class MIPSProcessor:
-    def __init__(self, tree: ttk.Treeview):
-        self.tree = tree
+    def __init__(self, tree: Optional["ttk.Treeview"] = None):
+        self.registers = RegisterFile()  # Source of truth for register values
+        self.tree = None  # Optional view of the register file
+        self.live_view = True  # Push each register write to the view immediately
         self.last_highlighted_item = None  # Track last highlighted item
-        self._operation_map: Dict[str, Callable[[int, int], int]] = {
-            'add': lambda x, y: x + y,
-            'sub': lambda x, y: x - y,
-            'and': lambda x, y: x & y,
-            'or': lambda x, y: x | y,
-            'xor': lambda x, y: x ^ y,
-            'sll': lambda x, y: x << y,
-            'srl': lambda x, y: x >> y,
-            'andi': lambda x, y: x & y,
-            'ori': lambda x, y: x | y,
-        }
+        self._tree_items: Dict[str, str] = {}
+        self._shown = array('I', [0] * REGISTER_COUNT)
+        if tree is not None:
+            self.attach_view(tree)
+
+    def attach_view(self, tree: "ttk.Treeview") -> None:
+        """Use a register Treeview as a view of the register file."""
+        self.tree = tree
+        self.last_highlighted_item = None
+        self._tree_items = {}
+        for item in tree.get_children():
+            self._tree_items[tree.item(item)['values'][0]] = item
+        self._shown = array('I', [0] * REGISTER_COUNT)
+        self.sync_view()
 
     def _find_register_item(self, register_name: str) -> Optional[str]:
         """Find register item in treeview."""
-        for item in self.tree.get_children():
-            if self.tree.item(item)['values'][0] == register_name:
-                return item
-        return None
+        return self._tree_items.get(register_name)
 
     def get_register_value(self, register_name: str) -> int:
         """Get register value as integer."""
-        item = self._find_register_item(register_name)
-        if not item:
-            raise ValueError(f"Register {register_name} not found")
-            
-        hex_value = self.tree.item(item)['values'][2]
-        try:
-            return int(hex_value, 16) if not hex_value.startswith('-') else -int(hex_value[1:], 16)
-        except ValueError:
-            return 0
+        return self.registers.get(register_name)
 
     def update_register_value(self, register_name: str, new_value: Union[int, str]) -> None:
         """Update register with new value and highlight the change."""
-        item = self._find_register_item(register_name)
+        number = self.registers.index_of(register_name)
+        value = int(new_value, 16) if isinstance(new_value, str) else new_value
+        self.registers.write(number, value)
+
+        if self.tree is None or not self.live_view or not number:
+            return  # No live view attached, or $zero which cannot be modified
+        self._show_register(number, highlight=True)
+
+    def _show_register(self, number: int, highlight: bool = False) -> None:
+        """Copy one register from the register file into the Treeview."""
+        value = self.registers.values[number]
+        item = self._find_register_item(REGISTER_NAMES[number])
         if not item:
-            raise ValueError(f"Register {register_name} not found")
-            
-        if register_name == "$zero":
-            return  # $zero register cannot be modified
-
-        # Remove previous highlight if exists
-        if self.last_highlighted_item:
-            self.tree.item(self.last_highlighted_item, tags=())
-
-        value = (int(new_value, 16) if isinstance(new_value, str) else new_value) & 0xFFFFFFFF
-        hex_value = f"0x{value:08X}"
-        self.tree.set(item, column="Value", value=hex_value)
-        
-        # Add highlight to changed register
-        self.tree.item(item, tags=('highlight',))
-        self.last_highlighted_item = item
-        
-        # Ensure the highlighted item is visible
-        self.tree.see(item)
+            return
+        if self._shown[number] != value:
+            self.tree.set(item, column="Value", value=f"0x{value:08X}")
+            self._shown[number] = value
+
+        if highlight and item != self.last_highlighted_item:
+            # Remove previous highlight if exists
+            if self.last_highlighted_item:
+                self.tree.item(self.last_highlighted_item, tags=())
+
+            # Add highlight to changed register
+            self.tree.item(item, tags=('highlight',))
+            self.last_highlighted_item = item
+
+            # Scroll to the highlighted item only if it is off screen
+            if not self.tree.bbox(item):
+                self.tree.see(item)
+
+    def show_register(self, number: int) -> None:
+        """Push one register to the live view and highlight it."""
+        if self.tree is not None and self.live_view and number:
+            self._show_register(number, highlight=True)
+
+    def sync_view(self) -> None:
+        """Refresh the Treeview rows whose register value changed."""
+        if self.tree is None:
+            return
+        for number in range(REGISTER_COUNT):
+            if self._shown[number] != self.registers.values[number]:
+                self._show_register(number)
 
     def clear_registers(self) -> None:
         """Reset all registers to zero."""
-        # Clear highlight first
-        if self.last_highlighted_item:
-            index = self.tree.index(self.last_highlighted_item)
-            tag = 'evenrow' if index % 2 == 0 else 'oddrow'
-            self.tree.item(self.last_highlighted_item, tags=(tag,))
-            self.last_highlighted_item = None
+        self.registers.reset()
+        if self.tree is None:
+            return
 
+        # Clear highlight first
+        self.clear_highlight()
         for item in self.tree.get_children():
-            register_name = self.tree.item(item)['values'][0]
-            if register_name != "$zero":  # Don't modify $zero
-                self.tree.set(item, column="Value", value="0x00000000")
+            self.tree.set(item, column="Value", value="0x00000000")
+        self._shown = array('I', [0] * REGISTER_COUNT)
 
     def clear_highlight(self) -> None:
         """Clear the highlight from the last modified register."""
-        if self.last_highlighted_item:
+        if self.tree is not None and self.last_highlighted_item:
             index = self.tree.index(self.last_highlighted_item)
             tag = 'evenrow' if index % 2 == 0 else 'oddrow'
             self.tree.item(self.last_highlighted_item, tags=(tag,))
             self.last_highlighted_item = None
-
-    def execute_arithmetic(self, dest: str, src1: str, src2: str, operation: str) -> None:
-        """Execute arithmetic operations."""
-        if operation not in self._operation_map:
-            raise ValueError(f"Unknown operation: {operation}")
-            
-        val1 = self.get_register_value(src1)
-        val2 = self.get_register_value(src2)
-        result = self._operation_map[operation](val1, val2)
-        self.update_register_value(dest, result)
-
-    def execute_logical(self, dest: str, src1: str, src2: str, operation):
-      val1 = self.get_register_value(src1)
-      val2 = self.get_register_value(src2)
-      result = operation(val1, val2)
-      self.update_register_value(dest, result)
-
-    def execute_shift(self, dest: str, src1: str, shift_amount: int, operation):
-        val1 = self.get_register_value(src1)
-        result = operation(val1, shift_amount)
-        self.update_register_value(dest, result)
-
-    def execute_slt(self, dest: str, src1: str, src2: str):
-        val1 = self.get_register_value(src1)
-        val2 = self.get_register_value(src2)
-        result = 1 if val1 < val2 else 0
-        self.update_register_value(dest, result)
-
-    def execute_addi(self, dest: str, src1: str, immediate: int):
-        val1 = self.get_register_value(src1)
-        result = val1 + immediate
-        self.update_register_value(dest, result)
-
-    def execute_logical_immediate(self, dest: str, src1: str, immediate: int, operation: str) -> None:
-        """Execute logical immediate operations (andi, ori)."""
-        val1 = self.get_register_value(src1)
-        result = self._operation_map[operation](val1, immediate)
-        self.update_register_value(dest, result)
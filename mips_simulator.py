@@ -0,0 +1,397 @@
+# mips_simulator.py
+"""Headless MIPS simulator.
+
+Runs a program without the Tk user interface, e.g.
+
+    python -m mips_simulator run prog.s --max-steps 1000000 --dump-json
+"""
+import sys
+import time
+from array import array
+from typing import List, Optional, Sequence, TYPE_CHECKING
+
+from parser import MIPSParser
+from memory import MIPSMemory, TEXT_BASE, STATIC_DATA_BASE, STACK_POINTER_INIT, GLOBAL_POINTER_INIT
+from mips_commands import MIPSProcessor
+from executor import MIPSExecutor, RunResult
+from assembler import MIPSAssembler
+from assembly_cache import MIPSAssemblyCache
+from machine import MIPSMachine
+from breakpoints import Condition
+from register_file import REGISTER_NAMES
+
+if TYPE_CHECKING:
+    import argparse
+    from snapshot import MachineSnapshot
+
+DATA_MEMORY_BASE = STATIC_DATA_BASE
+DATA_MEMORY_SIZE = 512  # Bytes of .data reported, same as the GUI data view
+DEFAULT_MAX_STEPS = 10_000_000
+
+# Process exit status per stop reason
+EXIT_CODES = {"exit": 0, "end": 0, "error": 1, "limit": 2, "breakpoint": 3, "watchpoint": 3}
+
+class HeadlessSimulator:
+    def __init__(self, log_callback=None, byteorder: str = "little"):
+        self.parser = MIPSParser()
+        self.assembly = MIPSAssemblyCache(self.parser)
+        self.memory = MIPSMemory(DATA_MEMORY_BASE, DATA_MEMORY_SIZE, byteorder)
+        self.processor = MIPSProcessor()
+        self.log_callback = log_callback or (lambda message: None)
+        self.executor: Optional[MIPSExecutor] = None
+        self.machine: Optional[MIPSMachine] = None
+        self.engine = None  # Whichever of executor/machine runs the loaded program
+        self.instructions: List[dict] = []
+
+    def load(self, code: str) -> None:
+        """Assemble and load a program, mirroring the GUI's load step."""
+        program = self.assembly.assemble(code, DATA_MEMORY_BASE)
+        self.memory.allocate_data(program.symbols)
+        self.instructions = program.instructions
+
+        self.executor = MIPSExecutor(self.processor, self.memory, program.labels, lambda pc: None, self.log_callback)
+        self.executor.decoder = self.assembly
+        self.processor.update_register_value("$ra", program.end)  # Returning from main ends the program
+        self.processor.update_register_value("$gp", GLOBAL_POINTER_INIT)
+        self.processor.update_register_value("$sp", STACK_POINTER_INIT)
+        self.executor.set_instructions(self.instructions)
+        self.engine = self.executor
+
+    def load_machine_code(self, code: str) -> None:
+        """Assemble a program to machine code and load it for the fetch-decode-execute core."""
+        program = self.assembly.assemble(code, DATA_MEMORY_BASE)
+        sources = [instruction["source"] for instruction in program.instructions]
+        image = self.assembly.converter.assemble(sources, program.symbols, labels=program.labels)
+
+        self.memory.allocate_data(program.symbols)
+        self.load_image(image)
+
+    def load_image(self, image: Sequence[int], data: bytes = b"") -> None:
+        """Load a pre-assembled text image (and optional raw .data bytes) without parsing."""
+        for offset, value in enumerate(data):
+            self.memory.write_byte(DATA_MEMORY_BASE + offset, value)
+
+        self.machine = MIPSMachine(self.processor, self.memory)
+        self.machine.load_image(image)
+        self.processor.update_register_value("$ra", self.machine.text_end)
+        self.processor.update_register_value("$gp", GLOBAL_POINTER_INIT)
+        self.processor.update_register_value("$sp", STACK_POINTER_INIT)
+        self.engine = self.machine
+
+    def add_breakpoint(self, location, condition: Optional[str] = None) -> int:
+        """Break before a text label or instruction address, optionally only when condition holds.
+
+        Returns the instruction index of the breakpoint.
+        """
+        line = self.executor.breakpoints.resolve_line(location, self.executor.labels, self.executor.line_at)
+        self.executor.breakpoints.add_breakpoint(line, Condition.parse(condition) if condition else None)
+        return line
+
+    def remove_breakpoint(self, location) -> None:
+        line = self.executor.breakpoints.resolve_line(location, self.executor.labels, self.executor.line_at)
+        self.executor.breakpoints.remove_breakpoint(line)
+
+    def add_watchpoint(self, location) -> None:
+        """Stop after an instruction changes a .data label or memory address."""
+        self.executor.breakpoints.add_watchpoint(location, self.memory)
+
+    def snapshot(self) -> "MachineSnapshot":
+        return self.executor.snapshot()
+
+    def restore(self, snapshot: "MachineSnapshot") -> None:
+        self.executor.restore(snapshot)
+
+    def save_snapshot(self, path: str) -> None:
+        from snapshot import save_snapshot
+        save_snapshot(path, self.executor.snapshot())
+
+    def load_snapshot(self, path: str) -> None:
+        """Resume from a snapshot file written for the currently loaded program."""
+        from snapshot import load_snapshot
+        self.executor.restore(load_snapshot(path))
+
+    def run(self, max_steps: int) -> RunResult:
+        result = self.engine.run(max_steps)
+        if self.engine is self.machine and self.machine.error:
+            self.log_callback(self.machine.error)
+        return result
+
+    def registers(self) -> dict:
+        return {name: self.processor.registers.read(number) for number, name in enumerate(REGISTER_NAMES)}
+
+    def data_memory(self) -> List[int]:
+        return list(self.memory.get_data_memory_values())
+
+def _format_text(report: dict) -> str:
+    lines = [
+        f"Stopped: {report['reason']} after {report['instructions']} instructions "
+        f"in {report['wall_time']:.6f} s (PC=0x{report['pc']:08X})",
+        "Registers:",
+    ]
+    for name, value in report["registers"].items():
+        lines.append(f"  {name:<5} 0x{value:08X}")
+
+    lines.append("Data memory:")
+    words = report["data_memory"]["words"]
+    base = report["data_memory"]["base"]
+    for row in range(0, len(words), 8):
+        values = " ".join(f"0x{value:08X}" for value in words[row:row + 8])
+        lines.append(f"  0x{base + row * 4:08X}: {values}")
+
+    profile = report.get("profile")
+    if profile:
+        lines.append(f"Hottest instructions ({profile['total']} executed):")
+        for entry in profile["instructions"]:
+            lines.append(f"  {entry['address']} {entry['count']:>10} {entry['percent']:6.2f}%  {entry['source']}")
+        lines.append("Per label:")
+        for label, count in profile["labels"].items():
+            lines.append(f"  {label:<16} {count:>10}")
+        lines.append("Branches (taken / not taken):")
+        for entry in profile["branches"]:
+            lines.append(f"  {entry['address']} {entry['taken']:>10} / {entry['not_taken']:<10} {entry['source']}")
+
+    call_graph = report.get("call_graph")
+    if call_graph:
+        lines.append(f"Functions (calls, inclusive / exclusive instructions; max depth {call_graph['max_depth']}):")
+        for entry in call_graph["functions"]:
+            lines.append(f"  {entry['function']:<16} {entry['calls']:>8} {entry['inclusive']:>12} / {entry['exclusive']:<12}")
+        lines.append("Calls:")
+        for edge in call_graph["edges"]:
+            lines.append(f"  {edge['caller']} -> {edge['callee']}: {edge['calls']}")
+
+    pipeline = report.get("pipeline")
+    if pipeline:
+        stalls = pipeline["stalls"]
+        lines.append(f"Pipeline ({'forwarding' if pipeline['forwarding'] else 'no forwarding'}): "
+                     f"{pipeline['cycles']} cycles, CPI {pipeline['cpi']:.3f}")
+        lines.append(f"  RAW stalls {stalls['raw']}, load-use stalls {stalls['load_use']}, "
+                     f"branch flushes {stalls['branch_flush']}, fill {stalls['pipeline_fill']}")
+        lines.append("Cycles lost per instruction (RAW / load-use / branch flush):")
+        for entry in pipeline["lines"]:
+            lines.append(f"  {entry['address']} {entry['raw']:>8} {entry['load_use']:>8} {entry['branch_flush']:>8}  "
+                         f"{entry['source']}")
+
+    for name, title in (("icache", "I-cache"), ("dcache", "D-cache")):
+        cache = report.get("caches", {}).get(name)
+        if cache:
+            lines.append(f"{title} ({cache['config']}):")
+            lines.append(f"  {cache['accesses']} accesses, {cache['misses']} misses ({100 * cache['miss_rate']:.2f}%), "
+                         f"{cache['writebacks']} memory writes, {cache['penalty_cycles']} penalty cycles")
+            for entry in cache["sites"]:
+                lines.append(f"  {entry['address']} {entry['misses']:>8} / {entry['accesses']:<8} "
+                             f"{entry['penalty_cycles']:>8} cycles  {entry['source']}")
+
+    prediction = report.get("branch_prediction")
+    if prediction:
+        lines.append(f"Branch prediction ({prediction['predictor']}):")
+        lines.append(f"  {prediction['branches']} branches, {prediction['mispredictions']} mispredicted "
+                     f"({100 * prediction['misprediction_rate']:.2f}%), {prediction['penalty_cycles']} penalty cycles")
+        for entry in prediction["sites"]:
+            lines.append(f"  {entry['address']} {entry['mispredictions']:>8} / {entry['executions']:<8} "
+                         f"{100 * entry['misprediction_rate']:6.2f}%  {entry['source']}")
+    return "\n".join(lines)
+
+def _read_image(path: str, byteorder: str = "little") -> array:
+    image = array("I")
+    with open(path, "rb") as binary:
+        image.frombytes(binary.read())
+    if sys.byteorder != byteorder:
+        image.byteswap()  # Images are little-endian unless assembled with --big-endian
+    return image
+
+def run_file(path: str, max_steps: int, machine_code: bool = False, data_path: Optional[str] = None,
+             breakpoints: Sequence[str] = (), watchpoints: Sequence[str] = (), resume: Optional[str] = None,
+             snapshot_path: Optional[str] = None, snapshot_every: int = 0, profile: bool = False,
+             call_graph_path: Optional[str] = None, pipeline: Optional[str] = None,
+             icache: Optional[str] = None, dcache: Optional[str] = None, predictor: Optional[str] = None,
+             byteorder: str = "little") -> dict:
+    simulator = HeadlessSimulator(log_callback=lambda message: print(message, file=sys.stderr), byteorder=byteorder)
+    if path.endswith(".bin"):
+        data = b""
+        if data_path:
+            with open(data_path, "rb") as data_file:
+                data = data_file.read()
+        simulator.load_image(_read_image(path, byteorder), data)
+    else:
+        with open(path) as source:
+            code = source.read()
+        if machine_code:
+            simulator.load_machine_code(code)
+        else:
+            simulator.load(code)
+    if (breakpoints or watchpoints or resume or snapshot_path or profile or call_graph_path or pipeline
+            or icache is not None or dcache is not None or predictor) \
+            and simulator.engine is not simulator.executor:
+        raise ValueError("Breakpoints, watchpoints, snapshots and profiling need an assembly source run "
+                         "without --machine-code")
+    if profile:
+        simulator.executor.enable_profiling()
+    if pipeline:
+        simulator.executor.enable_pipeline(forwarding=pipeline == "forwarding")
+    if icache is not None or dcache is not None:
+        from cache import CacheConfig
+        simulator.executor.enable_caches(None if icache is None else CacheConfig.parse(icache),
+                                         None if dcache is None else CacheConfig.parse(dcache))
+    if predictor:
+        from predictor import PredictorConfig
+        simulator.executor.enable_branch_prediction(PredictorConfig.parse(predictor))
+    if resume:
+        simulator.load_snapshot(resume)
+    if call_graph_path:
+        simulator.executor.enable_call_graph()  # After --resume, so the entry frame is where the run starts
+    for breakpoint in breakpoints:
+        location, _, condition = breakpoint.partition(" if ")
+        simulator.add_breakpoint(location, condition or None)
+    for watchpoint in watchpoints:
+        simulator.add_watchpoint(watchpoint)
+    start = time.perf_counter()
+    steps = 0
+    while True:
+        # With --snapshot-every the run is split into chunks and a snapshot is saved after each one
+        chunk = min(snapshot_every, max_steps - steps) if snapshot_every else max_steps - steps
+        result = simulator.run(chunk)
+        steps += result.steps
+        if snapshot_path:
+            simulator.save_snapshot(snapshot_path)
+        if result.reason != "limit" or steps >= max_steps:
+            break
+    result = RunResult(steps, result.reason)
+    wall_time = time.perf_counter() - start
+
+    report = {
+        "program": path,
+        "reason": result.reason,
+        "instructions": result.steps,
+        "wall_time": wall_time,
+        "pc": simulator.engine.program_counter,
+        "registers": simulator.registers(),
+        "data_memory": {"base": DATA_MEMORY_BASE, "words": simulator.data_memory()},
+    }
+    if profile:
+        report["profile"] = simulator.executor.profile_report()
+    if call_graph_path:
+        call_graph = simulator.executor.call_graph
+        report["call_graph"] = call_graph.report()
+        with open(call_graph_path, "w") as output:
+            output.write(call_graph.collapsed())
+    if pipeline:
+        report["pipeline"] = simulator.executor.pipeline.report()
+    if icache is not None or dcache is not None:
+        report["caches"] = simulator.executor.caches.report()
+    if predictor:
+        report["branch_prediction"] = simulator.executor.predictor.report()
+    return report
+
+def assemble_file(path: str, output: Optional[str], byteorder: str, data_output: Optional[str] = None) -> int:
+    """Assemble a .s file into a binary text image, or print a hex listing when no output is given."""
+    assembler = MIPSAssembler()
+    with open(path) as source:
+        program = assembler.assemble(source.read(), DATA_MEMORY_BASE)
+
+    converter = assembler.converter
+    symbols = program.symbols
+    instructions = [instruction["source"] for instruction in program.instructions]
+    try:
+        image = converter.assemble(instructions, symbols, labels=program.labels)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if output:
+        converter.write_binary(output, image, byteorder)
+        print(f"Wrote {len(image)} words to {output}")
+    if data_output:
+        data_end = max((symbol.address + symbol.size for symbol in symbols.values()), default=DATA_MEMORY_BASE)
+        memory = MIPSMemory(DATA_MEMORY_BASE, DATA_MEMORY_SIZE, byteorder)
+        memory.allocate_data(symbols)
+        with open(data_output, "wb") as data_file:
+            data_file.write(memory.view(DATA_MEMORY_BASE, data_end - DATA_MEMORY_BASE))
+        print(f"Wrote {data_end - DATA_MEMORY_BASE} data bytes to {data_output}")
+    if not output and not data_output:
+        for index, word in enumerate(image):
+            print(f"0x{TEXT_BASE + index * 4:08X}: 0x{word:08X}")
+    return 0
+
+def build_arg_parser() -> "argparse.ArgumentParser":
+    import argparse  # Only needed by the command line entry point
+
+    arg_parser = argparse.ArgumentParser(prog="mips_simulator", description="Headless MIPS simulator")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser(
+        "run",
+        help="Run a .s program and print the final machine state",
+        description="Exit status: 0 on syscall 10 or end of text, 1 on error, 2 if --max-steps was reached, "
+                    "3 at a breakpoint or watchpoint.",
+    )
+    run_parser.add_argument("program", help="MIPS assembly source file, or a .bin text image")
+    run_parser.add_argument("--machine-code", action="store_true",
+                            help="Assemble the source and run the machine words instead of interpreting the source")
+    run_parser.add_argument("--data", help="Raw .data image loaded at 0x10010000 when running a .bin file")
+    run_parser.add_argument("--max-steps", type=int, default=DEFAULT_MAX_STEPS,
+                            help=f"Instruction budget (default: {DEFAULT_MAX_STEPS})")
+    run_parser.add_argument("--break", dest="breakpoints", action="append", default=[], metavar="LOCATION",
+                            help="Stop before a text label or instruction address; "
+                                 "append ' if $reg OP value' for a conditional breakpoint (repeatable)")
+    run_parser.add_argument("--watch", dest="watchpoints", action="append", default=[], metavar="LOCATION",
+                            help="Stop after a .data label or memory address changes (repeatable)")
+    run_parser.add_argument("--resume", metavar="SNAPSHOT", help="Continue from a snapshot saved for this program")
+    run_parser.add_argument("--save-snapshot", metavar="SNAPSHOT", help="Save the machine state to this file when the run stops")
+    run_parser.add_argument("--snapshot-every", type=int, default=0, metavar="N",
+                            help="With --save-snapshot, also save every N instructions so a crashed job can be resumed")
+    run_parser.add_argument("--profile", action="store_true",
+                            help="Count executions per instruction and label, branch outcomes and memory accesses")
+    run_parser.add_argument("--call-graph", metavar="FILE",
+                            help="Follow jal/jr calls, report per-function counts and write collapsed stacks "
+                                 "(flamegraph.pl / speedscope input) to FILE")
+    run_parser.add_argument("--pipeline", nargs="?", const="forwarding", choices=["forwarding", "no-forwarding"],
+                            help="Estimate cycles on a five-stage pipeline, with stall and branch flush counts per "
+                                 "instruction (default: forwarding)")
+    run_parser.add_argument("--icache", nargs="?", const="", metavar="OPTIONS",
+                            help="Model an instruction cache, e.g. size=4k,block=16,ways=2,replacement=lru,penalty=10")
+    run_parser.add_argument("--dcache", nargs="?", const="", metavar="OPTIONS",
+                            help="Model a data cache; also accepts write=back or write=through")
+    run_parser.add_argument("--predictor", metavar="SCHEME[,OPTIONS]",
+                            help="Score a branch predictor: not-taken, taken, 1bit, 2bit or gshare, with options "
+                                 "entries=N, history=BITS, btb=N, penalty=CYCLES (e.g. gshare,entries=4k,btb=64); "
+                                 "with --pipeline, mispredictions decide branch flushes")
+    run_parser.add_argument("--big-endian", action="store_true",
+                            help="Use big-endian memory and read .bin and --data images as written by "
+                                 "assemble --big-endian (default: little-endian)")
+    run_parser.add_argument("--dump-json", action="store_true", help="Print the final state as JSON")
+
+    assemble_parser = commands.add_parser("assemble", help="Assemble a .s program into a binary text image")
+    assemble_parser.add_argument("program", help="MIPS assembly source file")
+    assemble_parser.add_argument("-o", "--output", help="Write the image to this .bin file (default: print a hex listing)")
+    assemble_parser.add_argument("--data-output", help="Also write the initial .data bytes to this file")
+    assemble_parser.add_argument("--big-endian", action="store_true", help="Write words big-endian (default: little-endian)")
+    return arg_parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+
+    if args.command == "run":
+        try:
+            report = run_file(args.program, args.max_steps, args.machine_code, args.data,
+                              args.breakpoints, args.watchpoints, args.resume, args.save_snapshot, args.snapshot_every,
+                              args.profile, args.call_graph, args.pipeline, args.icache, args.dcache,
+                              args.predictor, "big" if args.big_endian else "little")
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        if args.dump_json:
+            import json
+            print(json.dumps(report, indent=2))
+        else:
+            print(_format_text(report))
+        return EXIT_CODES[report["reason"]]
+    if args.command == "assemble":
+        try:
+            return assemble_file(args.program, args.output, "big" if args.big_endian else "little", args.data_output)
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,83 +1,127 @@
 # parser.py
-from typing import Dict, List
-import re
+from typing import Dict, List, NamedTuple, Tuple
+
+from memory import STATIC_DATA_BASE
+
+class DataSymbol(NamedTuple):
+    address: int
+    size: int  # Size in bytes
+    unit: int  # Element size in bytes: 4 for .word, 2 for .half, 1 for .byte/.space
+    values: Tuple[int, ...]  # Initial element values, empty for .space
+
+# Data directive -> element size in bytes
+DATA_DIRECTIVES = {".word": 4, ".half": 2, ".byte": 1, ".space": 1}
 
 class MIPSParser:
-    def parse_data_section(self, lines: List[str]) -> Dict[str, int]:
-        data_section = {}
-        try:
-            data_start = next((i for i, line in enumerate(lines) if line.strip() == ".data"), None)
-            if data_start is not None:
-                try:
-                    data_end = next(i for i, line in enumerate(lines[data_start+1:], start=data_start+1) 
-                                    if line.strip() == ".text" or not line.strip())
-                except StopIteration:
-                    data_end = len(lines)
-
-                for line in lines[data_start+1:data_end]:
-                    line = line.strip()
-                    if ":" in line and ".word" in line:
-                        parts = line.split(":")
-                        var_name = parts[0].strip()
-                        value_part = parts[1].strip().split()
-
-                        if len(value_part) > 1 and value_part[0] == ".word":
-                            value_str = value_part[1]
-                            try:
-                                if value_str.lower().startswith("0x") or value_str.lower().startswith("-0x"):
-                                    var_value = int(value_str, 16)
-                                elif value_str.startswith("-"):
-                                  var_value = int(value_str)
-                                else:
-                                  var_value = int(value_str)
-                                data_section[var_name] = var_value
-                            except ValueError:
-                                pass
-        except Exception:
-            pass
-        
-        return data_section
-
-    def parse_text_section(self, lines: List[str]) -> List[dict]:
-        instructions = []
-        address = 0x00400000
-        
+    def build_symbol_table(self, lines: List[str], base_address: int = STATIC_DATA_BASE) -> Dict[str, DataSymbol]:
+        """Lay out the .data section from base_address and map each label to its address and size."""
+        symbols: Dict[str, DataSymbol] = {}
+        address = base_address
+        pending_label = None
+
+        for line in self.data_lines(lines):
+            line = line.split('#')[0].strip()
+            if ":" in line:
+                label, line = (part.strip() for part in line.split(":", 1))
+                pending_label = label
+            if not line:
+                continue  # Label on its own line names the next directive
+
+            parts = line.split(None, 1)  # Directive and operands may be separated by tabs
+            directive, operands = parts[0], parts[1] if len(parts) > 1 else ""
+            unit = DATA_DIRECTIVES.get(directive)
+            if unit is None:
+                continue
+            try:
+                values = tuple(self._parse_int(value) for value in operands.replace(",", " ").split())
+            except ValueError:
+                continue
+            if directive == ".space":
+                size, values = (values[0] if values else 0), ()
+            else:
+                size = unit * len(values)
+
+            address = (address + unit - 1) & ~(unit - 1)  # Natural alignment
+            if pending_label:
+                symbols[pending_label] = DataSymbol(address, size, unit, values)
+                pending_label = None
+            address += size
+
+        return symbols
+
+    @staticmethod
+    def data_lines(lines: List[str]) -> List[str]:
+        """Lines between .data and the next .text (or an empty line)."""
+        data_start = next((i for i, line in enumerate(lines) if line.strip() == ".data"), None)
+        if data_start is None:
+            return []
+        data_end = next((i for i, line in enumerate(lines[data_start+1:], start=data_start+1)
+                         if line.strip() == ".text" or not line.strip()), len(lines))
+        return lines[data_start+1:data_end]
+
+    @staticmethod
+    def _parse_int(value_str: str) -> int:
+        if value_str.lower().startswith("0x") or value_str.lower().startswith("-0x"):
+            return int(value_str, 16)
+        return int(value_str)
+
+    def parse_text_section(self, lines: List[str]) -> List[str]:
+        """Normalised instruction sources of the text section, with each label attached to the next instruction."""
+        return self.attach_labels([self.parse_instruction(line) for line in self.text_lines(lines)])
+
+    @staticmethod
+    def attach_labels(sources: List[str]) -> List[str]:
+        """Drop empty sources and prefix label-only lines to the instruction after them.
+
+        Labels after the last instruction are kept as a final label-only
+        line, which names the end of the text section.
+        """
+        attached = []
+        pending = []
+        for source in sources:
+            if not source:
+                continue
+            if all(part.endswith(":") for part in source.split()):
+                pending.append(source)
+            elif pending:
+                attached.append(" ".join(pending + [source]))
+                pending = []
+            else:
+                attached.append(source)
+        if pending:
+            attached.append(" ".join(pending))
+        return attached
+
+    @staticmethod
+    def text_lines(lines: List[str]) -> List[str]:
+        """Lines from main: (or the line after .text) to the end."""
         text_start = next((i for i, line in enumerate(lines) if line.strip() == ".text"), None)
 
         if text_start is None:
             main_start = 0
         else:
             main_start = next((i for i, line in enumerate(lines[text_start+1:], start=text_start+1) if line.strip() == "main:"), text_start+1)
-        
-        for line in lines[main_start:]:
-            line = line.strip()
-            if not line or line.startswith(('.', ':')):
-                continue
-            if '#' in line:
-                line = line.split('#')[0].strip()
-                
-            if line:
-                parts = [part.strip() for part in line.replace(",", " ").split()]
-                for i, part in enumerate(parts):
-                    if part.lower().startswith("0x") or part.lower().startswith("-0x") or part.startswith("-") and not part[1:].isalpha():
-                        try:
-                            if part.lower().startswith("0x") or part.lower().startswith("-0x"):
-                                parts[i] = int(part, 16)
-                            else:
-                                parts[i] = int(part)
-                        except ValueError:
-                            pass
-                instructions.append({
-                    "address": f"0x{address:08X}",
-                    "source": " ".join(str(part) for part in parts)
-                })
-                address += 4
-        return instructions
-
-    def map_labels(self, instructions: List[str]) -> Dict[str, int]:
-        labels = {}
-        for index, instruction in enumerate(instructions):
-            if ':' in instruction:
-                label, _ = instruction.split(':', 1)
-                labels[label.strip()] = index
-        return labels
\ No newline at end of file
+        return lines[main_start:]
+
+    @staticmethod
+    def parse_instruction(line: str) -> str:
+        """Normalised source of one text line, or "" for directives, comments and blank lines."""
+        line = line.strip()
+        if not line or line.startswith(('.', ':')):
+            return ""
+        if '#' in line:
+            line = line.split('#')[0].strip()
+            
+        if not line:
+            return ""
+        parts = [part.strip() for part in line.replace(",", " ").split()]
+        for i, part in enumerate(parts):
+            if part.lower().startswith("0x") or part.lower().startswith("-0x") or part.startswith("-") and not part[1:].isalpha():
+                try:
+                    if part.lower().startswith("0x") or part.lower().startswith("-0x"):
+                        parts[i] = int(part, 16)
+                    else:
+                        parts[i] = int(part)
+                except ValueError:
+                    pass
+        return " ".join(str(part) for part in parts)
@@ -0,0 +1,145 @@
+# pipeline.py
+from array import array
+from typing import List, NamedTuple, Optional, Tuple
+
+from decoder import DecodedInstruction, BRANCHES, LOADS, STORES
+
+JUMPS = {"j", "jal", "jr"}
+IMMEDIATE_SOURCES = {"addi", "andi", "ori", "jr"} | LOADS  # Read rs only (rt, if any, is written)
+
+class _Timing(NamedTuple):
+    """Pipeline view of one decoded instruction, worked out once per line."""
+    sources: Tuple[int, ...]  # Registers needed at the start of EX
+    store_source: int  # Register a store needs at the start of MEM, 0 if none
+    dest: int
+    load: bool
+    penalty: int  # Flush cycles if the instruction redirects fetch (branches only when taken)
+    branch: bool
+
+class MIPSPipeline:
+    """Cycle model of the classic IF/ID/EX/MEM/WB pipeline.
+
+    The executor reports every executed instruction with the line it
+    continued at; the model does not execute anything itself. It tracks the
+    cycle each instruction enters EX and, per register, the first cycle a
+    consumer may enter EX, so a stall is just the gap between the two.
+    With forwarding, ALU results reach the next instruction's EX directly
+    and loads cost one stall to a dependent successor; without it, values
+    pass through the register file (written in the first half of WB, read
+    in the second half of ID). Branches resolve in EX and predict not
+    taken, so a taken branch flushes branch_penalty instructions (with a
+    branch predictor, a mispredicted one does); jumps resolve in ID and
+    flush jump_penalty.
+    """
+
+    def __init__(self, decoded: List[DecodedInstruction], forwarding: bool = True,
+                 branch_penalty: int = 2, jump_penalty: int = 1):
+        self.decoded = decoded
+        self.forwarding = forwarding
+        self.branch_penalty = branch_penalty
+        self.jump_penalty = jump_penalty
+        self._timing = [self._plan(d) for d in decoded]
+        count = len(decoded)
+        self.executions = array("q", bytes(8 * count))
+        self.raw_stalls = array("q", bytes(8 * count))  # Stall cycles waiting for an ALU result
+        self.load_stalls = array("q", bytes(8 * count))  # Stall cycles waiting for a load result
+        self.flushes = array("q", bytes(8 * count))  # Cycles lost to instructions fetched after a taken branch or jump
+        self.reset()
+
+    def reset(self) -> None:
+        for counters in (self.executions, self.raw_stalls, self.load_stalls, self.flushes):
+            counters[:] = array("q", bytes(8 * len(counters)))
+        self.instructions = 0
+        self.execute_cycle = 2  # Cycle the previous instruction entered EX; the first one enters at cycle 3
+        self.pending_flush = 0  # Bubbles before the next instruction reaches EX
+        self.ready = [0] * 32  # Register -> first cycle a consumer may be in EX
+        self.loaded = [False] * 32  # Register -> last written by a load
+
+    def _plan(self, d: DecodedInstruction) -> _Timing:
+        if d.handler is None:
+            return _Timing((), 0, 0, False, 0, False)
+        if d.op in ("li", "la", "j", "jal"):
+            sources = ()
+        elif d.op in IMMEDIATE_SOURCES:
+            sources = (d.rs,)
+        elif d.op in STORES:
+            sources = (d.rs,) if self.forwarding else (d.rs, d.rt)
+        elif d.op == "syscall":
+            sources = (2, 4)  # $v0 selects the service, $a0 is its argument
+        else:
+            sources = (d.rs, d.rt)
+        store_source = d.rt if d.op in STORES and self.forwarding else 0  # Forwarded to the store in MEM
+        penalty = self.branch_penalty if d.op in BRANCHES else self.jump_penalty if d.op in JUMPS else 0
+        return _Timing(tuple(r for r in sources if r), store_source, d.dest, d.op in LOADS, penalty,
+                       d.op in BRANCHES)
+
+    def issue(self, line: int, next_line: int, mispredicted: Optional[bool] = None) -> None:
+        """Account for the instruction at line, which continued at next_line.
+
+        For a branch scored by a MIPSBranchPredictor, mispredicted replaces
+        the predict-not-taken rule for deciding whether fetch is flushed.
+        """
+        sources, store_source, dest, load, penalty, branch = self._timing[line]
+        ready = self.ready
+        earliest = self.execute_cycle + 1 + self.pending_flush
+        execute = earliest
+        waited_on = 0
+        for register in sources:
+            if ready[register] > execute:
+                execute = ready[register]
+                waited_on = register
+        if store_source and ready[store_source] - 1 > execute:  # Needed one stage later, in MEM
+            execute = ready[store_source] - 1
+            waited_on = store_source
+        if waited_on:
+            if self.loaded[waited_on]:
+                self.load_stalls[line] += execute - earliest
+            else:
+                self.raw_stalls[line] += execute - earliest
+
+        self.executions[line] += 1
+        self.instructions += 1
+        self.execute_cycle = execute
+        if mispredicted is not None:
+            flush = mispredicted
+        else:
+            flush = penalty and (next_line != line + 1 or not branch)
+        if flush:
+            self.pending_flush = penalty
+            self.flushes[line] += penalty
+        else:
+            self.pending_flush = 0
+        if dest:
+            ready[dest] = execute + (3 if not self.forwarding else 2 if load else 1)  # Without forwarding: ID after WB
+            self.loaded[dest] = load
+
+    def set_branch_penalty(self, cycles: int) -> None:
+        """Flush cycles per taken (or mispredicted) branch from now on, e.g. a branch predictor's penalty."""
+        self.branch_penalty = cycles
+        self._timing = [self._plan(d) for d in self.decoded]
+
+    @property
+    def cycles(self) -> int:
+        """Cycles until the last reported instruction leaves WB (plus its flush, so the breakdown adds up)."""
+        return self.execute_cycle + 2 + self.pending_flush if self.instructions else 0
+
+    def report(self, top: Optional[int] = 20) -> dict:
+        """Cycle totals, CPI, the stall breakdown and the lines losing the most cycles, as plain data for JSON."""
+        raw, load_use, flush = sum(self.raw_stalls), sum(self.load_stalls), sum(self.flushes)
+        lost = [line for line in range(len(self.decoded))
+                if self.raw_stalls[line] or self.load_stalls[line] or self.flushes[line]]
+        lost.sort(key=lambda line: -(self.raw_stalls[line] + self.load_stalls[line] + self.flushes[line]))
+        return {
+            "forwarding": self.forwarding,
+            "cycles": self.cycles,
+            "instructions": self.instructions,
+            "cpi": round(self.cycles / self.instructions, 3) if self.instructions else 0.0,
+            "stalls": {"raw": raw, "load_use": load_use, "branch_flush": flush,
+                       "pipeline_fill": 4 if self.instructions else 0},
+            "lines": [
+                {"address": self.decoded[line].address, "source": self.decoded[line].source,
+                 "executions": self.executions[line], "raw": self.raw_stalls[line],
+                 "load_use": self.load_stalls[line], "branch_flush": self.flushes[line]}
+                for line in lost[:top]
+            ],
+        }
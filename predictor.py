@@ -0,0 +1,176 @@
+# predictor.py
+from array import array
+from typing import List, NamedTuple, Optional
+
+from cache import parse_size
+from decoder import DecodedInstruction, BRANCHES
+
+class PredictorConfig(NamedTuple):
+    scheme: str = "2bit"  # One of PREDICTORS
+    entries: int = 1024  # Prediction table entries (1-bit, 2-bit and gshare)
+    history_bits: int = 10  # Global history length (gshare)
+    btb_entries: int = 0  # Branch target buffer entries; 0 means targets are always known in time
+    penalty: int = 2  # Cycles lost per misprediction; also MIPSPipeline's branch_penalty when both are enabled
+
+    @classmethod
+    def parse(cls, text: str) -> "PredictorConfig":
+        """Parse "gshare,entries=4k,history=12,btb=64,penalty=2"; the scheme comes first."""
+        scheme, *items = [part.strip() for part in text.split(",")]
+        names = {"entries": "entries", "history": "history_bits", "btb": "btb_entries", "penalty": "penalty"}
+        values = {"scheme": scheme.lower() or cls.scheme}
+        for item in filter(None, items):
+            key, found, value = item.partition("=")
+            if not found or key.strip() not in names:
+                raise ValueError(f"Invalid predictor option: {item}")
+            values[names[key.strip()]] = parse_size(value)
+        return cls(**values).validated()
+
+    def validated(self) -> "PredictorConfig":
+        if self.scheme not in PREDICTORS:
+            raise ValueError(f"Unknown predictor {self.scheme}, use one of {', '.join(PREDICTORS)}")
+        if self.history_bits < 0:
+            raise ValueError(f"Predictor history must not be negative, got {self.history_bits}")
+        for name in ("entries", "btb_entries"):
+            value = getattr(self, name)
+            if value < 0 or value & (value - 1) or (name == "entries" and not value):
+                raise ValueError(f"Predictor {name} must be a power of two, got {value}")
+        return self
+
+    def __str__(self) -> str:
+        text = self.scheme
+        if self.scheme in ("1bit", "2bit", "gshare"):
+            text += f", {self.entries} entries"
+        if self.scheme == "gshare":
+            text += f", {self.history_bits}-bit history"
+        if self.btb_entries:
+            text += f", {self.btb_entries}-entry BTB"
+        return text + f", {self.penalty}-cycle penalty"
+
+# Prediction schemes. Tables are bytearrays indexed by the branch's word address
+# (its byte address >> 2, as a pseudo-instruction may span several words)
+# masked to the table size.
+
+class StaticPredictor:
+    def __init__(self, config: PredictorConfig):
+        self.taken = config.scheme == "taken"
+
+    def predict(self, pc: int) -> bool:
+        return self.taken
+
+    def update(self, pc: int, taken: bool) -> None:
+        pass
+
+class OneBitPredictor:
+    """Predict what the branch did last time."""
+
+    def __init__(self, config: PredictorConfig):
+        self.mask = config.entries - 1
+        self.table = bytearray(config.entries)
+
+    def predict(self, pc: int) -> bool:
+        return bool(self.table[pc & self.mask])
+
+    def update(self, pc: int, taken: bool) -> None:
+        self.table[pc & self.mask] = taken
+
+class TwoBitPredictor:
+    """Saturating counters 0-3; 2 and 3 predict taken. Counters start weakly not taken."""
+
+    def __init__(self, config: PredictorConfig):
+        self.mask = config.entries - 1
+        self.table = bytearray(b"\x01" * config.entries)
+
+    def predict(self, pc: int) -> bool:
+        return self.table[pc & self.mask] >= 2
+
+    def update(self, pc: int, taken: bool) -> None:
+        index = pc & self.mask
+        counter = self.table[index]
+        if taken:
+            if counter < 3:
+                self.table[index] = counter + 1
+        elif counter:
+            self.table[index] = counter - 1
+
+class GSharePredictor(TwoBitPredictor):
+    """Two-bit counters indexed by the branch address XOR the global taken/not-taken history."""
+
+    def __init__(self, config: PredictorConfig):
+        super().__init__(config)
+        self.history = 0
+        self.history_mask = (1 << config.history_bits) - 1
+
+    def predict(self, pc: int) -> bool:
+        return super().predict(pc ^ self.history)
+
+    def update(self, pc: int, taken: bool) -> None:
+        super().update(pc ^ self.history, taken)
+        self.history = ((self.history << 1) | taken) & self.history_mask
+
+PREDICTORS = {
+    "not-taken": StaticPredictor,
+    "taken": StaticPredictor,
+    "1bit": OneBitPredictor,
+    "2bit": TwoBitPredictor,
+    "gshare": GSharePredictor,
+}
+
+class MIPSBranchPredictor:
+    """Runs a prediction scheme alongside execution and scores it per branch.
+
+    The executor reports every executed beq/bne with the line it continued
+    at. With a branch target buffer, a taken prediction only helps when the
+    branch is in the BTB (it is entered when taken); otherwise fetch falls
+    through, as if not taken. Branch targets are fixed per instruction
+    here, so the BTB only keeps tags.
+    """
+
+    def __init__(self, decoded: List[DecodedInstruction], config: Optional[PredictorConfig] = None):
+        self.decoded = decoded
+        self.config = (config or PredictorConfig()).validated()
+        self.scheme = PREDICTORS[self.config.scheme](self.config)
+        self.btb_mask = self.config.btb_entries - 1
+        self.btb = array("q", [-1] * self.config.btb_entries) if self.config.btb_entries else None
+        self.word_addresses = [int(d.address, 16) >> 2 for d in decoded]
+        count = len(decoded)
+        self.executions = array("q", bytes(8 * count))
+        self.taken = array("q", bytes(8 * count))
+        self.mispredictions = array("q", bytes(8 * count))
+
+    def observe(self, line: int, next_line: int) -> bool:
+        """Predict and then train on the branch at line; returns True if it was mispredicted."""
+        taken = next_line != line + 1
+        pc = self.word_addresses[line]
+        predicted = self.scheme.predict(pc)
+        btb = self.btb
+        if btb is not None:
+            slot = pc & self.btb_mask
+            if predicted and btb[slot] != pc:
+                predicted = False  # No target to fetch from yet
+            if taken:
+                btb[slot] = pc
+        self.scheme.update(pc, taken)
+        self.executions[line] += 1
+        if taken:
+            self.taken[line] += 1
+        if predicted != taken:
+            self.mispredictions[line] += 1
+            return True
+        return False
+
+    def report(self) -> dict:
+        """Overall and per-branch misprediction rates and the cycles they cost, as plain data for JSON."""
+        executions, mispredictions = sum(self.executions), sum(self.mispredictions)
+        return {
+            "predictor": str(self.config),
+            "branches": executions,
+            "mispredictions": mispredictions,
+            "misprediction_rate": round(mispredictions / executions, 4) if executions else 0.0,
+            "penalty_cycles": mispredictions * self.config.penalty,
+            "sites": [
+                {"address": d.address, "source": d.source, "executions": self.executions[line],
+                 "taken": self.taken[line], "mispredictions": self.mispredictions[line],
+                 "misprediction_rate": round(self.mispredictions[line] / self.executions[line], 4)}
+                for line, d in enumerate(self.decoded) if d.op in BRANCHES and self.executions[line]
+            ],
+        }
@@ -0,0 +1,215 @@
+# profiler.py
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from decoder import DecodedInstruction, BRANCHES, LOADS, STORES
+
+if TYPE_CHECKING:
+    from block_compiler import CompiledBlock
+
+class MIPSProfiler:
+    """Execution counters for one loaded program.
+
+    Counts are kept in arrays indexed by instruction line. Compiled blocks
+    only bump one counter per block run (block_counts); interpreted
+    instructions bump counts directly, and the two are combined when a
+    report is built. Memory accesses are counted per address in dicts,
+    since addresses are sparse.
+    """
+
+    def __init__(self, instruction_count: int):
+        self.counts = array("q", bytes(8 * instruction_count))  # Interpreted executions per line
+        self.block_counts = array("q", bytes(8 * instruction_count))  # Compiled block runs per starting line
+        self.taken = array("q", bytes(8 * instruction_count))  # Taken branches per line
+        self.reads: Dict[int, int] = {}  # Address -> loads
+        self.writes: Dict[int, int] = {}  # Address -> stores
+
+    def reset(self) -> None:
+        """Zero all counters in place (compiled blocks keep references to the arrays)."""
+        for counters in (self.counts, self.block_counts, self.taken):
+            counters[:] = array("q", bytes(8 * len(counters)))
+        self.reads.clear()
+        self.writes.clear()
+
+    def before(self, line: int, d: DecodedInstruction, registers: Sequence[int]) -> None:
+        """Count an interpreted instruction and its memory access, before it runs."""
+        self.counts[line] += 1
+        if d.op in LOADS:
+            address = registers[d.rs] + d.imm
+            self.reads[address] = self.reads.get(address, 0) + 1
+        elif d.op in STORES:
+            address = registers[d.rs] + d.imm
+            self.writes[address] = self.writes.get(address, 0) + 1
+
+    def undo(self, line: int, d: DecodedInstruction, registers: Sequence[int]) -> None:
+        """Uncount an instruction stepped back over; registers hold the values it ran with, as in before()."""
+        self.counts[line] -= 1
+        if d.op in LOADS:
+            _uncount(self.reads, registers[d.rs] + d.imm)
+        elif d.op in STORES:
+            _uncount(self.writes, registers[d.rs] + d.imm)
+
+    def faulted(self, line: int) -> None:
+        """Uncount an interpreted instruction that raised instead of completing."""
+        self.counts[line] -= 1
+
+    def block_faulted(self, block: "CompiledBlock", fault: int, decoded: List[DecodedInstruction]) -> None:
+        """Uncount the instructions of a compiled block that did not complete because of a fault at line fault."""
+        for line in range(fault, block.end):
+            if decoded[line].handler is not None:
+                self.counts[line] -= 1
+
+    def instruction_counts(self, blocks: Dict[int, "CompiledBlock"], decoded: List[DecodedInstruction]) -> array:
+        """Executions per instruction line, combining compiled block runs and interpreted steps."""
+        counts = array("q", self.counts)
+        for start, block in blocks.items():
+            runs = self.block_counts[start]
+            if runs:
+                for line in range(block.start, block.end):
+                    if decoded[line].handler is not None:
+                        counts[line] += runs
+        return counts
+
+    def instruction_count(self, line: int, blocks: Dict[int, "CompiledBlock"],
+                          decoded: List[DecodedInstruction]) -> int:
+        """Executions of one line, as instruction_counts() reports it, without building the whole array."""
+        from block_compiler import TERMINATORS
+
+        count = self.counts[line]
+        start = line
+        while start >= 0:  # Only blocks starting after the previous branch or jump can cover line
+            block = blocks.get(start)
+            if block is not None and block.end > line:
+                count += self.block_counts[start]
+            start -= 1
+            if start >= 0 and decoded[start].op in TERMINATORS:
+                break
+        return count if decoded[line].handler is not None else 0
+
+    def report(self, decoded: List[DecodedInstruction], label_lines: Dict[str, int],
+               blocks: Dict[int, "CompiledBlock"], top: Optional[int] = 20) -> dict:
+        """Hottest lines, per-label totals, branch outcomes and memory accesses, as plain data for JSON."""
+        counts = self.instruction_counts(blocks, decoded)
+        total = sum(counts)
+
+        hottest = sorted((line for line in range(len(counts)) if counts[line]), key=lambda line: -counts[line])
+        instructions = [
+            {"address": decoded[line].address, "source": decoded[line].source, "count": counts[line],
+             "percent": round(100 * counts[line] / total, 2)}
+            for line in hottest[:top]
+        ]
+
+        # A label region runs from the label to the next label
+        regions: Dict[str, int] = {}
+        starts = sorted((line, label) for label, line in label_lines.items())
+        for index, (start, label) in enumerate(starts):
+            end = starts[index + 1][0] if index + 1 < len(starts) else len(counts)
+            regions[label] = sum(counts[start:end])
+        if starts and starts[0][0] > 0:
+            regions = {"(start)": sum(counts[:starts[0][0]]), **regions}
+
+        branches = [
+            {"address": d.address, "source": d.source, "taken": self.taken[line],
+             "not_taken": counts[line] - self.taken[line]}
+            for line, d in enumerate(decoded) if d.op in BRANCHES and counts[line]
+        ]
+        return {
+            "total": total,
+            "instructions": instructions,
+            "labels": regions,
+            "branches": branches,
+            "memory": {
+                "reads": {f"0x{address:08X}": n for address, n in sorted(self.reads.items())},
+                "writes": {f"0x{address:08X}": n for address, n in sorted(self.writes.items())},
+            },
+        }
+
+def _uncount(counts: Dict[int, int], address: int) -> None:
+    n = counts.get(address, 0) - 1
+    if n > 0:
+        counts[address] = n
+    else:
+        counts.pop(address, None)
+
+class MIPSCallGraph:
+    """Shadow call stack built from jal and jr.
+
+    jal pushes a frame for its target label; a jr to the return address of a
+    frame on the stack returns from it (and from any frames above it that
+    never returned). Other jr targets are treated as plain jumps. Time is
+    counted in executed instructions: the executor reports each jal and jr
+    with the instruction clock after it, and adds the instructions of each
+    run to clock when the run ends.
+    """
+
+    def __init__(self, root: str = "(entry)"):
+        self.clock = 0  # Instructions executed before the current run
+        self.stack: List[list] = [[root, 0, 0, -1]]  # [function, entry clock, children's inclusive count, return line]
+        self.calls: Dict[str, int] = {root: 1}
+        self.inclusive: Dict[str, int] = {}
+        self.exclusive: Dict[str, int] = {}
+        self.edges: Dict[Tuple[str, str], int] = {}
+        self.stacks: Dict[str, int] = {}  # Collapsed stack "a;b;c" -> exclusive instructions
+        self.max_depth = 1
+        self._active: Dict[str, int] = {root: 1}  # Frames per function currently on the stack
+
+    def event(self, d: DecodedInstruction, line: int, next_line: int, now: int) -> None:
+        """Handle the jal or jr d at line, which continued at next_line; now is the clock after it."""
+        if d.op == "jal":
+            caller, callee = self.stack[-1][0], d.label
+            self.stack.append([callee, now, 0, line + 1])
+            self.calls[callee] = self.calls.get(callee, 0) + 1
+            self.edges[(caller, callee)] = self.edges.get((caller, callee), 0) + 1
+            self._active[callee] = self._active.get(callee, 0) + 1
+            if len(self.stack) > self.max_depth:
+                self.max_depth = len(self.stack)
+            return
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth][3] == next_line:
+                while len(self.stack) > depth:
+                    self._return(now)
+                return
+
+    def _return(self, now: int) -> None:
+        path = ";".join(frame[0] for frame in self.stack)
+        name, entry, children, _ = self.stack.pop()
+        inclusive = now - entry
+        self._active[name] -= 1
+        if not self._active[name]:  # Recursive calls are inside the outermost one's inclusive count
+            self.inclusive[name] = self.inclusive.get(name, 0) + inclusive
+        self.exclusive[name] = self.exclusive.get(name, 0) + inclusive - children
+        if inclusive > children:
+            self.stacks[path] = self.stacks.get(path, 0) + inclusive - children
+        if self.stack:
+            self.stack[-1][2] += inclusive
+
+    def _finished(self) -> "MIPSCallGraph":
+        """A copy in which every frame still on the stack, the root included, has returned now."""
+        graph = MIPSCallGraph.__new__(MIPSCallGraph)
+        graph.__dict__.update({name: dict(value) if isinstance(value, dict) else value
+                               for name, value in self.__dict__.items()})
+        graph.stack = [list(frame) for frame in self.stack]
+        while graph.stack:
+            graph._return(self.clock)
+        return graph
+
+    def report(self) -> dict:
+        """Per-function counts, caller -> callee edges and maximum depth, as plain data for JSON."""
+        graph = self._finished()
+        functions = [
+            {"function": name, "calls": self.calls[name], "inclusive": graph.inclusive.get(name, 0),
+             "exclusive": graph.exclusive.get(name, 0)}
+            for name in self.calls
+        ]
+        functions.sort(key=lambda function: -function["inclusive"])
+        return {
+            "functions": functions,
+            "edges": [{"caller": caller, "callee": callee, "calls": n}
+                      for (caller, callee), n in sorted(self.edges.items(), key=lambda edge: -edge[1])],
+            "max_depth": self.max_depth,
+        }
+
+    def collapsed(self) -> str:
+        """Folded stacks ("main;fib;fib 42" per line), the input format of flamegraph.pl and speedscope."""
+        stacks = self._finished().stacks
+        return "".join(f"{path} {n}\n" for path, n in sorted(stacks.items()))
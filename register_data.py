@@ -12,6 +12,17 @@ class MIPSRegisters:
     RETURN_ADDR_REG = "$ra"
     TEMP_REGS = ["$t0", "$t1", "$t2", "$t3", "$t4", "$t5", "$t6", "$t7", "$t8", "$t9"]
     SAVED_REGS = ["$s0", "$s1", "$s2", "$s3", "$s4", "$s5", "$s6", "$s7"]
+
+    REGISTER_DEFINITIONS = (
+        ("$zero", 0), ("$at", 1),
+        ("$v0", 2), ("$v1", 3),
+        ("$a0", 4), ("$a1", 5), ("$a2", 6), ("$a3", 7),
+        *[(f"$t{i}", i+8) for i in range(8)],
+        *[(f"$s{i}", i+16) for i in range(8)],
+        ("$t8", 24), ("$t9", 25),
+        ("$k0", 26), ("$k1", 27),
+        ("$gp", 28), ("$sp", 29), ("$fp", 30), ("$ra", 31)
+    )
     
     @staticmethod
     def create_register(name: str, number: int) -> Register:
@@ -23,17 +34,9 @@ class MIPSRegisters:
 
     @classmethod
     def get_registers(cls) -> List[Register]:
-        register_definitions = [
-            ("$zero", 0), ("$at", 1),
-            ("$v0", 2), ("$v1", 3),
-            ("$a0", 4), ("$a1", 5), ("$a2", 6), ("$a3", 7),
-            *[(f"$t{i}", i+8) for i in range(8)],
-            *[(f"$s{i}", i+16) for i in range(8)],
-            ("$t8", 24), ("$t9", 25),
-            ("$k0", 26), ("$k1", 27),
-            ("$gp", 28), ("$sp", 29), ("$fp", 30), ("$ra", 31)
-        ]
-        
-        return [cls.create_register(name, number) for name, number in register_definitions]
+        return [cls.create_register(name, number) for name, number in cls.REGISTER_DEFINITIONS]
 
-register = MIPSRegisters.get_registers()
\ No newline at end of file
+    @classmethod
+    def get_register_index(cls) -> Dict[str, int]:
+        """Map register names to register numbers."""
+        return {name: number for name, number in cls.REGISTER_DEFINITIONS}
@@ -0,0 +1,47 @@
+# register_file.py
+from array import array
+from typing import Dict, List
+
+from register_data import MIPSRegisters
+
+REGISTER_COUNT = 32
+WORD_MASK = 0xFFFFFFFF
+
+# Register name -> register number, e.g. "$t0" -> 8
+REGISTER_INDEX: Dict[str, int] = MIPSRegisters.get_register_index()
+REGISTER_NAMES: List[str] = [name for name, _ in sorted(REGISTER_INDEX.items(), key=lambda item: item[1])]
+
+class RegisterFile:
+    """32 general purpose registers stored as unsigned 32-bit words.
+
+    This is the source of truth for register state; any widget showing the
+    registers is a view that syncs from ``values``.
+    """
+
+    def __init__(self):
+        self.values = array('I', [0] * REGISTER_COUNT)
+
+    @staticmethod
+    def index_of(register_name: str) -> int:
+        """Return the register number for a register name."""
+        try:
+            return REGISTER_INDEX[register_name]
+        except KeyError:
+            raise ValueError(f"Register {register_name} not found") from None
+
+    def read(self, number: int) -> int:
+        return self.values[number]
+
+    def write(self, number: int, value: int) -> None:
+        if number:  # $zero is hardwired to 0
+            self.values[number] = value & WORD_MASK
+
+    def get(self, register_name: str) -> int:
+        return self.values[self.index_of(register_name)]
+
+    def set(self, register_name: str, value: int) -> None:
+        self.write(self.index_of(register_name), value)
+
+    def reset(self) -> None:
+        for number in range(REGISTER_COUNT):
+            self.values[number] = 0
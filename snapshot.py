@@ -0,0 +1,95 @@
+# snapshot.py
+import struct
+from array import array
+from typing import Dict, Iterable, NamedTuple
+
+from memory import PAGE_SIZE
+from parser import DataSymbol
+from register_file import REGISTER_COUNT
+
+SNAPSHOT_MAGIC = b"MIPSSNAP"
+SNAPSHOT_VERSION = 1
+
+# magic, version, byte order (0 little, 1 big), program fingerprint, PC, current line, halted, page count, symbol count
+_HEADER = struct.Struct("<8sHBIIIBII")
+_PAGE_NUMBER = struct.Struct("<I")
+_REGISTERS = struct.Struct(f"<{REGISTER_COUNT}I")
+_SYMBOL = struct.Struct("<HIIBI")  # name length, address, size, unit, value count
+
+class MachineSnapshot(NamedTuple):
+    registers: array
+    program_counter: int
+    current_line: int
+    halted: bool
+    pages: Dict[int, bytearray]  # Copy-on-write page table from MIPSMemory.snapshot_pages()
+    symbols: Dict[str, DataSymbol]
+    program: int  # Fingerprint of the text section the snapshot belongs to
+    byteorder: str = "little"
+
+def program_fingerprint(sources: Iterable[str]) -> int:
+    """CRC-32 of the text section, used to refuse restoring a snapshot into another program."""
+    import zlib
+    return zlib.crc32("\n".join(sources).encode())
+
+def save_snapshot(path: str, snapshot: MachineSnapshot) -> None:
+    """Write a snapshot as a compressed binary file, replacing path atomically."""
+    import os
+    import zlib
+
+    pages = {number: page for number, page in snapshot.pages.items() if any(page)}  # All-zero pages read back as zero
+    body = [_REGISTERS.pack(*snapshot.registers)]
+    for number in sorted(pages):
+        body.append(_PAGE_NUMBER.pack(number))
+        body.append(bytes(pages[number]))
+    for name, symbol in snapshot.symbols.items():
+        encoded = name.encode()
+        body.append(_SYMBOL.pack(len(encoded), symbol.address, symbol.size, symbol.unit, len(symbol.values)))
+        body.append(encoded)
+        body.append(struct.pack(f"<{len(symbol.values)}q", *symbol.values))
+
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0 if snapshot.byteorder == "little" else 1,
+                          snapshot.program, snapshot.program_counter & 0xFFFFFFFF, snapshot.current_line,
+                          int(snapshot.halted), len(pages), len(snapshot.symbols))
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as output:
+        output.write(header)
+        output.write(zlib.compress(b"".join(body), 1))
+    os.replace(temporary, path)
+
+def load_snapshot(path: str) -> MachineSnapshot:
+    import zlib
+
+    with open(path, "rb") as source:
+        data = source.read()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"Not a snapshot file: {path}")
+    magic, version, byteorder, program, program_counter, current_line, halted, page_count, symbol_count = \
+        _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"Not a snapshot file: {path}")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    try:
+        body = memoryview(zlib.decompress(data[_HEADER.size:]))
+    except zlib.error as e:
+        raise ValueError(f"Corrupt snapshot file {path}: {e}") from None
+
+    registers = array("I", _REGISTERS.unpack_from(body))
+    offset = _REGISTERS.size
+    pages = {}
+    for _ in range(page_count):
+        (number,) = _PAGE_NUMBER.unpack_from(body, offset)
+        offset += _PAGE_NUMBER.size
+        pages[number] = bytearray(body[offset:offset + PAGE_SIZE])
+        offset += PAGE_SIZE
+    symbols = {}
+    for _ in range(symbol_count):
+        name_length, address, size, unit, count = _SYMBOL.unpack_from(body, offset)
+        offset += _SYMBOL.size
+        name = bytes(body[offset:offset + name_length]).decode()
+        offset += name_length
+        values = tuple(struct.unpack_from(f"<{count}q", body, offset))
+        offset += 8 * count
+        symbols[name] = DataSymbol(address, size, unit, values)
+    return MachineSnapshot(registers, program_counter, current_line, bool(halted), pages, symbols, program,
+                           "little" if byteorder == 0 else "big")
@@ -0,0 +1,88 @@
+# syntax_highlight.py
+import re
+import tkinter as tk
+from typing import Dict, List, Tuple
+
+from converter import MIPSConverter
+from register_file import REGISTER_INDEX
+
+OPCODES = set(MIPSConverter.FUNCTION_MAP) | set(MIPSConverter.OPCODE_MAP) | {"li", "la"}
+TOKEN_TAGS = ("opcode", "register", "label", "immediate", "directive", "comment")
+
+_TOKEN = re.compile(r"""
+    (?P<comment>\#.*)
+  | (?P<register>\$\w+)
+  | (?P<directive>\.\w+)
+  | (?P<immediate>-?0[xX][0-9a-fA-F]+|-?\d+)
+  | (?P<word>[A-Za-z_][\w.]*:?)
+""", re.VERBOSE)
+
+def tokenize(line: str) -> List[Tuple[str, int, int]]:
+    """(tag, start, end) spans of the highlighted tokens in one source line."""
+    spans = []
+    opcode_seen = False
+    for match in _TOKEN.finditer(line):
+        kind = match.lastgroup
+        if kind == "word":
+            word = match.group()
+            if word.endswith(":"):
+                kind = "label"  # Definition
+            elif not opcode_seen and word in OPCODES:
+                kind = "opcode"
+                opcode_seen = True
+            elif opcode_seen:
+                kind = "label"  # Branch target or data label operand
+            else:
+                continue
+        elif kind == "register" and match.group() not in REGISTER_INDEX:
+            continue
+        spans.append((kind, match.start(), match.end()))
+    return spans
+
+class MIPSHighlighter:
+    """Syntax highlighting for a Text editor that only ever looks at a few lines.
+
+    Tk tags move with the text they cover, so a line stays highlighted
+    until it is edited. The editor reports the lines a keystroke touched
+    and every scroll; lines scrolled into view are highlighted then, so the
+    cost of an edit or a scroll is bounded by the visible region, however
+    long the file is.
+    """
+
+    def __init__(self, text: tk.Text, colors: Dict[str, str]):
+        self.text = text
+        self._visible = (0, 0)  # Lines highlighted by the last highlight_visible
+        for tag in TOKEN_TAGS:
+            text.tag_configure(tag, foreground=colors[tag])
+
+    def highlight_lines(self, first: int, last: int) -> None:
+        """Re-highlight lines first to last (1-based, inclusive)."""
+        text = self.text
+        for tag in TOKEN_TAGS:
+            text.tag_remove(tag, f"{first}.0", f"{last}.end")
+        for number in range(first, last + 1):
+            for tag, start, end in tokenize(text.get(f"{number}.0", f"{number}.end")):
+                text.tag_add(tag, f"{number}.{start}", f"{number}.{end}")
+
+    def visible_lines(self) -> Tuple[int, int]:
+        first = int(self.text.index("@0,0").split(".")[0])
+        last = int(self.text.index(f"@0,{self.text.winfo_height()}").split(".")[0])
+        return first, last
+
+    def highlight_visible(self) -> None:
+        """Highlight the lines in view unless the view has not moved since the last call."""
+        first, last = self.visible_lines()
+        if (first, last) != self._visible:
+            self._visible = (first, last)
+            self.highlight_lines(first, last)
+
+    def highlight_edit(self, first: int, last: int) -> None:
+        """Re-highlight the edited lines first to last, clipped to the visible region."""
+        top, bottom = self.visible_lines()
+        first, last = max(first, top), min(last, bottom)
+        if first <= last:
+            self.highlight_lines(first, last)
+
+    def invalidate(self) -> None:
+        """Forget the highlighted region, e.g. after an undo that may have changed any line."""
+        self._visible = (0, 0)
@@ -0,0 +1,8 @@
+# tests/conftest.py
+import os
+import sys
+
+# The simulator is a set of top-level modules; make them importable when pytest runs from anywhere
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
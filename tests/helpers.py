@@ -0,0 +1,86 @@
+# tests/helpers.py
+"""Shared program and state comparison for the round-trip tests."""
+from memory import STACK_POINTER_INIT
+from mips_simulator import HeadlessSimulator
+
+# Exercises data loads/stores by label, pseudo-instructions of one to three
+# words, calls with a stack frame, variable shifts, byte accesses and
+# branches, and ends with syscall 10.
+PROGRAM = """
+.data
+values: .word 3, 1, 4, 1, 5, 9, 2, 6
+total: .word 0
+bytes: .byte 1, 2, 3, 4
+
+.text
+main:
+    li $s0, 0x12345678
+    la $s1, values
+    li $s2, 8
+    li $s3, 0
+sum_loop:
+    lw $t0, 0($s1)
+    add $s3, $s3, $t0
+    addi $s1, $s1, 4
+    addi $s2, $s2, -1
+    bne $s2, $zero, sum_loop
+    sw $s3, total
+    li $a0, 10
+    jal fib
+    add $s4, $v0, $zero
+    li $t1, 3
+    sllv $s5, $s4, $t1
+    srlv $s6, $s0, $t1
+    lb $t2, bytes+2
+    sb $t2, bytes
+    la $s7, fib
+    li $v0, 10
+    syscall
+fib:
+    addi $sp, $sp, -12
+    sw $ra, 0($sp)
+    sw $a0, 4($sp)
+    li $t1, 2
+    slt $t0, $a0, $t1
+    beq $t0, $zero, recurse
+    add $v0, $a0, $zero
+    addi $sp, $sp, 12
+    jr $ra
+recurse:
+    addi $a0, $a0, -1
+    jal fib
+    sw $v0, 8($sp)
+    lw $a0, 4($sp)
+    addi $a0, $a0, -2
+    jal fib
+    lw $t2, 8($sp)
+    add $v0, $v0, $t2
+    lw $ra, 0($sp)
+    addi $sp, $sp, 12
+    jr $ra
+"""
+
+STACK_WORDS = 64  # Words below the initial $sp compared by state()
+
+def load(code: str = PROGRAM) -> HeadlessSimulator:
+    simulator = HeadlessSimulator()
+    simulator.load(code)
+    return simulator
+
+def state(simulator: HeadlessSimulator, ignore=("$at",)) -> dict:
+    """Registers, data and stack memory and the PC; $at is ignored as only machine code uses it."""
+    registers = {name: value for name, value in simulator.registers().items() if name not in ignore}
+    stack = list(simulator.memory.read_words(STACK_POINTER_INIT + 4 - 4 * STACK_WORDS, STACK_WORDS))
+    return {
+        "registers": registers,
+        "data": simulator.data_memory(),
+        "stack": stack,
+        "pc": simulator.engine.program_counter,
+    }
+
+def run_steps(steps: int, code: str = PROGRAM) -> HeadlessSimulator:
+    """A fresh simulator that has executed exactly steps instructions."""
+    simulator = load(code)
+    result = simulator.run(steps)
+    assert result.steps == steps
+    return simulator
@@ -0,0 +1,45 @@
+# tests/test_assembler.py
+"""Two-pass layout: labels resolve to byte addresses and every line keeps the address the first pass gave it."""
+from assembler import MIPSAssembler
+from converter import MIPSConverter
+from helpers import PROGRAM, load
+from memory import TEXT_BASE
+
+def _offset(word: int) -> int:
+    """Signed 16-bit branch offset of an I-type word."""
+    offset = word & 0xFFFF
+    return offset - 0x10000 if offset & 0x8000 else offset
+
+def test_layout_counts_pseudo_instruction_words():
+    sources = ["main: li $t0, 0x12345678", "li $t1, 5", "loop:", "addi $t1, $t1, -1", "bne $t1, $zero, loop",
+               "j main"]
+    layout = MIPSConverter().layout(sources)
+    assert layout.sizes == [2, 1, 0, 1, 1, 1]
+    assert layout.addresses == [TEXT_BASE + 4 * words for words in (0, 2, 3, 3, 4, 5)]
+    assert layout.labels == {"main": TEXT_BASE, "loop": TEXT_BASE + 12}
+    assert layout.end == TEXT_BASE + 24
+
+def test_branch_offsets_and_jump_targets():
+    sources = ["main: beq $zero, $zero, done", "la $t0, main", "back: addi $t0, $t0, 1", "bne $t0, $zero, back",
+               "done: j main"]
+    words = MIPSConverter().assemble(sources)
+    assert _offset(words[0]) == 4  # Past la (two words) and two more instructions, relative to PC + 4
+    assert _offset(words[4]) == -2
+    assert words[5] & 0x03FFFFFF == TEXT_BASE >> 2
+
+def test_encode_errors_keep_the_layout():
+    sources = ["main: la $s0, nowhere", "loop: bne $t0, $zero, loop"]
+    listing = MIPSConverter().assemble_listing(sources)
+    assert listing[0][1].startswith("Error:")
+    assert _offset(int(listing[1][1], 2)) == -1  # At its laid-out address, 8 bytes after main
+
+def test_executor_and_image_share_addresses():
+    program = MIPSAssembler().assemble(PROGRAM)
+    simulator = load()
+    assert [instruction["address"] for instruction in simulator.executor.instructions] == \
+        [instruction["address"] for instruction in program.instructions]
+    image = MIPSConverter().assemble([instruction["source"] for instruction in program.instructions],
+                                     program.symbols, labels=program.labels)
+    assert TEXT_BASE + 4 * len(image) == program.end
+    for label, address in program.labels.items():
+        assert simulator.executor.line_at(address) == simulator.executor.label_lines[label]
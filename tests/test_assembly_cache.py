@@ -0,0 +1,68 @@
+# tests/test_assembly_cache.py
+"""Reloading through the assembly cache must give what a fresh assembly gives, redoing only the edited lines."""
+from assembler import MIPSAssembler
+from converter import MIPSConverter
+from helpers import PROGRAM, load, state
+from mips_simulator import HeadlessSimulator
+
+# Same size, no label moves
+EDITED = PROGRAM.replace("    li $t1, 2\n", "    li $t1, 3\n")
+# Two words more in main, so every later label moves
+GROWN = PROGRAM.replace("    li $s3, 0\n", "    li $s3, 0\n    li $t9, 0x10000\n")
+
+def _reloaded(*codes):
+    simulator = HeadlessSimulator()
+    for code in codes:
+        simulator.assembly.hits = simulator.assembly.misses = 0
+        simulator.load(code)
+    return simulator
+
+def _listing(program):
+    sources = [instruction["source"] for instruction in program.instructions]
+    return MIPSConverter().assemble_listing(sources, program.symbols, labels=program.labels)
+
+def _ran(code):
+    simulator = load(code)
+    simulator.run(1_000_000)
+    return simulator
+
+def test_assemble_matches_the_plain_assembler():
+    cache = HeadlessSimulator().assembly
+    for code in (PROGRAM, EDITED, GROWN, PROGRAM):
+        assert cache.assemble(code) == MIPSAssembler().assemble(code)
+
+def test_unchanged_reload_decodes_nothing():
+    simulator = _reloaded(PROGRAM, PROGRAM)
+    assert simulator.assembly.misses == 0
+    assert simulator.assembly.hits == len(simulator.instructions)
+
+def test_edit_decodes_only_the_edited_line():
+    simulator = _reloaded(PROGRAM, EDITED)
+    assert simulator.assembly.misses == 1
+    simulator.run(1_000_000)
+    assert state(simulator) == state(_ran(EDITED))
+
+def test_moved_labels_are_resolved_again():
+    simulator = _reloaded(PROGRAM, GROWN)
+    assert 0 < simulator.assembly.misses < len(simulator.instructions)
+    simulator.run(1_000_000)
+    assert state(simulator) == state(_ran(GROWN))
+
+def test_data_edit_drops_everything():
+    code = PROGRAM.replace(".word 3, 1, 4", ".word 3, 1, 4, 7")
+    simulator = _reloaded(PROGRAM, code)
+    assert simulator.assembly.hits == 0
+    assert simulator.run(1_000_000).reason == "exit"
+    assert state(simulator)["data"] == state(_ran(code))["data"]
+
+def test_listing_matches_the_converter():
+    cache = HeadlessSimulator().assembly
+    codes = [PROGRAM, EDITED, GROWN, ".text\nmain: la $s0, nowhere\nloop: bne $t0, $zero, loop\n"]
+    for code in codes:
+        program = cache.assemble(code)
+        assert cache.assemble_listing(program) == _listing(program)
+    program = cache.assemble(PROGRAM)
+    cache.assemble_listing(program)
+    cache.hits = cache.misses = 0
+    assert cache.assemble_listing(program) == _listing(program)
+    assert cache.misses == 0
@@ -0,0 +1,79 @@
+# tests/test_block_compiler.py
+"""Compiled basic blocks must end in the same machine state as every interpreted path."""
+import pytest
+
+from helpers import load, state
+
+MAX_STEPS = 1_000_000
+
+def _compiled():
+    simulator = load()
+    assert simulator.run(MAX_STEPS).reason == "exit"
+    return simulator
+
+def _interpreted():
+    simulator = load()
+    simulator.executor.use_blocks = False
+    assert simulator.run(MAX_STEPS).reason == "exit"
+    return simulator
+
+def _instrumented():
+    simulator = load()
+    simulator.executor.enable_reverse()  # Recording forces the instrumented loop
+    assert simulator.run(MAX_STEPS).reason == "exit"
+    return simulator
+
+def _stepped():
+    simulator = load()
+    while simulator.executor.step():
+        pass
+    assert simulator.executor.halted
+    return simulator
+
+def _chunked():
+    simulator = load()
+    while simulator.run(7).reason == "limit":  # Budgets that end inside compiled blocks
+        pass
+    return simulator
+
+@pytest.mark.parametrize("run", [_interpreted, _instrumented, _stepped, _chunked])
+def test_same_final_state_as_compiled_blocks(run):
+    assert state(run()) == state(_compiled())
+
+def test_executor_paths_count_the_same_instructions():
+    counts = set()
+    for disable_blocks in (False, True):
+        simulator = load()
+        simulator.executor.use_blocks = not disable_blocks
+        counts.add(simulator.run(MAX_STEPS).steps)
+    simulator = load()
+    simulator.executor.enable_reverse()
+    counts.add(simulator.run(MAX_STEPS).steps)
+    assert len(counts) == 1
+
+def test_blocks_end_at_labels_and_control_flow():
+    simulator = load()
+    compiler = simulator.executor.block_compiler
+    simulator.run(MAX_STEPS)
+    starts = sorted(compiler.blocks)
+    assert starts[0] == 0
+    label_lines = simulator.executor.label_lines
+    for block in compiler.blocks.values():
+        inner = range(block.start + 1, block.end)
+        assert not any(line in label_lines.values() for line in inner)
+        last = simulator.executor.decoded[block.end - 1]
+        assert last.op in ("beq", "bne", "j", "jal", "jr", "syscall") or block.end in label_lines.values()
+
+def test_blocks_are_compiled_once():
+    simulator = load()
+    simulator.run(MAX_STEPS)
+    compiler = simulator.executor.block_compiler
+    blocks = dict(compiler.blocks)
+    for start, block in blocks.items():
+        assert compiler.block_at(start) is block
+
+def test_fault_inside_a_block_counts_completed_instructions():
+    code = ".text\nli $t0, 1\nli $t1, 2\nlw $t2, 0($zero)\nli $t3, 5\n"
+    simulator = load(code)
+    assert simulator.run(MAX_STEPS) == (2, "error")
+    assert simulator.registers()["$t1"] == 2 and simulator.registers()["$t3"] == 0
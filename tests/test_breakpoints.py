@@ -0,0 +1,49 @@
+# tests/test_breakpoints.py
+"""Breakpoints and watchpoints stop runs at the right place and cost nothing when unset."""
+from helpers import load, state
+
+MAX_STEPS = 1_000_000
+
+def test_breakpoint_stops_before_the_label_and_resumes():
+    simulator = load()
+    line = simulator.add_breakpoint("recurse")
+    assert simulator.run(MAX_STEPS).reason == "breakpoint"
+    assert simulator.executor.current_line == line
+    assert simulator.executor.program_counter == simulator.executor.labels["recurse"]
+    assert simulator.run(MAX_STEPS).reason == "breakpoint"  # Continues past the hit, then stops again
+
+def test_conditional_breakpoint():
+    simulator = load()
+    simulator.add_breakpoint("recurse", "$a0 == 3")
+    while simulator.run(MAX_STEPS).reason == "breakpoint":
+        assert simulator.registers()["$a0"] == 3
+
+def test_watchpoint_stops_after_the_store():
+    simulator = load()
+    simulator.add_watchpoint("total")
+    assert simulator.run(MAX_STEPS).reason == "watchpoint"
+    assert simulator.executor.decoded[simulator.executor.current_line - 1].op == "sw"
+    assert simulator.run(MAX_STEPS).reason == "exit"
+
+def test_stepping_over_a_watched_store_updates_the_baseline():
+    messages = []
+    simulator = load()
+    simulator.executor.ui_log_callback = messages.append
+    simulator.add_watchpoint("total")
+    while simulator.memory.read_word(simulator.memory.symbols["total"].address) == 0:
+        simulator.executor.step()
+    assert any(message.startswith("Watchpoint total changed: 0 -> 31") for message in messages)
+    assert simulator.run(MAX_STEPS).reason == "exit"  # The stepped change is not reported again
+
+def test_unset_breakpoints_keep_the_compiled_path():
+    simulator = load()
+    simulator.add_breakpoint("recurse")
+    simulator.remove_breakpoint("recurse")
+    assert simulator.run(MAX_STEPS).reason == "exit"
+    assert simulator.executor.block_compiler.blocks
+    assert state(simulator) == state(_plain_run())
+
+def _plain_run():
+    simulator = load()
+    simulator.run(MAX_STEPS)
+    return simulator
@@ -0,0 +1,85 @@
+# tests/test_cache.py
+"""Cache hit/miss accounting for each policy, and the hierarchy fed by the executor."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from cache import CacheConfig, MIPSCache
+from helpers import load
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+A, B, C = 0x1000, 0x1010, 0x1020  # Distinct 16-byte blocks
+
+def _misses(config: CacheConfig, accesses) -> int:
+    cache = MIPSCache(config, 1)
+    for address, write in accesses:
+        cache.access(address, write, 0)
+    return cache.misses[0]
+
+def test_direct_mapped_conflicts():
+    alternating = [(A, False), (C, False)] * 2  # A and C share a set in a two-set cache
+    assert _misses(CacheConfig(size=32, block_size=16), alternating) == 4
+    assert _misses(CacheConfig(size=32, block_size=16, associativity=2), alternating) == 2
+
+@pytest.mark.parametrize("replacement, misses", [("lru", 3), ("fifo", 4)])
+def test_replacement_policies(replacement, misses):
+    config = CacheConfig(size=32, block_size=16, associativity=2, replacement=replacement)
+    assert _misses(config, [(A, False), (B, False), (A, False), (C, False), (A, False)]) == misses
+
+def test_random_replacement_is_seeded():
+    config = CacheConfig(size=64, block_size=16, associativity=4, replacement="random")
+    accesses = [(0x1000 + 16 * (i * 7 % 9), False) for i in range(200)]
+    assert _misses(config, accesses) == _misses(config, accesses)
+
+def test_write_back_writes_dirty_victims_only():
+    cache = MIPSCache(CacheConfig(size=32, block_size=16, miss_penalty=10), 1)
+    cache.access(A, True, 0)
+    cache.access(A + 4, True, 0)  # Same block, already dirty
+    cache.access(C, False, 0)  # Evicts the dirty block
+    cache.access(A, False, 0)  # Evicts a clean block
+    assert (cache.misses[0], cache.writebacks, cache.penalty[0]) == (3, 1, 40)
+
+def test_write_through_does_not_allocate():
+    cache = MIPSCache(CacheConfig(size=32, block_size=16, write_policy="through"), 1)
+    cache.access(A, True, 0)
+    cache.access(A, True, 0)
+    cache.access(A, False, 0)
+    cache.access(A, True, 0)
+    assert (cache.misses[0], cache.writebacks) == (3, 3)
+
+@pytest.mark.parametrize("text", ["size=3k", "block=2", "size=32,block=16,ways=4", "replacement=mru",
+                                  "write=around", "colour=red", "size"])
+def test_invalid_configs_are_refused(text):
+    with pytest.raises(ValueError):
+        CacheConfig.parse(text)
+
+def test_parse_keeps_defaults():
+    assert CacheConfig.parse("size=1k,ways=2") == CacheConfig(size=1024, associativity=2)
+
+def test_instruction_fetches_cover_every_word():
+    simulator = load(".data\nvalue: .word 5\n.text\nla $t0, value\nlw $t1, value\nli $t2, 1\n")
+    caches = simulator.executor.enable_caches(CacheConfig(), CacheConfig())
+    simulator.run(100)
+    assert list(caches.icache.accesses[:3]) == [2, 2, 1]  # la and lw by label expand to two words
+    assert caches.report()["dcache"]["accesses"] == 1
+
+def test_stepped_run_matches_one_run():
+    simulator = load()
+    caches = simulator.executor.enable_caches(CacheConfig(size=256), CacheConfig(size=128, associativity=2))
+    simulator.run(1_000_000)
+    stepped = load()
+    stepped_caches = stepped.executor.enable_caches(CacheConfig(size=256), CacheConfig(size=128, associativity=2))
+    while stepped.executor.step():
+        pass
+    report = caches.report(top=None)
+    assert stepped_caches.report(top=None) == report
+    assert report["icache"]["hits"] + report["icache"]["misses"] == report["icache"]["accesses"]
+
+def test_optional_models_are_imported_on_first_use():
+    modules = ["journal", "snapshot", "profiler", "pipeline", "cache", "predictor", "random"]
+    code = f"import sys, executor, mips_simulator; print([m for m in {modules!r} if m in sys.modules])"
+    output = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True,
+                            check=True)
+    assert output.stdout.strip() == "[]"
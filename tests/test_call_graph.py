@@ -0,0 +1,53 @@
+# tests/test_call_graph.py
+"""The call graph follows jal/jr and its counts add up to the instructions executed."""
+from helpers import load
+
+TOTAL_STEPS = 2353  # Instructions the shared program executes before syscall 10
+FIB_CALLS = 177  # Calls made by fib(10), the first included
+
+def _graph(chunk=1_000_000):
+    simulator = load()
+    graph = simulator.executor.enable_call_graph()
+    while simulator.run(chunk).reason != "exit":
+        pass
+    return graph
+
+def test_functions_edges_and_depth():
+    report = _graph().report()
+    functions = {function["function"]: function for function in report["functions"]}
+    assert functions["main"]["calls"] == 1
+    assert functions["main"]["inclusive"] == TOTAL_STEPS
+    assert functions["fib"]["calls"] == FIB_CALLS
+    assert functions["fib"]["inclusive"] == functions["fib"]["exclusive"]  # Recursion is counted once
+    assert sum(function["exclusive"] for function in report["functions"]) == TOTAL_STEPS
+    edges = {(edge["caller"], edge["callee"]): edge["calls"] for edge in report["edges"]}
+    assert edges == {("main", "fib"): 1, ("fib", "fib"): FIB_CALLS - 1}
+    assert report["max_depth"] == 11  # main and fib(10) down to fib(1)
+
+def test_collapsed_stacks_add_up():
+    stacks = [line.rsplit(" ", 1) for line in _graph().collapsed().splitlines()]
+    assert sum(int(count) for _, count in stacks) == TOTAL_STEPS
+    assert all(path.startswith("main") for path, _ in stacks)
+
+def test_chunked_and_stepped_runs_match_one_run():
+    expected = _graph().report()
+    assert _graph(chunk=97).report() == expected
+    simulator = load()
+    graph = simulator.executor.enable_call_graph()
+    while simulator.executor.step():
+        pass
+    assert graph.report() == expected
+
+def test_report_mid_run_closes_open_frames():
+    simulator = load()
+    graph = simulator.executor.enable_call_graph()
+    simulator.run(100)
+    report = graph.report()
+    assert sum(function["exclusive"] for function in report["functions"]) == 100
+    assert graph.report() == report  # Reporting does not change the live stack
+
+def test_jr_to_a_non_return_address_is_a_jump():
+    simulator = load(".text\nmain:\n la $t0, there\n jr $t0\n li $t1, 1\nthere:\n li $v0, 10\n syscall\n")
+    graph = simulator.executor.enable_call_graph()
+    simulator.run(100)
+    assert graph.report()["functions"] == [{"function": "main", "calls": 1, "inclusive": 4, "exclusive": 4}]
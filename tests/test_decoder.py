@@ -0,0 +1,26 @@
+# tests/test_decoder.py
+"""Operands are decoded once at load time and each executed line is traced the same way."""
+from decoder import MIPSDecoder
+from mips_simulator import HeadlessSimulator
+
+def _decode(source: str):
+    return MIPSDecoder().decode_program([{"address": "0x00400000", "source": source, "size": 1}], {})[0]
+
+def test_variable_shift_operands():
+    d = _decode("sllv $t6, $t1, $t5")
+    assert (d.op, d.rd, d.rt, d.rs, d.dest) == ("sllv", 14, 9, 13, 14)
+    d = _decode("srl $t6, $t1, $t5")  # A register shift amount makes srl variable
+    assert (d.op, d.rd, d.rt, d.rs) == ("srlv", 14, 9, 13)
+
+def test_operand_errors_are_kept_for_execution():
+    assert _decode("add $t1, $t0").error == "add expects 3 operands, got 2"
+    assert _decode("add $t1, $t0, $t0").error == ""
+
+def test_step_traces_alu_instructions_alike():
+    messages = []
+    simulator = HeadlessSimulator(messages.append)
+    simulator.load(".text\naddi $t0, $zero, 6\nandi $t1, $t0, 3\nori $t2, $t0, 1\n")
+    while simulator.executor.step():
+        pass
+    executed = [message for message in messages if message.startswith("Executed")]
+    assert executed == ["Executed: addi $t0 $zero 6", "Executed: andi $t1 $t0 3", "Executed: ori $t2 $t0 1"]
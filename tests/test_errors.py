@@ -0,0 +1,29 @@
+# tests/test_errors.py
+"""Faults and bad instructions stop the run on the instruction that failed."""
+import pytest
+
+from helpers import load
+from mips_simulator import HeadlessSimulator
+
+MAX_STEPS = 1_000_000
+
+@pytest.mark.parametrize("use_blocks", [True, False])
+def test_fault_leaves_pc_on_faulting_instruction(use_blocks):
+    code = ".text\nli $t0, 1\nli $t1, 2\nlw $t2, 0($zero)\nli $t3, 5\n"
+    simulator = load(code)
+    simulator.executor.use_blocks = use_blocks
+    result = simulator.run(MAX_STEPS)
+    machine = HeadlessSimulator()
+    machine.load_machine_code(code)
+    assert machine.run(MAX_STEPS) == result == (2, "error")
+    assert simulator.executor.program_counter == machine.machine.program_counter == 0x00400008
+
+@pytest.mark.parametrize("line", ["addx $t1, $t0, $t0", "add $t1, $t0", "lw $t1, missing"])
+def test_bad_instruction_stops_with_error(line):
+    messages = []
+    simulator = HeadlessSimulator(messages.append)
+    simulator.load(f".text\nli $t0, 1\n{line}\nli $t2, 5\n")
+    assert simulator.run(MAX_STEPS) == (1, "error")
+    assert simulator.executor.program_counter == 0x00400004
+    assert simulator.registers()["$t2"] == 0
+    assert messages and messages[-1].startswith("Error at 0x00400004")
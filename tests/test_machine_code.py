@@ -0,0 +1,45 @@
+# tests/test_machine_code.py
+"""The fetch-decode-execute core runs the assembled program to the same state as the executor."""
+import pytest
+
+from converter import MIPSConverter
+from helpers import PROGRAM, load, state
+from mips_simulator import HeadlessSimulator
+
+MAX_STEPS = 1_000_000
+
+def _both(code: str):
+    executor = load(code)
+    machine = HeadlessSimulator()
+    machine.load_machine_code(code)
+    return executor, executor.run(MAX_STEPS), machine, machine.run(MAX_STEPS)
+
+def test_shared_program_matches_executor():
+    executor, result, machine, machine_result = _both(PROGRAM)
+    assert result.reason == machine_result.reason == "exit"
+    assert state(machine) == state(executor)
+
+def test_immediates_extend_alike():
+    code = """.text
+    ori $t0, $zero, 0xFFFF
+    andi $t1, $t0, 65535
+    addi $t2, $zero, -1
+    addi $t3, $zero, 32767
+    addi $t4, $zero, -32768
+    ori $t5, $t2, 0x8000
+    andi $t6, $t2, 0x8001
+    """
+    executor, result, machine, machine_result = _both(code)
+    assert result.reason == machine_result.reason == "end"
+    assert executor.registers() == machine.registers()
+    registers = executor.registers()
+    assert (registers["$t0"], registers["$t1"], registers["$t2"]) == (0xFFFF, 0xFFFF, 0xFFFFFFFF)
+    assert (registers["$t5"], registers["$t6"]) == (0xFFFFFFFF, 0x8001)
+
+@pytest.mark.parametrize("line", ["ori $t0, $zero, -1", "andi $t1, $t0, 65536", "addi $t2, $zero, 70000",
+                                  "addi $t2, $zero, -32769"])
+def test_out_of_range_immediates_are_rejected_by_both(line):
+    executor = load(f".text\n{line}\n")
+    assert executor.run(MAX_STEPS) == (0, "error")
+    with pytest.raises(ValueError, match="Immediate out of range"):
+        MIPSConverter().assemble([executor.instructions[0]["source"]])
@@ -0,0 +1,61 @@
+# tests/test_pipeline.py
+"""Pipeline cycle counts for the textbook hazards, with and without forwarding."""
+import pytest
+
+from helpers import load
+from predictor import PredictorConfig
+
+# (program, forwarding, cycles, raw stalls, load-use stalls, branch/jump flush cycles)
+HAZARDS = [
+    (".text\nli $t0, 1\nli $t1, 2\nli $t2, 3\n", True, 7, 0, 0, 0),
+    (".text\nli $t0, 1\nli $t1, 2\nli $t2, 3\n", False, 7, 0, 0, 0),
+    (".text\nli $t0, 1\nadd $t1, $t0, $t0\n", True, 6, 0, 0, 0),
+    (".text\nli $t0, 1\nadd $t1, $t0, $t0\n", False, 8, 2, 0, 0),
+    (".text\nlw $t0, 0($sp)\nadd $t1, $t0, $t0\n", True, 7, 0, 1, 0),
+    (".text\nlw $t0, 0($sp)\nadd $t1, $t0, $t0\n", False, 8, 0, 2, 0),
+    (".text\nlw $t0, 0($sp)\nsw $t0, 4($sp)\n", True, 6, 0, 0, 0),  # Forwarded to the store in MEM
+    (".text\nlw $t0, 0($sp)\nsw $t0, 4($sp)\n", False, 8, 0, 2, 0),
+    (".text\nbeq $zero, $zero, end\nli $t0, 1\nend:\nli $t1, 2\n", True, 8, 0, 0, 2),
+    (".text\nbne $zero, $zero, end\nli $t0, 1\nend:\nli $t1, 2\n", True, 7, 0, 0, 0),
+    (".text\nj end\nli $t0, 1\nend:\nli $t1, 2\n", True, 7, 0, 0, 1),
+]
+
+@pytest.mark.parametrize("code, forwarding, cycles, raw, load_use, flush", HAZARDS)
+def test_hazards(code, forwarding, cycles, raw, load_use, flush):
+    simulator = load(code)
+    pipeline = simulator.executor.enable_pipeline(forwarding)
+    simulator.run(100)
+    report = pipeline.report()
+    assert report["cycles"] == cycles
+    assert report["stalls"] == {"raw": raw, "load_use": load_use, "branch_flush": flush, "pipeline_fill": 4}
+
+@pytest.mark.parametrize("forwarding", [True, False])
+def test_cycles_add_up(forwarding):
+    simulator = load()
+    pipeline = simulator.executor.enable_pipeline(forwarding)
+    simulator.run(1_000_000)
+    report = pipeline.report(top=None)
+    assert report["instructions"] == 2353
+    assert report["cycles"] == report["instructions"] + sum(report["stalls"].values())
+    assert sum(line["raw"] + line["load_use"] + line["branch_flush"] for line in report["lines"]) == \
+        report["cycles"] - report["instructions"] - 4
+
+def test_stepped_run_matches_one_run():
+    simulator = load()
+    pipeline = simulator.executor.enable_pipeline()
+    simulator.run(1_000_000)
+    stepped = load()
+    stepped_pipeline = stepped.executor.enable_pipeline()
+    while stepped.executor.step():
+        pass
+    assert stepped_pipeline.report(top=None) == pipeline.report(top=None)
+
+def test_predictor_decides_branch_flushes():
+    simulator = load()
+    pipeline = simulator.executor.enable_pipeline()
+    predictor = simulator.executor.enable_branch_prediction(PredictorConfig("2bit", penalty=3))
+    simulator.run(1_000_000)
+    assert pipeline.branch_penalty == 3
+    prediction = predictor.report()
+    jumps = sum(pipeline.flushes[line] for line, d in enumerate(simulator.executor.decoded) if d.op in ("j", "jal", "jr"))
+    assert pipeline.report()["stalls"]["branch_flush"] - jumps == prediction["penalty_cycles"]
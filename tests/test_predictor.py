@@ -0,0 +1,92 @@
+# tests/test_predictor.py
+"""Misprediction counts of each scheme on small loops with known branch outcomes."""
+import pytest
+
+from helpers import load
+from predictor import PredictorConfig
+
+# One branch, taken 9 times and then not taken
+LOOP = ".text\nli $t0, 10\nloop:\naddi $t0, $t0, -1\nbne $t0, $zero, loop\n"
+# An inner loop of 4 entered 3 times
+NESTED = """.text
+li $s0, 3
+outer:
+li $t0, 4
+inner:
+addi $t0, $t0, -1
+bne $t0, $zero, inner
+addi $s0, $s0, -1
+bne $s0, $zero, outer
+"""
+# A branch alternating taken and not taken
+ALTERNATING = """.text
+li $t0, 64
+li $t1, 0
+loop:
+addi $t1, $t1, 1
+andi $t2, $t1, 1
+beq $t2, $zero, over
+addi $t3, $t3, 1
+over:
+addi $t0, $t0, -1
+bne $t0, $zero, loop
+"""
+# Two branches in consecutive words that always go opposite ways
+ADJACENT = """.text
+li $t0, 8
+loop:
+addi $t0, $t0, -1
+bne $zero, $zero, loop
+beq $zero, $zero, over
+addi $t1, $t1, 1
+over:
+bne $t0, $zero, loop
+"""
+
+def _predictor(code: str, config: str):
+    simulator = load(code)
+    predictor = simulator.executor.enable_branch_prediction(PredictorConfig.parse(config))
+    simulator.run(10_000)
+    return predictor
+
+def _site_misses(predictor) -> dict:
+    return {site["source"]: site["mispredictions"] for site in predictor.report()["sites"]}
+
+@pytest.mark.parametrize("config, loop, nested", [
+    ("not-taken", 9, 11),
+    ("taken", 1, 4),
+    ("1bit", 2, 8),  # Wrong on every loop entry and exit
+    ("2bit", 2, 6),  # The exit no longer untrains the next entry
+    ("taken,btb=4", 2, 6),  # The first taken branch has no target yet
+])
+def test_loop_mispredictions(config, loop, nested):
+    assert _predictor(LOOP, config).report()["mispredictions"] == loop
+    assert _predictor(NESTED, config).report()["mispredictions"] == nested
+
+def test_gshare_learns_an_alternating_branch():
+    assert _site_misses(_predictor(ALTERNATING, "2bit"))["beq $t2 $zero over"] == 32
+    assert _site_misses(_predictor(ALTERNATING, "gshare,history=4"))["beq $t2 $zero over"] <= 2
+
+def test_tables_are_indexed_by_word_address():
+    # With two entries, branches in consecutive words use different counters
+    misses = _site_misses(_predictor(ADJACENT, "1bit,entries=2"))
+    assert misses["bne $zero $zero loop"] == 0
+    assert misses["beq $zero $zero over"] == 1
+
+def test_report_and_penalty():
+    report = _predictor(LOOP, "2bit,penalty=5").report()
+    assert (report["branches"], report["mispredictions"], report["penalty_cycles"]) == (10, 2, 10)
+    assert report["sites"][0]["taken"] == 9
+
+def test_stepped_run_matches_one_run():
+    expected = _predictor(NESTED, "gshare").report()
+    simulator = load(NESTED)
+    predictor = simulator.executor.enable_branch_prediction(PredictorConfig.parse("gshare"))
+    while simulator.executor.step():
+        pass
+    assert predictor.report() == expected
+
+@pytest.mark.parametrize("text", ["perceptron", "2bit,entries=3", "2bit,btb=6", "gshare,depth=2", "1bit,entries"])
+def test_invalid_configs_are_refused(text):
+    with pytest.raises(ValueError):
+        PredictorConfig.parse(text)
@@ -0,0 +1,83 @@
+# tests/test_profiler.py
+"""Profile counts must agree across execution paths and follow the machine back in reverse."""
+import pytest
+
+from helpers import load
+from journal import MIPSJournal
+
+TOTAL_STEPS = 2353  # Instructions the shared program executes before syscall 10
+SUM_LOOP_BRANCHES = 8  # bne $s2, $zero, sum_loop runs once per value
+
+def _profiled(journal=None, steps=1_000_000):
+    simulator = load()
+    simulator.executor.enable_profiling()
+    if journal is not None:
+        simulator.executor.enable_reverse(journal)
+    simulator.run(steps)
+    return simulator
+
+def _stepped():
+    simulator = load()
+    simulator.executor.enable_profiling()
+    while simulator.executor.step():
+        pass
+    return simulator
+
+def test_report_totals():
+    report = _profiled().executor.profile_report(top=None)
+    assert report["total"] == TOTAL_STEPS
+    assert sum(report["labels"].values()) == TOTAL_STEPS
+    sum_loop = next(branch for branch in report["branches"] if "sum_loop" in branch["source"])
+    assert (sum_loop["taken"], sum_loop["not_taken"]) == (SUM_LOOP_BRANCHES - 1, 1)
+    assert report["memory"]["writes"]
+
+def test_compiled_interpreted_and_stepped_profiles_agree():
+    compiled = _profiled()
+    assert compiled.executor.block_compiler.blocks
+    recorded = _profiled(MIPSJournal())  # Recording runs interpreted
+    stepped = _stepped()
+    expected = compiled.executor.profile_report(top=None)
+    assert recorded.executor.profile_report(top=None) == expected
+    assert stepped.executor.profile_report(top=None) == expected
+
+@pytest.mark.parametrize("journal", [MIPSJournal, lambda: MIPSJournal(64, 100, 1000)])
+@pytest.mark.parametrize("count", [1, 500, TOTAL_STEPS])
+def test_step_back_uncounts(journal, count):
+    simulator = _profiled(journal())
+    executor = simulator.executor
+    executor.step_back(count)
+    assert sum(executor.instruction_counts()) == executor.journal.position == TOTAL_STEPS - count
+    # Running on from there counts what a straight run counts
+    simulator.run(1_000_000)
+    assert executor.profile_report(top=None) == _profiled().executor.profile_report(top=None)
+
+@pytest.mark.parametrize("journal", [MIPSJournal, lambda: MIPSJournal(64, 100, 1000)])
+def test_reverse_continue_to_the_start_uncounts_everything(journal):
+    executor = _profiled(journal()).executor
+    assert executor.reverse_continue().reason == "start"
+    report = executor.profile_report()
+    assert report["total"] == executor.journal.position == 0
+    assert report["memory"] == {"reads": {}, "writes": {}}
+    assert not any(executor.profiler.taken)
+
+def test_faulting_instruction_is_not_counted():
+    simulator = load(".text\nli $t0, 3\nlw $t1, 0($zero)\n")
+    simulator.executor.enable_profiling()
+    simulator.run(10)
+    assert list(simulator.executor.instruction_counts()) == [1, 0]
+
+def test_single_line_counts_match_the_full_array():
+    # The GUI redraws one heat map row per step from instruction_count()
+    simulator = load()
+    executor = simulator.executor
+    executor.enable_profiling()
+    chunks = [1, 7, 0, 40, 0, 3, 250, 0, 0, 13]  # 0 means a single step()
+    while not executor.is_finished():
+        for chunk in chunks:
+            if chunk:
+                simulator.run(chunk)
+            else:
+                executor.step()
+        counts = executor.instruction_counts()
+        assert [executor.instruction_count(line) for line in range(len(counts))] == list(counts)
+    assert executor.block_compiler.blocks
@@ -0,0 +1,57 @@
+# tests/test_reverse.py
+"""step_back and reverse_continue must land on the state a fresh run reaches going forwards."""
+import pytest
+
+from helpers import load, run_steps, state
+from journal import MIPSJournal
+
+TOTAL_STEPS = 2353  # Instructions the shared program executes before syscall 10
+
+def _recorded(journal=None):
+    simulator = load()
+    simulator.executor.enable_reverse(journal)
+    assert simulator.run(1_000_000) == (TOTAL_STEPS, "exit")
+    return simulator
+
+@pytest.mark.parametrize("count", [1, 2, 17, 500, TOTAL_STEPS])
+def test_step_back_matches_fresh_replay(count):
+    simulator = _recorded()
+    assert simulator.executor.step_back(count) == count
+    assert state(simulator) == state(run_steps(TOTAL_STEPS - count))
+
+@pytest.mark.parametrize("count", [1, 40, 333, TOTAL_STEPS])
+def test_step_back_past_the_ring_replays_from_a_checkpoint(count):
+    # A ring far smaller than the run forces restores from checkpoints
+    simulator = _recorded(MIPSJournal(capacity=64, checkpoint_interval=100, max_checkpoints=64))
+    assert simulator.executor.step_back(count) == count
+    assert state(simulator) == state(run_steps(TOTAL_STEPS - count))
+
+def test_repeated_step_back_then_forward_again():
+    simulator = _recorded(MIPSJournal(capacity=64, checkpoint_interval=100, max_checkpoints=64))
+    final = state(simulator)
+    for _ in range(300):
+        assert simulator.executor.step_back(1) == 1
+    assert state(simulator) == state(run_steps(TOTAL_STEPS - 300))
+    assert simulator.run(1_000_000) == (300, "exit")
+    assert state(simulator) == final
+
+def test_reverse_continue_stops_at_previous_breakpoint_hits():
+    # Forward: every stop at the breakpoint, as a fresh run sees it
+    forward = load()
+    forward.add_breakpoint("recurse")
+    stops = []
+    while forward.run(1_000_000).reason == "breakpoint":
+        stops.append(state(forward))
+    assert len(stops) > 3
+
+    simulator = _recorded()
+    simulator.add_breakpoint("recurse")
+    for expected in reversed(stops[-3:]):
+        assert simulator.executor.reverse_continue().reason == "breakpoint"
+        assert state(simulator) == expected
+
+def test_reverse_continue_reaches_the_start():
+    simulator = _recorded()
+    result = simulator.executor.reverse_continue()
+    assert result == (TOTAL_STEPS, "start")
+    assert state(simulator) == state(load())
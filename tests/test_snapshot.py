@@ -0,0 +1,100 @@
+# tests/test_snapshot.py
+"""Snapshots saved mid-run must resume to the same final state as an uninterrupted run."""
+import json
+
+import pytest
+
+import mips_simulator
+from helpers import PROGRAM, load, run_steps, state
+from snapshot import load_snapshot, save_snapshot
+
+@pytest.mark.parametrize("steps", [0, 1, 250, 1000])
+def test_save_load_round_trip(tmp_path, steps):
+    snapshot = run_steps(steps).snapshot()
+    path = str(tmp_path / "state.snap")
+    save_snapshot(path, snapshot)
+    loaded = load_snapshot(path)
+    assert loaded.registers == snapshot.registers
+    assert (loaded.current_line, loaded.halted, loaded.program, loaded.byteorder) == \
+        (snapshot.current_line, snapshot.halted, snapshot.program, snapshot.byteorder)
+    assert loaded.symbols == snapshot.symbols
+    nonzero = {number: bytes(page) for number, page in snapshot.pages.items() if any(page)}
+    assert {number: bytes(page) for number, page in loaded.pages.items()} == nonzero
+
+@pytest.mark.parametrize("steps", [1, 250, 1000])
+def test_resumed_run_matches_uninterrupted_run(tmp_path, steps):
+    path = str(tmp_path / "state.snap")
+    run_steps(steps).save_snapshot(path)
+
+    expected = load()
+    expected.run(1_000_000)
+    resumed = load()
+    resumed.load_snapshot(path)
+    assert resumed.executor.program_counter == run_steps(steps).executor.program_counter
+    assert resumed.run(1_000_000).reason == "exit"
+    assert state(resumed) == state(expected)
+
+def test_restore_after_further_execution():
+    simulator = run_steps(400)
+    snapshot = simulator.snapshot()
+    before = state(simulator)
+    simulator.run(1_000_000)
+    simulator.restore(snapshot)
+    assert state(simulator) == before
+
+def test_snapshot_of_another_program_is_refused(tmp_path):
+    path = str(tmp_path / "state.snap")
+    run_steps(10).save_snapshot(path)
+    other = load(PROGRAM.replace("li $a0, 10", "li $a0, 9"))
+    with pytest.raises(ValueError):
+        other.load_snapshot(path)
+
+def test_command_line_resume(tmp_path, capsys):
+    program = tmp_path / "program.s"
+    program.write_text(PROGRAM)
+    path = str(tmp_path / "state.snap")
+
+    def run(*arguments):
+        status = mips_simulator.main(["run", str(program), "--dump-json", *arguments])
+        return status, json.loads(capsys.readouterr().out)
+
+    status, full = run()
+    assert status == 0
+    status, _ = run("--max-steps", "700", "--save-snapshot", path)
+    assert status == 2
+    status, resumed = run("--resume", path)
+    assert status == 0
+    assert resumed["registers"] == full["registers"]
+    assert resumed["data_memory"] == full["data_memory"]
+    assert resumed["pc"] == full["pc"]
+    assert resumed["instructions"] == full["instructions"] - 700
+
+def test_snapshot_is_not_changed_by_later_writes():
+    simulator = run_steps(400)
+    snapshot = simulator.snapshot()
+    pages = {number: bytes(page) for number, page in snapshot.pages.items()}
+    simulator.run(1_000_000)  # Writes total, bytes and the stack through copy-on-write pages
+    assert {number: bytes(page) for number, page in snapshot.pages.items()} == pages
+
+def test_snapshot_of_other_endianness_is_refused(tmp_path):
+    path = str(tmp_path / "state.snap")
+    run_steps(10).save_snapshot(path)
+    other = mips_simulator.HeadlessSimulator(byteorder="big")
+    other.load(PROGRAM)
+    with pytest.raises(ValueError, match="little-endian"):
+        other.load_snapshot(path)
+
+@pytest.mark.parametrize("data", [b"", b"MIPSSNAP", b"NOTASNAP" + bytes(40)])
+def test_unreadable_snapshot_files_are_refused(tmp_path, data):
+    path = tmp_path / "state.snap"
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        load_snapshot(str(path))
+
+def test_corrupt_snapshot_body_is_refused(tmp_path):
+    path = tmp_path / "state.snap"
+    run_steps(10).save_snapshot(str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[:-8])
+    with pytest.raises(ValueError, match="Corrupt"):
+        load_snapshot(str(path))
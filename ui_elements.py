@@ -1,10 +1,27 @@
 # ui_elements.py
 import tkinter as tk
 import tkinter.ttk as ttk
-from typing import List
-from register_data import register
+from typing import Collection, Dict, List, Optional, Sequence
+from register_data import MIPSRegisters
+from log_buffer import MIPSLogBuffer, LOG_LEVELS, LOG_ALL
+from virtual_table import MIPSVirtualTable
+from syntax_highlight import MIPSHighlighter
 
 class MIPSUI:
+    HEAT_LEVELS = 4  # Colour steps used for instruction execution counts
+    CONSOLE_MAX_LINES = 2000  # Older console lines are deleted
+    CONSOLE_FLUSH_MS = 100  # Queued log messages are written to the console at most this often
+    DATA_ROWS = 8
+    DATA_COLUMNS = 16  # Words per data memory row
+    SYNTAX_COLORS = {
+        'opcode': '#00ADB5',
+        'register': '#F8B500',
+        'label': '#C39BD3',
+        'immediate': '#7FDBCA',
+        'directive': '#FF8A65',
+        'comment': '#8B929A',
+    }
+
     def __init__(self, root: tk.Tk, data_memory_base: int, program_counter_callback):
         self.root = root
         # Set theme colors with new color scheme
@@ -23,11 +40,35 @@ class MIPSUI:
         
         self.data_memory_base = data_memory_base
         self.program_counter_callback = program_counter_callback
-        self.data_memory_values = [0] * (512 // 4)  # Initialize for 512 bytes / 4 bytes per word
+        self.data_view_base = data_memory_base  # Address of the first word in the data memory view
+        self._data_items: List[str] = []  # Data memory rows, inserted once and then updated cell by cell
+        self._shown_words: List[int] = []  # Word shown in each data memory cell
 
+        self._clear_button_action = self._clear_registers
         self._run_button_action = lambda: None
         self._step_button_action = lambda: None
+        self._step_back_button_action = lambda: None
+        self._reverse_button_action = lambda: None
         self._convert_button_action = lambda: None
+        self._breakpoint_toggle_action = lambda index: None  # Called with the clicked instruction index
+        self._log_level_action = lambda level: None  # Called with a log_buffer level when the Log menu changes
+        self._record_action = lambda enabled: None  # Called when the Record check box is toggled
+        self._data_scroll_action = lambda rows: None  # Called with +/-1 when the data memory view is scrolled
+        self._goto_action = lambda location: None  # Called with the label or address typed into Go to
+
+        # Backing data of the virtualized instruction memory and machine code tables
+        self._instructions: List[dict] = []
+        self._breakpoints: Collection[int] = ()
+        self._counts: Sequence[int] = ()
+        self._hottest = 0
+        self._current_line = -1  # Instruction at the PC, highlighted in the instruction memory view
+        self._rows_by_address: Dict[int, int] = {}  # Instruction address -> row
+        self._machine_code: List[tuple] = []
+
+        self.log = MIPSLogBuffer()
+        self._flush_job = None  # Pending after() id of the next console flush
+        self._gutter_lines = 0  # Line numbers currently in the gutter
+        self._edit_start_line = 1  # Cursor line when the current keystroke began
 
         self._create_widgets()
         self._update_line_numbers()
@@ -150,7 +191,23 @@ class MIPSUI:
             font=("Arial", 11, "bold"),
             bg=self.COLORS['bg_light'],
             fg=self.COLORS['text']
-        ).pack(anchor="w", padx=5, pady=2)
+        ).pack(side="left", anchor="w", padx=5, pady=2)
+        self.goto_entry = tk.Entry(
+            instruction_title_frame,
+            width=16,
+            bg=self.COLORS['bg_dark'],
+            fg=self.COLORS['text'],
+            insertbackground=self.COLORS['text'],
+            font=('Consolas', 10)
+        )
+        self.goto_entry.pack(side="right", padx=5, pady=2)
+        self.goto_entry.bind("<Return>", lambda event: self._goto_action(self.goto_entry.get()))
+        tk.Label(
+            instruction_title_frame,
+            text="Go to (label or address):",
+            bg=self.COLORS['bg_light'],
+            fg=self.COLORS['text']
+        ).pack(side="right", pady=2)
 
         data_title_frame = tk.Frame(self.data_frame, bg=self.COLORS['bg_light'])
         data_title_frame.pack(fill='x', pady=(2,0))
@@ -173,11 +230,31 @@ class MIPSUI:
             'pady': 5
         }
 
-        tk.Button(top_frame, text="Clear", command=self._clear_registers, **button_style).pack(side='left', padx=5)
+        tk.Button(top_frame, text="Clear", command=lambda: self._clear_button_action(), **button_style).pack(side='left', padx=5)
         tk.Button(top_frame, text="Run", command=lambda: self._run_button_action(), **button_style).pack(side='left', padx=5)
         tk.Button(top_frame, text="Step", command=lambda: self._step_button_action(), **button_style).pack(side='left', padx=5)
+        tk.Button(top_frame, text="Back", command=lambda: self._step_back_button_action(), **button_style).pack(side='left', padx=5)
+        tk.Button(top_frame, text="Reverse", command=lambda: self._reverse_button_action(), **button_style).pack(side='left', padx=5)
         tk.Button(top_frame, text="Convert", command=lambda: self._convert_button_action(), **button_style).pack(side='left', padx=5)
 
+        # Trace verbosity and log file
+        self.log_level_name = tk.StringVar(value=next(name for name, level in LOG_LEVELS.items() if level == LOG_ALL))
+        log_menu = tk.OptionMenu(top_frame, self.log_level_name, *LOG_LEVELS,
+                                 command=lambda name: self._log_level_action(LOG_LEVELS[name]))
+        log_menu.config(bg=self.COLORS['accent'], fg=self.COLORS['bg_dark'], font=('Arial', 10, 'bold'),
+                        relief='flat', highlightthickness=0, width=8)
+        log_menu.pack(side='left', padx=5)
+        self.log_file_button = tk.Button(top_frame, text="Log File", command=self._toggle_log_file, **button_style)
+        self.log_file_button.pack(side='left', padx=5)
+
+        # Undo history for Back and Reverse, off by default so Run keeps its compiled fast path
+        self.record_history = tk.BooleanVar(value=False)
+        tk.Checkbutton(top_frame, text="Record", variable=self.record_history,
+                       command=lambda: self._record_action(self.record_history.get()),
+                       bg=self.COLORS['bg_dark'], fg=self.COLORS['text'], selectcolor=self.COLORS['bg_light'],
+                       activebackground=self.COLORS['bg_dark'], activeforeground=self.COLORS['accent'],
+                       font=('Arial', 10, 'bold')).pack(side='left', padx=5)
+
         # PC Counter Label styling
         self.pc_label = tk.Label(
             top_frame, 
@@ -212,11 +289,15 @@ class MIPSUI:
             insertbackground=self.COLORS['text'],
             font=('Consolas', 11),
             pady=5,
-            padx=5
+            padx=5,
+            yscrollcommand=self._on_editor_scroll
         )
         self.edit_text.pack(side='left', fill='both', expand=True)
+        self.highlighter = MIPSHighlighter(self.edit_text, self.SYNTAX_COLORS)
 
-        self.edit_text.bind('<KeyRelease>', self._update_line_numbers)
+        self.edit_text.bind('<KeyPress>', self._on_edit_start)
+        self.edit_text.bind('<KeyRelease>', self._on_edit)
+        self.edit_text.bind('<<Paste>>', self._on_edit_start)
         self.edit_text.bind("<MouseWheel>", self._on_mouse_wheel)
         self.edit_text.bind("<Control-z>", self._undo)
         self.edit_text.bind("<Control-y>", self._redo)
@@ -297,7 +378,7 @@ class MIPSUI:
         self.tree.tag_configure('evenrow', background=self.COLORS['bg_light'])
         self.tree.tag_configure('oddrow', background=self.COLORS['bg_dark'])
 
-        for index, reg in enumerate(register):
+        for index, reg in enumerate(MIPSRegisters.get_registers()):
             tag = 'evenrow' if index % 2 == 0 else 'oddrow'
             self.tree.insert("", "end", values=(
                 reg["name"], 
@@ -308,7 +389,7 @@ class MIPSUI:
         self.tree.pack(fill='both', expand=True, padx=5, pady=5)
 
         # Instruction Memory TreeView
-        columns = ("Address", "Source Code")
+        columns = ("Address", "Source Code", "Count")
         self.instruction_memory_tree = ttk.Treeview(
             self.instruction_frame, 
             columns=columns, 
@@ -316,14 +397,16 @@ class MIPSUI:
             **treeview_style
         )
 
-        for col in columns:
+        for col, width in zip(columns, [200, 200, 90]):
             self.instruction_memory_tree.heading(col, text=col)
-            self.instruction_memory_tree.column(col, width=200, anchor='center')
+            self.instruction_memory_tree.column(col, width=width, anchor='center')
 
         self.instruction_memory_tree.pack(fill="both", expand=True, padx=5, pady=5)
+        self.instruction_memory_tree.bind("<Button-1>", self._on_instruction_click)
 
         # Data Memory TreeView
-        columns = ["Address"] + [f"Value(+{i*4})" for i in range(16)]
+        columns = ["Address"] + [f"Value(+{i*4})" for i in range(self.DATA_COLUMNS)]
+        self._data_columns = columns[1:]
         self.data_memory_tree = ttk.Treeview(
             self.data_frame, 
             columns=columns, 
@@ -336,6 +419,8 @@ class MIPSUI:
             self.data_memory_tree.column(col, width=70, anchor='center')
 
         self.data_memory_tree.pack(fill="both", expand=True, padx=5, pady=5)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.data_memory_tree.bind(sequence, self._on_data_scroll)
 
         # Machine Code TreeView
         columns = ("Instruction", "Machine Code")
@@ -358,6 +443,23 @@ class MIPSUI:
             foreground='#EEEEEE'      # Light gray text
         )
 
+        # Heat colouring of executed instructions, from dark (rarely run) to orange (hottest)
+        for level in range(1, self.HEAT_LEVELS + 1):
+            self.instruction_memory_tree.tag_configure(f'heat{level}',
+                background=self._interpolate_color(self.COLORS['bg_light'], '#F08A5D', level / self.HEAT_LEVELS),
+                foreground=self.COLORS['text']
+            )
+
+        # Configured after the heat tags so a breakpoint marker takes precedence
+        self.instruction_memory_tree.tag_configure('breakpoint',
+            background='#B83B5E',     # Red marks a breakpoint
+            foreground='#EEEEEE'
+        )
+        self.instruction_memory_tree.tag_configure('current',
+            background=self.COLORS['accent'],     # Instruction at the PC
+            foreground=self.COLORS['bg_dark']
+        )
+
         # Update evenrow/oddrow colors
         self.tree.tag_configure('evenrow', 
             background=self.COLORS['bg_light'],
@@ -397,17 +499,45 @@ class MIPSUI:
         # Console yükseklik ayarı
         self.console_frame.pack_propagate(False)  # Console yüksekliğini sabitle
 
+        # Only the visible rows of these tables exist as Treeview items
+        self.instruction_table = MIPSVirtualTable(self.instruction_memory_tree, self._instruction_row,
+                                                  self._instruction_tags)
+        self.machine_code_table = MIPSVirtualTable(self.machine_code_tree, lambda index: self._machine_code[index])
+
     def _update_line_numbers(self, event=None):
-        lines = self.edit_text.get('1.0', 'end-1c').split('\n')
+        """Add or remove gutter numbers for the change in the editor's line count."""
+        count = int(self.edit_text.index('end-1c').split('.')[0])
+        if count == self._gutter_lines:
+            return
         self.line_numbers.config(state='normal')
-        self.line_numbers.delete('1.0', 'end')
-        self.line_numbers.insert(
-            '1.0', 
-            "\n".join(str(i + 1) for i in range(len(lines)))
-        )
+        if count > self._gutter_lines:
+            first = self._gutter_lines + 1
+            numbers = "\n".join(str(number) for number in range(first, count + 1))
+            self.line_numbers.insert('end-1c', numbers if first == 1 else "\n" + numbers)
+        else:
+            self.line_numbers.delete(f'{count}.end', 'end-1c')
         self.line_numbers.config(state='disabled')
+        self._gutter_lines = count
         self.line_numbers.yview_moveto(self.edit_text.yview()[0])
 
+    def _on_edit_start(self, event=None):
+        self._edit_start_line = int(self.edit_text.index('insert').split('.')[0])
+
+    def _on_edit(self, event=None):
+        """Update the gutter and re-highlight the lines between the cursor's old and new position."""
+        lines = self._gutter_lines
+        self._update_line_numbers()
+        if self._gutter_lines < lines:
+            self.highlighter.invalidate()  # Lines from below the view may have moved into it
+            self.highlighter.highlight_visible()
+        line = int(self.edit_text.index('insert').split('.')[0])
+        self.highlighter.highlight_edit(min(line, self._edit_start_line), max(line, self._edit_start_line))
+        self._edit_start_line = line
+
+    def _on_editor_scroll(self, first, last):
+        self.line_numbers.yview_moveto(first)
+        self.highlighter.highlight_visible()
+
     def _on_mouse_wheel(self, event):
         scroll_amount = -1 * (event.delta // 120)
         self.edit_text.yview_scroll(scroll_amount, "units")
@@ -419,6 +549,7 @@ class MIPSUI:
             self.edit_text.edit_undo()
         except tk.TclError:
             pass
+        self._after_undo()
         return "break"
 
     def _redo(self, event=None):
@@ -426,25 +557,24 @@ class MIPSUI:
             self.edit_text.edit_redo()
         except tk.TclError:
             pass
+        self._after_undo()
         return "break"
 
+    def _after_undo(self):
+        # Undo and redo may change lines anywhere in view, not just at the cursor
+        self._update_line_numbers()
+        self.highlighter.invalidate()
+        self.highlighter.highlight_visible()
+        self._edit_start_line = int(self.edit_text.index('insert').split('.')[0])
+
     def _clear_registers(self):
+        self.log.clear()
         self.console_output.delete('1.0', 'end')
-        for item in self.instruction_memory_tree.get_children():
-            self.instruction_memory_tree.delete(item)
+        self.set_instruction_memory([])
+        self.set_machine_code_output([])
 
-        for item in self.machine_code_tree.get_children():
-            self.machine_code_tree.delete(item)
-        
-        initial_values = ["0x00000000"] * 16
-        for i in self.data_memory_tree.get_children():
-            self.data_memory_tree.delete(i)
-        
-        addresses = [f"0x{self.data_memory_base + (i*64):08X}" for i in range(8)]
+        self.update_data_memory_display([0] * (self.DATA_ROWS * self.DATA_COLUMNS), self.data_memory_base)
 
-        for addr in addresses:
-            self.data_memory_tree.insert("", "end", values=[addr] + initial_values)
-    
         for item in self.tree.get_children():
             self.tree.set(item, column="Value", value="0x00000000")
         self.update_program_counter_display(0)
@@ -453,54 +583,153 @@ class MIPSUI:
     def update_program_counter_display(self, pc: int):
         hex_pc = f"0x{pc:08X}"
         self.pc_label.config(text=f"PC: {hex_pc}")
-
-    def update_data_memory_display(self, data_memory_values: List[int]):
-      for i in self.data_memory_tree.get_children():
-          self.data_memory_tree.delete(i)
-            
-      addresses = [f"0x{self.data_memory_base + (i*64):08X}" for i in range(8)]
-      
-      for addr_idx, addr in enumerate(addresses):
-            row_values = [addr]
-            for val_idx in range(16):
-                mem_index = addr_idx * 16 + val_idx
-                if mem_index < len(data_memory_values):
-                    val = data_memory_values[mem_index]
-                    hex_val = f"0x{val:08X}" if val is not None else "0x00000000"
-                    row_values.append(hex_val)
-                else:
-                    row_values.append("0x00000000")
-
-            self.data_memory_tree.insert("", "end", values=row_values)
+        self._show_current_instruction(self._rows_by_address.get(pc, -1))
+
+    def _show_current_instruction(self, line: int):
+        """Move the PC highlight to line and scroll it into view."""
+        previous, self._current_line = self._current_line, line
+        if line != previous:
+            self.instruction_table.refresh_row(previous)
+            self.instruction_table.refresh_row(line)
+        if 0 <= line < len(self._instructions):
+            self.instruction_table.see(line)
+
+    def update_data_memory_display(self, data_memory_values: Sequence[int], base: Optional[int] = None,
+                                    changed: Optional[Sequence[int]] = None):
+        """Show the words of the data memory window starting at base (default: unchanged).
+
+        Only cells whose value differs from what is shown are redrawn. changed
+        limits the comparison to those word indices, e.g. the words
+        MIPSMemory.take_written_ranges() reported; None checks every cell.
+        """
+        tree = self.data_memory_tree
+        row_bytes = self.DATA_COLUMNS * 4
+        if not self._data_items:
+            self._data_items = [
+                tree.insert("", "end", values=[f"0x{self.data_view_base + row * row_bytes:08X}"] +
+                            ["0x00000000"] * self.DATA_COLUMNS)
+                for row in range(self.DATA_ROWS)
+            ]
+            self._shown_words = [0] * (self.DATA_ROWS * self.DATA_COLUMNS)
+        if base is not None and base != self.data_view_base:
+            self.data_view_base = base
+            for row, item in enumerate(self._data_items):
+                tree.set(item, "Address", f"0x{base + row * row_bytes:08X}")
+            changed = None
+
+        shown = self._shown_words
+        for index in range(len(shown)) if changed is None else changed:
+            value = data_memory_values[index] if index < len(data_memory_values) else 0
+            if shown[index] != value:
+                row, column = divmod(index, self.DATA_COLUMNS)
+                tree.set(self._data_items[row], self._data_columns[column], f"0x{value:08X}")
+                shown[index] = value
+
+    def _on_data_scroll(self, event):
+        up = event.num == 4 or event.delta > 0
+        self._data_scroll_action(-1 if up else 1)
+        return "break"
 
     def get_mips_code(self):
         return self.edit_text.get('1.0', 'end-1c')
 
     def log_to_console(self, message):
-        self.console_output.insert('end', f"{message}\n")
+        """Queue a message; the console is updated in batches by _flush_console."""
+        self.log.write(message)
+        if self._flush_job is None:
+            self._flush_job = self.root.after(self.CONSOLE_FLUSH_MS, self._flush_console)
+
+    def _flush_console(self):
+        self._flush_job = None
+        lines = self.log.drain()[-self.CONSOLE_MAX_LINES:]
+        if not lines:
+            return
+        self.console_output.insert('end', "\n".join(lines) + "\n")
+        excess = int(self.console_output.index('end-1c').split('.')[0]) - 1 - self.CONSOLE_MAX_LINES
+        if excess > 0:
+            self.console_output.delete('1.0', f'{excess + 1}.0')
         self.console_output.see('end')  # Automatically scroll to the bottom
 
-    def set_instruction_memory(self, instructions: List[dict]):
-        for item in self.instruction_memory_tree.get_children():
-             self.instruction_memory_tree.delete(item)
-        
-        for instr in instructions:
-            self.instruction_memory_tree.insert("", "end", values=(
-                instr['address'],
-                instr['source']
-            ))
+    def _toggle_log_file(self):
+        """Start streaming the full log to a file chosen by the user, or stop if already streaming."""
+        if self.log.path:
+            path = self.log.path
+            self.log.close_file()
+            self.log_file_button.config(text="Log File")
+            self.log_to_console(f"Stopped logging to {path}")
+            return
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(defaultextension=".log", filetypes=[("Log files", "*.log"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            self.log.open_file(path)
+        except OSError as e:
+            self.log_to_console(f"Error: {e}")
+            return
+        self.log_file_button.config(text="Stop Log")
+        self.log_to_console(f"Logging to {path}")
+
+    def set_instruction_memory(self, instructions: List[dict], breakpoints: Collection[int] = ()):
+        """Show a program; breakpoints is the live collection of breakpoint indices."""
+        self._instructions = instructions
+        self._rows_by_address = {int(instruction['address'], 16): row for row, instruction in enumerate(instructions)}
+        self._breakpoints = breakpoints
+        self._counts = ()
+        self._hottest = 0
+        self.instruction_table.reset(len(instructions))
+
+    def _instruction_row(self, index: int) -> tuple:
+        instruction = self._instructions[index]
+        count = self._counts[index] if index < len(self._counts) else 0
+        return instruction['address'], instruction['source'], count or ""
+
+    def _instruction_tags(self, index: int) -> List[str]:
+        tags = []
+        count = self._counts[index] if index < len(self._counts) else 0
+        if count:
+            tags.append(f'heat{max(1, -(-count * self.HEAT_LEVELS // self._hottest))}')  # Ceiling division
+        if index in self._breakpoints:
+            tags.append('breakpoint')
+        if index == self._current_line:
+            tags.append('current')
+        return tags
+
+    def update_instruction_counts(self, counts: Sequence[int]):
+        """Show execution counts and colour rows by how hot they are relative to the hottest one."""
+        self._counts = counts
+        self._hottest = max(counts, default=0)
+        self.instruction_table.refresh()
+
+    def update_instruction_count(self, index: int, count: int):
+        """Show one row's new execution count; the other rows are redrawn only if it became the hottest."""
+        if len(self._counts) != len(self._instructions):
+            self._counts = [0] * len(self._instructions)
+        self._counts[index] = count
+        if count > self._hottest:
+            self._hottest = count  # Every row's colour is relative to the hottest one
+            self.instruction_table.refresh()
+        else:
+            self.instruction_table.refresh_row(index)
+
+    def show_instruction(self, index: int):
+        """Scroll the instruction memory and machine code views to an instruction."""
+        self.instruction_table.see(index)
+        self.machine_code_table.see(index)
+
+    def _on_instruction_click(self, event):
+        index = self.instruction_table.index_at(event.y)
+        if index >= 0:
+            self._breakpoint_toggle_action(index)
+
+    def mark_breakpoint(self, index: int, enabled: bool):
+        """Show or hide the breakpoint marker on an instruction memory row."""
+        self.instruction_table.refresh_row(index)
 
-    
     def set_machine_code_output(self, machine_code_pairs: List[tuple]):
-        for item in self.machine_code_tree.get_children():
-            self.machine_code_tree.delete(item)
-            
-        for instruction, code in machine_code_pairs:
-            self.machine_code_tree.insert("", "end", values=(
-                instruction,
-                code
-            ))
-          
+        self._machine_code = machine_code_pairs
+        self.machine_code_table.reset(len(machine_code_pairs))
+
     def get_register_tree(self) -> ttk.Treeview:
       return self.tree
 
@@ -0,0 +1,93 @@
+# virtual_table.py
+import tkinter as tk
+import tkinter.ttk as ttk
+from typing import Callable, List, Sequence
+
+class MIPSVirtualTable:
+    """A Treeview that only holds the visible rows of a much longer table.
+
+    The Treeview keeps a fixed number of items (its height); scrolling
+    rewrites their values and tags from row_values/row_tags for the rows
+    now in view, so loading or redrawing a table costs the same for ten
+    rows as for a hundred thousand. A separate scrollbar stands in for the
+    Treeview's own, which would only see the materialised rows.
+    """
+
+    def __init__(self, tree: ttk.Treeview, row_values: Callable[[int], Sequence],
+                 row_tags: Callable[[int], Sequence[str]] = lambda index: ()):
+        self.tree = tree
+        self.row_values = row_values
+        self.row_tags = row_tags
+        self.row_count = 0
+        self.first = 0  # Row index shown in the top item
+        self._items: List[str] = []
+
+        self.scrollbar = ttk.Scrollbar(tree.master, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y", before=tree)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tree.bind(sequence, self._on_wheel)
+
+    @property
+    def visible(self) -> int:
+        return int(self.tree.cget("height"))
+
+    def reset(self, row_count: int) -> None:
+        """Show a new table of row_count rows from the top."""
+        self.row_count = row_count
+        self.first = 0
+        items = min(row_count, self.visible)
+        while len(self._items) > items:
+            self.tree.delete(self._items.pop())
+        while len(self._items) < items:
+            self._items.append(self.tree.insert("", "end", values=()))
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Redraw every materialised row, e.g. after the backing data changed."""
+        for offset, item in enumerate(self._items):
+            index = self.first + offset
+            self.tree.item(item, values=tuple(self.row_values(index)), tags=tuple(self.row_tags(index)))
+        self._update_scrollbar()
+
+    def refresh_row(self, index: int) -> None:
+        """Redraw one row if it is in view."""
+        offset = index - self.first
+        if 0 <= offset < len(self._items):
+            self.tree.item(self._items[offset], values=tuple(self.row_values(index)),
+                           tags=tuple(self.row_tags(index)))
+
+    def scroll_to(self, first: int) -> None:
+        first = max(0, min(first, self.row_count - len(self._items)))
+        if first != self.first:
+            self.first = first
+            self.refresh()
+
+    def see(self, index: int) -> None:
+        """Scroll the least needed to bring row index into view."""
+        if index < self.first:
+            self.scroll_to(index)
+        elif index >= self.first + len(self._items):
+            self.scroll_to(index - len(self._items) + 1)
+
+    def index_at(self, y: int) -> int:
+        """Row index under a y coordinate of the Treeview, or -1."""
+        item = self.tree.identify_row(y)
+        return self.first + self._items.index(item) if item in self._items else -1
+
+    def _update_scrollbar(self) -> None:
+        if self.row_count <= len(self._items):
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.first / self.row_count, (self.first + len(self._items)) / self.row_count)
+
+    def _on_scrollbar(self, action: str, amount: str, unit: str = "units") -> None:
+        if action == "moveto":
+            self.scroll_to(round(float(amount) * self.row_count))
+        else:
+            step = len(self._items) if unit == "pages" else 1
+            self.scroll_to(self.first + int(amount) * step)
+
+    def _on_wheel(self, event: tk.Event) -> str:
+        up = event.num == 4 or event.delta > 0
+        self.scroll_to(self.first + (-3 if up else 3))
+        return "break"